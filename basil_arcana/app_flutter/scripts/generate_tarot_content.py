@@ -1,145 +1,49 @@
 #!/usr/bin/env python3
+"""
+Enrich the app card packs with derived fields.
+
+Each pack is streamed card by card: cards of the selected suits get their
+derived fields recomputed, everything else passes through untouched, and the
+result is written back atomically (or not at all when no card changed). A card
+whose enrichment would add an issue that validate_assets_json.py reports is
+refused, and fields the CDN rejects (funFact) are dropped from enriched cards.
+
+Instead of rewriting the packs, ``--patch-dir`` collects only the changed
+cards into patch files, which ``--apply-patch`` later merges into the packs
+with the same checks.
+
+    python3 basil_arcana/app_flutter/scripts/generate_tarot_content.py --dry-run
+    python3 basil_arcana/app_flutter/scripts/generate_tarot_content.py --suits major --patch-dir patches
+    python3 basil_arcana/app_flutter/scripts/generate_tarot_content.py --apply-patch patches
+"""
+
 from __future__ import annotations
 
+import argparse
+import difflib
 import json
+import sys
+from contextlib import ExitStack
 from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Optional, TextIO
 
 ROOT = Path(__file__).resolve().parents[1]
 DATA_DIR = ROOT / "assets" / "data"
 
-SUITS_TO_UPDATE = ("major", "wands", "cups")
-
-SUIT_FORMS = {
-    "en": {"wands": "Wands", "cups": "Cups"},
-    "ru": {"wands": "Жезлах", "cups": "Кубках"},
-    "kk": {"wands": "Таяқтардың", "cups": "Кубоктардың"},
-}
+sys.path.insert(0, str(ROOT.parent / "tools"))
+from pack_schema import (  # noqa: E402
+    CDN_CARDS_PACK,
+    FORBIDDEN_KEYS,
+    compile_schema,
+    format_issue,
+    iter_root_members,
+)
+from pack_write import DiscardWrite, open_atomic, write_manifest, write_pack  # noqa: E402
 
-MINOR_FUN_FACTS = {
-    "en": {
-        "ace": "Aces in {suit} are the first pulse of the element.",
-        "two": "Twos in {suit} highlight balance and early partnership.",
-        "three": "Threes in {suit} mark growth and the first results.",
-        "four": "Fours in {suit} bring stability and a needed pause.",
-        "five": "Fives in {suit} introduce friction that tests resolve.",
-        "six": "Sixes in {suit} show progress and shared momentum.",
-        "seven": "Sevens in {suit} signal tests of focus and stamina.",
-        "eight": "Eights in {suit} accelerate movement and decisive action.",
-        "nine": "Nines in {suit} reflect resilience near the finish.",
-        "ten": "Tens in {suit} close the cycle with full weight.",
-        "page": "Pages in {suit} point to learning, news, and curiosity.",
-        "knight": "Knights in {suit} act fast, driven by the suit's energy.",
-        "queen": "Queens in {suit} hold power inward with steady control.",
-        "king": "Kings in {suit} express mastery outwardly and confidently.",
-    },
-    "ru": {
-        "ace": "Тузы в {suit} — первый импульс стихии.",
-        "two": "Двойки в {suit} про баланс и ранний союз.",
-        "three": "Тройки в {suit} отмечают рост и первые результаты.",
-        "four": "Четверки в {suit} дают стабильность и паузу.",
-        "five": "Пятерки в {suit} вносят трение и проверку.",
-        "six": "Шестерки в {suit} показывают прогресс и поддержку.",
-        "seven": "Семерки в {suit} проверяют фокус и выносливость.",
-        "eight": "Восьмерки в {suit} ускоряют движение и решения.",
-        "nine": "Девятки в {suit} про стойкость перед финишем.",
-        "ten": "Десятки в {suit} закрывают цикл с полной нагрузкой.",
-        "page": "Пажи в {suit} — обучение, новости, любопытство.",
-        "knight": "Рыцари в {suit} действуют быстро, ведомые энергией масти.",
-        "queen": "Королевы в {suit} держат силу внутри, спокойно и твердо.",
-        "king": "Короли в {suit} выражают мастерство уверенно и вовне.",
-    },
-    "kk": {
-        "ace": "{suit} туздары — стихияның алғашқы импульсі.",
-        "two": "{suit} екілігі тепе-теңдік пен алғашқы серіктестік туралы.",
-        "three": "{suit} үштігі өсу мен алғашқы нәтижені көрсетеді.",
-        "four": "{suit} төрттігі тұрақтылық пен үзіліс береді.",
-        "five": "{suit} бестігі үйкеліс пен сынақты әкеледі.",
-        "six": "{suit} алтылығы ілгерілеу мен ортақ серпін.",
-        "seven": "{suit} жетілігі назар мен төзімділікті тексереді.",
-        "eight": "{suit} сегіздігі қозғалыс пен шешімді үдетеді.",
-        "nine": "{suit} тоғыздығы мәреге таяған төзімділік.",
-        "ten": "{suit} ондығы циклды толық салмақпен жабады.",
-        "page": "{suit} паждары — үйрену, хабар және қызығушылық.",
-        "knight": "{suit} серілері жылдам қимылдап, масть қуатымен жүреді.",
-        "queen": "{suit} ханымдары күшті іште ұстап, сабырлы басқарады.",
-        "king": "{suit} патшалары шеберлікті сыртқа сенімді шығарады.",
-    },
-}
+LOCALE_FILES = {"en": "en", "ru": "ru", "kk": "kz"}
+SUITS_TO_UPDATE = ("major", "wands", "cups")
 
-MAJOR_FUN_FACTS = {
-    "en": {
-        "major_00_fool": "The Fool opens the journey with risk and curiosity.",
-        "major_01_magician": "The Magician is the first figure to claim personal power.",
-        "major_02_high_priestess": "The High Priestess guards knowledge that isn't spoken.",
-        "major_03_empress": "The Empress represents creation, comfort, and embodied care.",
-        "major_04_emperor": "The Emperor is the archetype of structure and authority.",
-        "major_05_hierophant": "The Hierophant points to tradition and shared systems.",
-        "major_06_lovers": "The Lovers centers on alignment before commitment.",
-        "major_07_chariot": "The Chariot is about willpower steering opposing forces.",
-        "major_08_strength": "Strength highlights calm control rather than brute force.",
-        "major_09_hermit": "The Hermit steps back to find a private light.",
-        "major_10_wheel_of_fortune": "The Wheel of Fortune speaks to cycles you can't fully steer.",
-        "major_11_justice": "Justice weighs actions with clear consequences.",
-        "major_12_hanged_man": "The Hanged Man flips the view to unlock insight.",
-        "major_13_death": "Death marks an ending that makes room for the next phase.",
-        "major_14_temperance": "Temperance is the art of blending extremes into balance.",
-        "major_15_devil": "The Devil exposes attachments that feel like control.",
-        "major_16_tower": "The Tower breaks what is unstable so truth can surface.",
-        "major_17_star": "The Star is a quiet promise of renewal.",
-        "major_18_moon": "The Moon rules the night of doubt and intuition.",
-        "major_19_sun": "The Sun brings clarity, warmth, and visible results.",
-        "major_20_judgement": "Judgement is a call to answer for who you've become.",
-        "major_21_world": "The World closes a cycle with earned completion.",
-    },
-    "ru": {
-        "major_00_fool": "Шут открывает путь с риском и любопытством.",
-        "major_01_magician": "Маг — первая фигура, заявляющая личную силу.",
-        "major_02_high_priestess": "Верховная Жрица хранит знание, о котором не говорят.",
-        "major_03_empress": "Императрица — про создание, комфорт и заботу тела.",
-        "major_04_emperor": "Император — архетип структуры и власти.",
-        "major_05_hierophant": "Иерофант указывает на традиции и общие правила.",
-        "major_06_lovers": "Влюбленные — о согласии перед выбором.",
-        "major_07_chariot": "Колесница — воля, управляющая противоречиями.",
-        "major_08_strength": "Сила — спокойный контроль вместо грубой мощи.",
-        "major_09_hermit": "Отшельник отходит в тень ради внутреннего света.",
-        "major_10_wheel_of_fortune": "Колесо Фортуны — о циклах, которые не удержать.",
-        "major_11_justice": "Справедливость взвешивает поступки и последствия.",
-        "major_12_hanged_man": "Повешенный переворачивает взгляд ради инсайта.",
-        "major_13_death": "Смерть отмечает конец, освобождающий место новому.",
-        "major_14_temperance": "Умеренность — искусство смешивать крайности.",
-        "major_15_devil": "Дьявол показывает привязки, похожие на контроль.",
-        "major_16_tower": "Башня ломает шаткое, чтобы проявилась правда.",
-        "major_17_star": "Звезда — тихое обещание обновления.",
-        "major_18_moon": "Луна правит ночью сомнений и интуиции.",
-        "major_19_sun": "Солнце приносит ясность, тепло и заметный результат.",
-        "major_20_judgement": "Суд — вызов ответить за то, кем вы стали.",
-        "major_21_world": "Мир закрывает цикл заслуженным завершением.",
-    },
-    "kk": {
-        "major_00_fool": "Ақымақ сапарды тәуекел мен қызығушылықпен ашады.",
-        "major_01_magician": "Сиқыршы — жеке күшті алғаш жариялайтын бейне.",
-        "major_02_high_priestess": "Жоғарғы Жрица айтылмайтын білімді сақтайды.",
-        "major_03_empress": "Императрица — жарату, жайлылық және тән қамқорлығы.",
-        "major_04_emperor": "Император — құрылым мен биліктің архетипі.",
-        "major_05_hierophant": "Иерофант дәстүр мен ортақ қағидаларды меңзейді.",
-        "major_06_lovers": "Ғашықтар — таңдаудан бұрынғы үйлесім туралы.",
-        "major_07_chariot": "Арба — ерік қарсы күштерді басқарғанда.",
-        "major_08_strength": "Күш — дөрекі қуат емес, сабырлы бақылау.",
-        "major_09_hermit": "Тақуа ішкі жарық үшін шетке шегінеді.",
-        "major_10_wheel_of_fortune": "Бақыт Дөңгелегі — ұстап тұра алмайтын циклдар жайлы.",
-        "major_11_justice": "Әділет әрекет пен салдарды тең өлшейді.",
-        "major_12_hanged_man": "Асылған — басқа қырды көру үшін көзқарасты аудару.",
-        "major_13_death": "Өлім — жаңа кезеңге орын ашатын аяқталу.",
-        "major_14_temperance": "Ұстамдылық — шектілерді үйлестіру өнері.",
-        "major_15_devil": "Ібіліс бақылауға ұқсайтын тәуелділікті ашады.",
-        "major_16_tower": "Мұнара орнықсызды бұзып, ақиқатты шығарады.",
-        "major_17_star": "Жұлдыз — жаңарудың тыныш уәдесі.",
-        "major_18_moon": "Ай — күмән мен түйсік түнін басқарады.",
-        "major_19_sun": "Күн — айқындық, жылу және көрінетін нәтиже.",
-        "major_20_judgement": "Сот — кімге айналғаныңызға жауап беру шақыруы.",
-        "major_21_world": "Әлем — еңбектің аяқталған толық циклі.",
-    },
-}
+CARD_CHECK = compile_schema(CDN_CARDS_PACK["values"], FORBIDDEN_KEYS)
 
 
 def ensure_sentence(text: str) -> str:
@@ -154,42 +58,299 @@ def build_detailed(meaning: dict[str, str]) -> str:
     return " ".join(ensure_sentence(part) for part in parts)
 
 
-def build_fun_fact(locale: str, card_id: str) -> str:
-    if card_id.startswith("major_"):
-        return MAJOR_FUN_FACTS[locale][card_id]
-    suit = card_id.split("_", 1)[0]
-    rank = card_id.split("_", 2)[2]
-    template = MINOR_FUN_FACTS[locale][rank]
-    return template.format(suit=SUIT_FORMS[locale][suit])
-
+# Field -> how it is derived from the rest of the card.
+ENRICHERS: dict[str, Callable[[dict], Any]] = {
+    "detailedDescription": lambda card: build_detailed(card["meaning"]),
+}
+DEFAULT_FIELDS = tuple(ENRICHERS)
 
-def update_locale(locale: str) -> int:
-    path = DATA_DIR / f"cards_{locale}.json"
-    with path.open("r", encoding="utf-8") as handle:
-        data = json.load(handle)
 
-    updated = 0
-    for card_id, card in data.items():
-        suit = card_id.split("_", 1)[0]
-        if suit not in SUITS_TO_UPDATE:
-            continue
-        card["detailedDescription"] = build_detailed(card["meaning"])
-        card["funFact"] = build_fun_fact(locale, card_id)
-        updated += 1
+def check_card(card_id: str, card: dict, updated: dict, label: str) -> None:
+    """Refuse ``updated`` if it has an issue that ``card`` did not have."""
+    pointer = f"/{card_id}"
+    before: list = []
+    after: list = []
+    CARD_CHECK(card, pointer, before)
+    CARD_CHECK(updated, pointer, after)
+    added = [issue for issue in after if issue not in before]
+    if added:
+        raise ValueError("; ".join(format_issue(label, issue) for issue in added))
 
-    with path.open("w", encoding="utf-8") as handle:
-        json.dump(data, handle, ensure_ascii=False, indent=2)
-        handle.write("\n")
 
+def enrich_card(
+    card_id: str, card: dict, fields: Iterable[str], suits: Iterable[str]
+) -> Optional[dict]:
+    """The enriched card, or None when it is filtered out or already up to date."""
+    if card_id.split("_", 1)[0] not in suits:
+        return None
+    updated = {key: value for key, value in card.items() if key not in FORBIDDEN_KEYS}
+    for field in fields:
+        try:
+            updated[field] = ENRICHERS[field](card)
+        except (KeyError, TypeError, AttributeError) as exc:
+            raise ValueError(f"/{card_id}: cannot derive {field} ({type(exc).__name__}: {exc})") from exc
+    if updated == card:
+        return None
+    check_card(card_id, card, updated, "enriched card")
     return updated
 
 
-def main() -> None:
+def enrich_cards(
+    cards: dict[str, dict],
+    fields: Iterable[str] = DEFAULT_FIELDS,
+    suits: Iterable[str] = SUITS_TO_UPDATE,
+) -> int:
+    """Enrich a loaded pack in place; returns the number of changed cards."""
+    changed = 0
+    for card_id, card in cards.items():
+        updated = enrich_card(card_id, card, fields, suits)
+        if updated is not None:
+            cards[card_id] = updated
+            changed += 1
+    return changed
+
+
+def iter_cards(source: TextIO, path: Path) -> Iterator[tuple[str, dict, str]]:
+    """Stream ``(card_id, card, source text of the card)`` from a pack."""
+    root_type, members = iter_root_members(source, keep_raw=True)
+    if root_type != "object":
+        raise ValueError(f"{path}: root must be object")
+    return members
+
+
+def dump_card(card: dict) -> str:
+    return json.dumps(card, ensure_ascii=False, indent=2)
+
+
+def dump_member(card_id: str, card: dict, raw: Optional[str] = None) -> str:
+    # Same layout as json.dumps(pack, indent=2) of the whole pack; unchanged
+    # cards are copied as they were instead of being encoded again.
+    text = raw if raw is not None else dump_card(card).replace("\n", "\n  ")
+    return f"  {json.dumps(card_id, ensure_ascii=False)}: {text}"
+
+
+def card_diff(name: str, card_id: str, before: dict, after: dict) -> list[str]:
+    label = f"{name}#/{card_id}"
+    return list(
+        difflib.unified_diff(
+            (dump_card(before) + "\n").splitlines(keepends=True),
+            (dump_card(after) + "\n").splitlines(keepends=True),
+            fromfile=label,
+            tofile=label,
+        )
+    )
+
+
+def pack_name(locale: str) -> str:
+    return f"cards_{LOCALE_FILES[locale]}.json"
+
+
+def patch_path(patch_dir: Path, locale: str) -> Path:
+    return patch_dir / f"cards_{LOCALE_FILES[locale]}.patch.json"
+
+
+def rewrite_pack(
+    path: Path,
+    update: Callable[[str, dict], Optional[dict]],
+    write: bool = True,
+    on_change: Optional[Callable[[str, dict, dict], None]] = None,
+    finish: Optional[Callable[[], None]] = None,
+) -> tuple[int, int]:
+    """Stream ``path`` through ``update``; returns (changed cards, total cards).
+
+    ``update`` returns the new card, or None to keep the card as it is. With
+    ``write`` the pack is replaced atomically when any card changed and left
+    untouched otherwise. ``finish`` runs after the last card and before the
+    pack is replaced, so raising there also leaves it untouched.
+    """
+    changed = total = 0
+    with ExitStack() as stack:
+        # Entered first so it is committed after the source is closed.
+        out = stack.enter_context(open_atomic(path)) if write else None
+        source = stack.enter_context(path.open("r", encoding="utf-8"))
+        for card_id, card, text in iter_cards(source, path):
+            updated = update(card_id, card)
+            if out is not None:
+                if updated is None:
+                    member = dump_member(card_id, card, text)
+                else:
+                    member = dump_member(card_id, updated)
+                out.write(((",\n" if total else "{\n") + member).encode("utf-8"))
+            total += 1
+            if updated is None:
+                continue
+            changed += 1
+            if on_change is not None:
+                on_change(card_id, card, updated)
+        if finish is not None:
+            finish()
+        if out is not None:
+            out.write(b"\n}\n" if total else b"{}\n")
+            if not changed:
+                # Nothing to commit: leave the pack (and its mtime) untouched.
+                raise DiscardWrite
+    return changed, total
+
+
+def update_locale(
+    locale: str,
+    fields: Iterable[str] = DEFAULT_FIELDS,
+    suits: Iterable[str] = SUITS_TO_UPDATE,
+    dry_run: bool = False,
+    patch_dir: Optional[Path] = None,
+    manifest: bool = False,
+) -> tuple[int, int]:
+    """Enrich one pack; returns (changed cards, total cards).
+
+    By default the pack is rewritten when any card changed. ``dry_run`` prints
+    a diff of every changed card instead, and ``patch_dir`` collects only the
+    changed cards into ``cards_<locale>.patch.json`` there (see
+    ``apply_patch``); neither touches the pack.
+    """
+    name = pack_name(locale)
+    path = DATA_DIR / name
+    patch: dict[str, dict] = {}
+
+    def on_change(card_id: str, card: dict, updated: dict) -> None:
+        if dry_run:
+            sys.stdout.writelines(card_diff(name, card_id, card, updated))
+        elif patch_dir is not None:
+            patch[card_id] = updated
+
+    changed, total = rewrite_pack(
+        path,
+        lambda card_id, card: enrich_card(card_id, card, fields, suits),
+        write=not dry_run and patch_dir is None,
+        on_change=on_change,
+    )
+    if dry_run:
+        return changed, total
+    if patch_dir is not None:
+        text = json.dumps(patch, ensure_ascii=False, indent=2) + "\n"
+        write_pack(patch_path(patch_dir, locale), text, manifest)
+    elif manifest:
+        write_manifest(path, path.read_bytes())
+    return changed, total
+
+
+def apply_patch(
+    locale: str, patch_dir: Path, dry_run: bool = False, manifest: bool = False
+) -> tuple[int, int]:
+    """Merge ``cards_<locale>.patch.json`` from ``patch_dir`` into the pack.
+
+    Patched cards replace the pack's cards whole and go through the same
+    checks as enriched ones; a patch naming a card the pack does not have is
+    refused. Returns (changed cards, total cards).
+    """
+    name = pack_name(locale)
+    path = DATA_DIR / name
+    source = patch_path(patch_dir, locale)
+    with source.open("r", encoding="utf-8") as handle:
+        patch = json.load(handle)
+    if not isinstance(patch, dict) or not all(isinstance(card, dict) for card in patch.values()):
+        raise ValueError(f"{source}: must map card ids to card objects")
+    seen: set[str] = set()
+
+    def update(card_id: str, card: dict) -> Optional[dict]:
+        updated = patch.get(card_id)
+        if updated is None:
+            return None
+        seen.add(card_id)
+        if updated == card:
+            return None
+        check_card(card_id, card, updated, "patched card")
+        return updated
+
+    def finish() -> None:
+        missing = sorted(set(patch) - seen)
+        if missing:
+            raise ValueError(f"{source.name}: cards not in {name}: {', '.join(missing)}")
+
+    def on_change(card_id: str, card: dict, updated: dict) -> None:
+        if dry_run:
+            sys.stdout.writelines(card_diff(name, card_id, card, updated))
+
+    changed, total = rewrite_pack(path, update, not dry_run, on_change, finish)
+    if manifest and not dry_run:
+        write_manifest(path, path.read_bytes())
+    return changed, total
+
+
+def split_list(value: str) -> list[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Enrich the app card packs.")
+    parser.add_argument(
+        "--locales",
+        default=",".join(LOCALE_FILES),
+        help="Comma-separated locales to enrich.",
+    )
+    parser.add_argument(
+        "--suits",
+        default=",".join(SUITS_TO_UPDATE),
+        help="Comma-separated suits (first part of the card id) to enrich.",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print a diff of the cards that would change and write nothing.",
+    )
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--patch-dir",
+        type=Path,
+        default=None,
+        help="Write only the changed cards to cards_<locale>.patch.json here instead of the packs.",
+    )
+    mode.add_argument(
+        "--apply-patch",
+        type=Path,
+        default=None,
+        metavar="PATCH_DIR",
+        help="Merge the cards_<locale>.patch.json files from this directory into the packs.",
+    )
+    parser.add_argument(
+        "--manifest",
+        action="store_true",
+        help="Also write <pack>.manifest.json (size, sha256) next to every written pack.",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    locales = split_list(args.locales)
+    suits = split_list(args.suits)
+    unknown = [locale for locale in locales if locale not in LOCALE_FILES]
+    if unknown:
+        print(f"Unknown locale: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
     total = 0
-    for locale in ("en", "ru", "kk"):
-        total += update_locale(locale)
-    print(f"Updated {total} cards with detailed descriptions and fun facts.")
+    for locale in locales:
+        name = pack_name(locale)
+        try:
+            if args.apply_patch is None:
+                changed, cards = update_locale(
+                    locale, DEFAULT_FIELDS, suits, args.dry_run, args.patch_dir, args.manifest
+                )
+            elif patch_path(args.apply_patch, locale).exists():
+                changed, cards = apply_patch(locale, args.apply_patch, args.dry_run, args.manifest)
+            else:
+                print(f"{name}: no patch", file=sys.stderr)
+                continue
+        except ValueError as exc:
+            print(f"{name}: {exc}", file=sys.stderr)
+            return 1
+        print(f"{name}: {changed} of {cards} cards changed", file=sys.stderr)
+        total += changed
+    verb = "Would update" if args.dry_run else "Updated"
+    source = "from patches" if args.apply_patch is not None else f"({', '.join(DEFAULT_FIELDS)})"
+    print(f"{verb} {total} cards {source}.", file=sys.stderr)
+    return 0
 
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
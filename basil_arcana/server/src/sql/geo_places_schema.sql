@@ -26,9 +26,14 @@ CREATE TABLE IF NOT EXISTS geo_place_aliases (
   alias TEXT NOT NULL,
   alias_normalized TEXT NOT NULL,
   is_primary BOOLEAN NOT NULL DEFAULT FALSE,
+  -- source (GeoNames name/alternate), translit or translit_kk (built from a Cyrillic alias).
+  variant TEXT NOT NULL DEFAULT 'source',
   PRIMARY KEY (place_id, alias_normalized)
 );
 
+ALTER TABLE geo_place_aliases
+  ADD COLUMN IF NOT EXISTS variant TEXT NOT NULL DEFAULT 'source';
+
 CREATE INDEX IF NOT EXISTS geo_places_country_population_idx
   ON geo_places (country_code, population DESC);
 
@@ -38,7 +43,10 @@ CREATE INDEX IF NOT EXISTS geo_place_aliases_alias_norm_trgm_idx
 CREATE INDEX IF NOT EXISTS geo_place_aliases_place_id_idx
   ON geo_place_aliases (place_id);
 
--- Import example:
+-- Full reload (binary COPY into staging tables, then an atomic swap):
+--   python3 basil_arcana/tools/load_geo_reference.py --database-url "$DATABASE_URL"
+--
+-- Manual import example:
 --   \copy geo_places FROM 'server/data/geo/cis_places.csv' CSV HEADER;
 --   \copy geo_place_aliases FROM 'server/data/geo/cis_place_aliases.csv' CSV HEADER;
 
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark alias normalization over a GeoNames country dump.
+
+Collects every name/asciiname/alternate name from the populated places in a
+dump, checks that the optimized normalizer agrees with the straightforward
+reference implementation, and reports both timings as JSON.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import sys
+import time
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Callable, List
+
+import build_cis_cities_reference as geo
+import geo_text
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark GeoNames alias normalization.")
+    parser.add_argument(
+        "--zip",
+        default="basil_arcana/tools/.cache/geonames/RU.zip",
+        help="GeoNames country dump to read aliases from.",
+    )
+    parser.add_argument(
+        "--country",
+        default="",
+        help="Country code of the dump (defaults to the zip file stem).",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Timing runs per implementation (best run is reported).",
+    )
+    return parser.parse_args()
+
+
+def reference_normalize_alias(value: str) -> str:
+    text = value.strip().lower()
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", text)
+    text = text.replace("ё", "е")
+    text = re.sub(r"[^\w\s\-']", " ", text, flags=re.UNICODE)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text
+
+
+def reference_is_alias_usable(value: str) -> bool:
+    v = value.strip()
+    if not v:
+        return False
+    if len(v) < geo_text.ALIAS_MIN_LEN or len(v) > geo_text.ALIAS_MAX_LEN:
+        return False
+    if re.fullmatch(r"[\d\W_]+", v, flags=re.UNICODE):
+        return False
+    return True
+
+
+def collect_aliases(zip_path: Path, country_code: str) -> List[str]:
+    values: List[str] = []
+    for line in geo.iter_dump_lines(zip_path, country_code):
+        parts = line.split("\t")
+        if len(parts) < 19 or parts[6].strip() != "P":
+            continue
+        values.append(parts[1])
+        values.append(parts[2])
+        values.extend(parts[3].split(","))
+    return values
+
+
+def best_time(func: Callable[[str], object], values: List[str], repeat: int, reset: Callable[[], None]) -> float:
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        reset()
+        started = time.perf_counter()
+        for value in values:
+            func(value)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> int:
+    args = parse_args()
+    zip_path = Path(args.zip)
+    if not zip_path.exists():
+        print(f"Dump not found: {zip_path}", file=sys.stderr)
+        return 2
+    country = (args.country or zip_path.stem).upper()
+    values = collect_aliases(zip_path, country)
+    counts = Counter(values)
+
+    mismatches = [
+        value
+        for value in counts
+        if geo_text.normalize_alias(value) != reference_normalize_alias(value)
+        or geo_text.is_alias_usable(value) != reference_is_alias_usable(value)
+    ]
+
+    def noop() -> None:
+        return None
+
+    def fused_reference(value: str) -> object:
+        return reference_is_alias_usable(value) and reference_normalize_alias(value)
+
+    def fused_optimized(value: str) -> object:
+        return geo_text.is_alias_usable(value) and geo_text.normalize_alias(value)
+
+    reference_seconds = best_time(fused_reference, values, args.repeat, noop)
+    optimized_seconds = best_time(fused_optimized, values, args.repeat, geo_text.normalize_alias.cache_clear)
+    cache = geo_text.normalize_alias.cache_info()
+
+    print(
+        json.dumps(
+            {
+                "zip": str(zip_path),
+                "aliases": len(values),
+                "distinct_aliases": len(counts),
+                "ascii_share": round(sum(1 for v in values if v.isascii()) / max(1, len(values)), 3),
+                "mismatches": len(mismatches),
+                "mismatch_examples": mismatches[:10],
+                "reference_seconds": round(reference_seconds, 4),
+                "optimized_seconds": round(optimized_seconds, 4),
+                "speedup": round(reference_seconds / optimized_seconds, 2) if optimized_seconds else None,
+                "cache_hits": cache.hits,
+                "cache_misses": cache.misses,
+            },
+            ensure_ascii=False,
+            indent=2,
+        )
+    )
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Benchmark the CIS places build on synthetic GeoNames dumps.
+
+Writes GeoNames-format country zips of a chosen size and alias density (no
+download needed, same output for the same seed), times the pipeline stages in
+isolation -- dump reading, parsing, alias building, the CSV writers -- and the
+whole builder end to end, and reports throughput and memory as JSON.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zipfile
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import build_cis_cities_reference as geo
+import geo_text
+
+BUILDER = Path(__file__).resolve().with_name("build_cis_cities_reference.py")
+COUNTRY_NAMES = {
+    "RU": "Russia",
+    "KZ": "Kazakhstan",
+    "BY": "Belarus",
+    "KG": "Kyrgyzstan",
+    "UZ": "Uzbekistan",
+    "TJ": "Tajikistan",
+    "TM": "Turkmenistan",
+    "AM": "Armenia",
+    "AZ": "Azerbaijan",
+    "MD": "Moldova",
+}
+TIMEZONES = {
+    "RU": ["Europe/Moscow", "Asia/Yekaterinburg", "Asia/Novosibirsk", "Asia/Vladivostok"],
+    "KZ": ["Asia/Almaty", "Asia/Aqtobe"],
+    "BY": ["Europe/Minsk"],
+}
+# RU carries most rows, as in the real dumps.
+COUNTRY_WEIGHTS = {"RU": 6.0}
+FEATURE_CODES = ["PPL", "PPL", "PPL", "PPL", "PPLA", "PPLA2", "PPLA3", "PPLX", "PPLC", "PPLH", "PPLL"]
+SYLLABLES = ["ка", "но", "ва", "ли", "ро", "ми", "ск", "ов", "ин", "ев", "ар", "ты", "ма", "ол", "ье"]
+COMMON_NAMES = ["Ивановка", "Петровка", "Александровка", "Михайловка", "Новосёловка", "Берёзовка"]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the geo reference pipeline on synthetic dumps.")
+    parser.add_argument("--places", type=int, default=20000, help="Dump lines across all countries.")
+    parser.add_argument(
+        "--alias-density",
+        type=float,
+        default=6.0,
+        help="Average alternate names per place (the real RU dump is around 4-8).",
+    )
+    parser.add_argument("--countries", default="RU,KZ,BY", help="Comma-separated country codes.")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the synthetic dumps.")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Timing runs per isolated stage (best run is reported).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="--workers for the end-to-end builder run.",
+    )
+    parser.add_argument("--skip-end-to-end", action="store_true", help="Only time the isolated stages.")
+    parser.add_argument("--output", default="", help="Also write the JSON report to this file.")
+    return parser.parse_args()
+
+
+def synthetic_name(rnd: random.Random) -> str:
+    if rnd.random() < 0.15:
+        return rnd.choice(COMMON_NAMES)
+    return "".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 4))).capitalize()
+
+
+def latin(name: str) -> str:
+    return "".join(geo_text.CYRILLIC_TO_LATIN.get(ch, ch) for ch in name.lower()).capitalize()
+
+
+def synthetic_line(rnd: random.Random, geoname_id: int, country: str, alias_density: float) -> str:
+    name = synthetic_name(rnd)
+    ascii_name = latin(name)
+    alternates = []
+    for _ in range(int(rnd.expovariate(1 / alias_density)) if alias_density > 0 else 0):
+        kind = rnd.random()
+        if kind < 0.35:
+            alternates.append(synthetic_name(rnd))
+        elif kind < 0.55:
+            alternates.append(latin(synthetic_name(rnd)))
+        elif kind < 0.7:
+            alternates.append(name.upper())  # duplicate once normalized
+        elif kind < 0.8:
+            alternates.append(str(rnd.randint(100000, 999999)))  # postcode-like junk
+        elif kind < 0.9:
+            alternates.append(f"{name} {rnd.choice(['село', 'посёлок', 'станция'])}")
+        else:
+            alternates.append(f"https://ru.wikipedia.org/wiki/{ascii_name}")
+    feature_class = "P" if rnd.random() < 0.92 else rnd.choice(["A", "H", "T"])
+    population = rnd.choice([0, 0, 0, rnd.randint(10, 5000), rnd.randint(1000, 2_000_000)])
+    timezone = rnd.choice(TIMEZONES.get(country, ["Asia/Tashkent"]))
+    return "\t".join(
+        [
+            str(geoname_id),
+            name,
+            ascii_name,
+            ",".join(alternates),
+            f"{40 + rnd.random() * 30:.5f}",
+            f"{30 + rnd.random() * 100:.5f}",
+            feature_class,
+            rnd.choice(FEATURE_CODES),
+            country,
+            "",
+            f"{rnd.randint(1, 20):02d}",
+            str(rnd.randint(1, 99)),
+            "",
+            "",
+            str(population),
+            "",
+            str(rnd.randint(0, 500)),
+            timezone,
+            f"20{rnd.randint(10, 25)}-{rnd.randint(1, 12):02d}-{rnd.randint(1, 28):02d}",
+        ]
+    )
+
+
+def write_synthetic_dumps(
+    target: Path,
+    countries: List[str],
+    places: int,
+    alias_density: float,
+    seed: int,
+) -> Dict[str, int]:
+    """GeoNames-format countryInfo.txt, admin1CodesASCII.txt and <CC>.zip files."""
+    rnd = random.Random(seed)
+    target.mkdir(parents=True, exist_ok=True)
+    (target / "countryInfo.txt").write_text(
+        "#ISO\tISO3\tISO-Numeric\tfips\tCountry\n"
+        + "".join(f"{c}\t{c}X\t0\t{c}\t{COUNTRY_NAMES.get(c, c)}\n" for c in countries),
+        encoding="utf-8",
+    )
+    (target / "admin1CodesASCII.txt").write_text(
+        "".join(f"{c}.{i:02d}\tRegion {c}{i}\tRegion {c}{i}\t{i}\n" for c in countries for i in range(1, 21)),
+        encoding="utf-8",
+    )
+    weights = [COUNTRY_WEIGHTS.get(c, 1.0) for c in countries]
+    sizes = {c: int(places * w / sum(weights)) for c, w in zip(countries, weights)}
+    geoname_id = 100000
+    for country in countries:
+        lines = []
+        for _ in range(sizes[country]):
+            geoname_id += rnd.randint(1, 50)
+            lines.append(synthetic_line(rnd, geoname_id, country, alias_density))
+        with zipfile.ZipFile(target / f"{country}.zip", "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr(f"{country}.txt", "\n".join(lines) + "\n")
+            zf.writestr("readme.txt", "synthetic GeoNames dump\n")
+    return sizes
+
+
+def measure(func: Callable[[], int], repeat: int, reset: Callable[[], None]) -> Dict[str, float]:
+    """Best wall time over ``repeat`` runs, then one traced run for peak memory."""
+    best = float("inf")
+    rows = 0
+    for _ in range(max(1, repeat)):
+        reset()
+        started = time.perf_counter()
+        rows = func()
+        best = min(best, time.perf_counter() - started)
+    reset()
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "rows": rows,
+        "seconds": round(best, 4),
+        "rows_per_second": round(rows / best) if best > 0 else None,
+        "peak_traced_mb": round(peak / (1024 * 1024), 2),
+    }
+
+
+def parse_task(dump_dir: Path, country: str, spill_dir: Path) -> geo.ParseTask:
+    prefix = f"{country}."
+    return geo.ParseTask(
+        country_code=country,
+        country_name=COUNTRY_NAMES.get(country, country),
+        admin1_names={k: v for k, v in geo.load_admin1_names(dump_dir).items() if k.startswith(prefix)},
+        zip_path=dump_dir / f"{country}.zip",
+        min_population=0,
+        max_places=0,
+        max_aliases=geo.MAX_ALIASES_PER_PLACE,
+        spill_prefix=str(spill_dir / country),
+    )
+
+
+def run_end_to_end(dump_dir: Path, output_dir: Path, countries: List[str], workers: int) -> Dict[str, object]:
+    command = [
+        sys.executable,
+        str(BUILDER),
+        "--countries",
+        ",".join(countries),
+        "--download-dir",
+        str(dump_dir),
+        "--output-dir",
+        str(output_dir),
+        "--no-refresh",
+        "--workers",
+        str(workers),
+    ]
+    started = time.perf_counter()
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    seconds = time.perf_counter() - started
+    metadata = json.loads((output_dir / "cis_places_meta.json").read_text(encoding="utf-8"))
+    return {
+        "seconds": round(seconds, 3),
+        "places": metadata["places_count"],
+        "aliases": metadata["aliases_count"],
+        "places_per_second": round(metadata["places_count"] / seconds) if seconds > 0 else None,
+        "build_metrics": metadata.get("build_metrics"),
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    countries = [x.strip().upper() for x in args.countries.split(",") if x.strip()]
+    if not countries or args.places <= 0:
+        print("Need at least one country and a positive --places.", file=sys.stderr)
+        return 2
+
+    def noop() -> None:
+        return None
+
+    clear_alias_cache = geo_text.normalize_alias.cache_clear
+    with tempfile.TemporaryDirectory(prefix="bench_geo_") as tmp:
+        work = Path(tmp)
+        dump_dir = work / "dumps"
+        sizes = write_synthetic_dumps(dump_dir, countries, args.places, args.alias_density, args.seed)
+        dump_mb = sum((dump_dir / f"{c}.zip").stat().st_size for c in countries) / (1024 * 1024)
+        print(f"[bench] synthetic dumps: {sizes} ({dump_mb:.1f} MB zipped)", file=sys.stderr)
+
+        def read_lines() -> int:
+            return sum(1 for c in countries for _ in geo.iter_dump_lines(dump_dir / f"{c}.zip", c))
+
+        def parse() -> int:
+            count = 0
+            for country in countries:
+                task = parse_task(dump_dir, country, work)
+                for _ in geo.iter_country_places(
+                    country_code=task.country_code,
+                    country_name=task.country_name,
+                    admin1_names=task.admin1_names,
+                    zip_path=task.zip_path,
+                    min_population=0,
+                    max_places=0,
+                    max_aliases=task.max_aliases,
+                ):
+                    count += 1
+            return count
+
+        alias_inputs: List[Tuple[str, str, str]] = []
+        for country in countries:
+            for line in geo.iter_dump_lines(dump_dir / f"{country}.zip", country):
+                parts = line.split("\t")
+                if len(parts) >= 19 and parts[6] == "P":
+                    alias_inputs.append((parts[1], parts[2], parts[3]))
+
+        def build_aliases() -> int:
+            for name, ascii_name, alternates in alias_inputs:
+                geo.build_aliases(name, ascii_name, alternates, geo.MAX_ALIASES_PER_PLACE)
+            return len(alias_inputs)
+
+        # Spilled runs and alias files as the parse workers leave them, for the writers.
+        spill_dir = work / "spill"
+        spill_dir.mkdir()
+        results = [geo.run_parse_task(parse_task(dump_dir, c, spill_dir)) for c in countries]
+        place_runs = [path for result in results for path in result.place_runs]
+        alias_spills = [result.aliases_path for result in results]
+        merged_places = list(geo.iter_merged_places(place_runs))
+        alias_rows = sum(1 for path in alias_spills for _ in path.open("r", encoding="utf-8"))
+        out_dir = work / "out"
+
+        def write_places() -> int:
+            return geo.write_places_csv(out_dir / "cis_places.csv", merged_places)
+
+        def merge_and_write_places() -> int:
+            return geo.write_places_csv(out_dir / "cis_places.csv", geo.iter_merged_places(place_runs))
+
+        def write_aliases() -> int:
+            return geo.write_aliases_csv(out_dir / "cis_place_aliases.csv", alias_spills)
+
+        stages = {
+            "read_lines": measure(read_lines, args.repeat, noop),
+            "parse": measure(parse, args.repeat, clear_alias_cache),
+            "build_aliases": measure(build_aliases, args.repeat, clear_alias_cache),
+            "write_places": measure(write_places, args.repeat, noop),
+            "merge_and_write_places": measure(merge_and_write_places, args.repeat, noop),
+            "write_aliases": measure(write_aliases, args.repeat, noop),
+        }
+        report: Dict[str, object] = {
+            "synthetic": {
+                "seed": args.seed,
+                "lines_by_country": sizes,
+                "alias_density": args.alias_density,
+                "zipped_mb": round(dump_mb, 2),
+                "places": len(merged_places),
+                "aliases": alias_rows,
+            },
+            "stages": stages,
+        }
+        if not args.skip_end_to_end:
+            report["end_to_end"] = run_end_to_end(dump_dir, work / "e2e", countries, args.workers)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark the shared pack validator on synthetic card packs.
+
+Builds packs of the requested sizes by repeating the cards of a real pack under
+fresh IDs, then reports streaming validation time per MB and peak traced memory
+next to a plain json.load baseline.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from pack_schema import (
+    CARD_KEYS,
+    CARDS_PACK,
+    DECK_CARD_KEYS,
+    OPTIONAL_CARD_KEYS,
+    Issue,
+    PackValidator,
+)
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_SOURCE = REPO_ROOT / "cdn" / "data" / "cards_en.json"
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark card pack validation.")
+    parser.add_argument(
+        "--source",
+        default=str(DEFAULT_SOURCE),
+        help="Card pack whose entries are repeated to build synthetic packs.",
+    )
+    parser.add_argument(
+        "--sizes-mb",
+        default="1,8,32",
+        help="Comma-separated synthetic pack sizes in MB.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Timing runs per size (best run is reported).",
+    )
+    return parser.parse_args()
+
+
+def write_synthetic_pack(source: Dict[str, Any], target: Path, size_mb: float) -> int:
+    limit = int(size_mb * 1024 * 1024)
+    # Drop keys outside the schema so the run measures the happy path.
+    allowed = CARD_KEYS | OPTIONAL_CARD_KEYS | DECK_CARD_KEYS
+    entries = [
+        (card_id, {key: value for key, value in card.items() if key in allowed})
+        for card_id, card in source.items()
+    ]
+    written = 0
+    count = 0
+    with target.open("w", encoding="utf-8") as handle:
+        handle.write("{\n")
+        while written < limit:
+            card_id, card = entries[count % len(entries)]
+            prefix = ",\n" if count else ""
+            chunk = f"{prefix}{json.dumps(f'{card_id}_{count}')}: {json.dumps(card, ensure_ascii=False)}"
+            handle.write(chunk)
+            written += len(chunk.encode("utf-8"))
+            count += 1
+        handle.write("\n}\n")
+    return count
+
+
+def stream_validate(path: Path) -> int:
+    issues: List[Issue] = []
+    with path.open("r", encoding="utf-8") as handle:
+        PackValidator(CARDS_PACK).validate(handle, issues)
+    return len(issues)
+
+
+def load_whole(path: Path) -> int:
+    with path.open("r", encoding="utf-8") as handle:
+        return len(json.load(handle))
+
+
+def measure(func: Callable[[Path], int], path: Path, repeat: int) -> Dict[str, float]:
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        func(path)
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    func(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size_mb = path.stat().st_size / (1024 * 1024)
+    return {
+        "seconds": round(best, 4),
+        "ms_per_mb": round(best * 1000 / size_mb, 2),
+        "peak_traced_mb": round(peak / (1024 * 1024), 2),
+    }
+
+
+def main() -> int:
+    args = parse_args()
+    with Path(args.source).open("r", encoding="utf-8") as handle:
+        source = json.load(handle)
+    if not isinstance(source, dict) or not source:
+        print("Source pack must be a non-empty object.", file=sys.stderr)
+        return 2
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for raw_size in args.sizes_mb.split(","):
+            size_mb = float(raw_size)
+            path = Path(tmp) / f"cards_{raw_size}mb.json"
+            cards = write_synthetic_pack(source, path, size_mb)
+            print(f"[bench] {path.name}: {cards} cards", file=sys.stderr)
+            results.append(
+                {
+                    "size_mb": round(path.stat().st_size / (1024 * 1024), 2),
+                    "cards": cards,
+                    "stream_validate": measure(stream_validate, path, args.repeat),
+                    "json_load_only": measure(load_whole, path, args.repeat),
+                }
+            )
+
+    print(json.dumps({"source": args.source, "results": results}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -5,25 +5,46 @@ Build a CIS cities reference dataset from public GeoNames country dumps.
 Outputs:
   - places CSV (canonical city records)
   - aliases CSV (search aliases for autocomplete)
-  - metadata JSON (counts and source info)
+  - metadata JSON (counts, source info and build metrics)
 """
 
 from __future__ import annotations
 
 import argparse
+import cProfile
 import csv
+import heapq
 import io
 import json
-import re
+import os
 import sys
-import unicodedata
-import urllib.request
+import tempfile
+import time
 import zipfile
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
 from dataclasses import dataclass
+from functools import lru_cache
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Set, Tuple
+from sys import intern
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from geo_columnar import FORMATS as COLUMNAR_FORMATS
+from geo_columnar import export_columns, require_pyarrow
+from geo_dedup import NearDuplicateFilter
+from geo_download import DEFAULT_WORKERS as DEFAULT_DOWNLOAD_WORKERS
+from geo_download import download_files, load_checksums, log_results
+from geo_index import build_geo_index
+from geo_incremental import IncrementalBuild, row_digest
+from geo_metrics import BuildMetrics, timed
+from geo_query_log import QueryUsage, alias_hits, load_query_log, usage_summary
+from geo_search_index import build_search_index
+from geo_spatial_index import build_spatial_index
+from geo_text import VARIANT_SOURCE, is_alias_usable, normalize_alias, transliteration_variants
+from geo_timezones import build_timezone_table
+from pack_fetch import FetchError
 
 GEONAMES_BASE = "https://download.geonames.org/export/dump"
 
@@ -58,13 +79,19 @@ PREFERRED_FEATURE_CODES = {
     "PPLX",
 }
 
-ALIAS_MIN_LEN = 2
-ALIAS_MAX_LEN = 120
 MAX_ALIASES_PER_PLACE = 60
+DEFAULT_SHARD_MB = 64
+DEFAULT_RUN_ROWS = 100_000
+READ_BUFFER_BYTES = 1 << 20
 
+# (alias, alias_normalized, is_primary, variant)
+AliasRow = Tuple[str, str, int, str]
+ByteRange = Tuple[int, int]
 
-@dataclass(frozen=True)
-class PlaceRow:
+
+class PlaceRow(NamedTuple):
+    # Field order is the cis_places.csv column order. A tuple-backed record
+    # keeps a 500k-row RU run far smaller than a dict-backed dataclass.
     place_id: str
     geoname_id: int
     country_code: str
@@ -96,6 +123,27 @@ def parse_args() -> argparse.Namespace:
         default="basil_arcana/tools/.cache/geonames",
         help="Where to cache downloaded GeoNames files.",
     )
+    parser.add_argument(
+        "--base-url",
+        default=GEONAMES_BASE,
+        help="GeoNames dump base URL (e.g. a mirror).",
+    )
+    parser.add_argument(
+        "--download-workers",
+        type=int,
+        default=DEFAULT_DOWNLOAD_WORKERS,
+        help="Parallel GeoNames downloads.",
+    )
+    parser.add_argument(
+        "--no-refresh",
+        action="store_true",
+        help="Use cached GeoNames files as-is instead of revalidating them with the server.",
+    )
+    parser.add_argument(
+        "--checksums",
+        default="",
+        help="Optional sha256sum-style file with expected digests of the GeoNames files.",
+    )
     parser.add_argument(
         "--countries",
         default=",".join(DEFAULT_COUNTRIES),
@@ -119,6 +167,97 @@ def parse_args() -> argparse.Namespace:
         default=MAX_ALIASES_PER_PLACE,
         help="Max aliases stored per place after normalization/dedup.",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Parallel parse processes (1 = parse serially in-process).",
+    )
+    parser.add_argument(
+        "--shard-mb",
+        type=int,
+        default=DEFAULT_SHARD_MB,
+        help="Split country dumps larger than this (uncompressed MB) into line-range shards (0 = never).",
+    )
+    parser.add_argument(
+        "--run-rows",
+        type=int,
+        default=DEFAULT_RUN_ROWS,
+        help="Places per sorted run spilled to disk before the final k-way merge.",
+    )
+    parser.add_argument(
+        "--query-log",
+        default="",
+        help=(
+            "CSV of autocomplete picks (query, place_id[, count]); aliases of logged places are "
+            "ranked by how often their queries led to the place before --max-aliases-per-place applies."
+        ),
+    )
+    parser.add_argument(
+        "--max-unused-aliases",
+        type=int,
+        default=-1,
+        help=(
+            "With --query-log, keep at most this many never-matched alternate names per logged "
+            "place (-1 keeps them all)."
+        ),
+    )
+    parser.add_argument(
+        "--dedup-radius-km",
+        type=float,
+        default=0.0,
+        help=(
+            "Collapse places with the same country, admin1 and normalized name within this "
+            "radius into the most populous one (0 disables)."
+        ),
+    )
+    parser.add_argument(
+        "--columnar",
+        choices=COLUMNAR_FORMATS,
+        default=None,
+        help=(
+            "Also export cis_places.csv column-wise: npy (no dependencies), "
+            "parquet or arrow (need pyarrow)."
+        ),
+    )
+    parser.add_argument(
+        "--places-index",
+        action="store_true",
+        help="Also write cis_places.idx, a memory-mappable binary copy of cis_places.csv for lookups by place_id.",
+    )
+    parser.add_argument(
+        "--search-index",
+        action="store_true",
+        help="Also write cis_places_search.idx, a prebuilt prefix/trigram autocomplete index.",
+    )
+    parser.add_argument(
+        "--spatial-index",
+        action="store_true",
+        help="Also write cis_places_spatial.idx, a prebuilt nearest-place (reverse geocode) index.",
+    )
+    parser.add_argument(
+        "--timezones",
+        action="store_true",
+        help="Also write cis_timezones.idx, per-timezone UTC offset transition tables for offset lookups.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Also emit delta CSVs (upserts/deletions) against the previous build's state.",
+    )
+    parser.add_argument(
+        "--state-file",
+        default="",
+        help="State file for --incremental (default: <output-dir>/cis_places_state.sqlite).",
+    )
+    parser.add_argument(
+        "--profile",
+        default="",
+        help=(
+            "Write a cProfile of the build to this path (parse workers run in other "
+            "processes; add --workers 1 to include parsing)."
+        ),
+    )
     return parser.parse_args()
 
 
@@ -126,19 +265,20 @@ def ensure_dir(path: Path) -> None:
     path.mkdir(parents=True, exist_ok=True)
 
 
-def download_file(url: str, target: Path) -> None:
-    if target.exists():
-        return
-    print(f"[download] {url}", file=sys.stderr)
-    ensure_dir(target.parent)
-    with urllib.request.urlopen(url) as response:
-        data = response.read()
-    target.write_bytes(data)
+def download_sources(download_dir: Path, countries: List[str], args: argparse.Namespace) -> None:
+    names = ["countryInfo.txt", "admin1CodesASCII.txt"] + [f"{country}.zip" for country in countries]
+    checksums = load_checksums(Path(args.checksums)) if args.checksums else None
+    results = download_files(
+        [(f"{args.base_url.rstrip('/')}/{name}", download_dir / name) for name in names],
+        workers=max(1, args.download_workers),
+        checksums=checksums,
+        refresh=not args.no_refresh,
+    )
+    log_results(results)
 
 
 def load_country_names(download_dir: Path) -> Dict[str, str]:
     txt_path = download_dir / "countryInfo.txt"
-    download_file(f"{GEONAMES_BASE}/countryInfo.txt", txt_path)
     country_names: Dict[str, str] = {}
     for line in txt_path.read_text(encoding="utf-8").splitlines():
         if not line or line.startswith("#"):
@@ -155,7 +295,6 @@ def load_country_names(download_dir: Path) -> Dict[str, str]:
 
 def load_admin1_names(download_dir: Path) -> Dict[str, str]:
     txt_path = download_dir / "admin1CodesASCII.txt"
-    download_file(f"{GEONAMES_BASE}/admin1CodesASCII.txt", txt_path)
     mapping: Dict[str, str] = {}
     for line in txt_path.read_text(encoding="utf-8").splitlines():
         if not line:
@@ -170,59 +309,170 @@ def load_admin1_names(download_dir: Path) -> Dict[str, str]:
     return mapping
 
 
-def normalize_alias(value: str) -> str:
-    text = value.strip().lower()
-    if not text:
-        return ""
-    text = unicodedata.normalize("NFKC", text)
-    text = text.replace("ё", "е")
-    text = re.sub(r"[^\w\s\-']", " ", text, flags=re.UNICODE)
-    text = re.sub(r"\s+", " ", text).strip()
-    return text
-
-
-def is_alias_usable(value: str) -> bool:
-    v = value.strip()
-    if not v:
-        return False
-    if len(v) < ALIAS_MIN_LEN or len(v) > ALIAS_MAX_LEN:
-        return False
-    if re.fullmatch(r"[\d\W_]+", v, flags=re.UNICODE):
-        return False
-    return True
-
-
 def build_aliases(
     name: str,
     asciiname: str,
     alternates_raw: str,
     max_aliases: int,
-) -> List[Tuple[str, str, int]]:
+    stats: Optional[Dict[str, float]] = None,
+    queries: Optional[Dict[str, int]] = None,
+    max_unused: int = -1,
+) -> List[AliasRow]:
     values: List[str] = []
     if name:
         values.append(name)
     if asciiname and asciiname != name:
         values.append(asciiname)
+    fixed_values = len(values)
     if alternates_raw:
-        values.extend([x.strip() for x in alternates_raw.split(",") if x.strip()])
+        values.extend([x for x in map(str.strip, alternates_raw.split(",")) if x])
 
     seen_norm: Set[str] = set()
-    output: List[Tuple[str, str, int]] = []
+    output: List[AliasRow] = []
+    unusable = duplicate = over_limit = unused = 0
+    fixed = 0
     for i, raw in enumerate(values):
         if not is_alias_usable(raw):
+            unusable += 1
             continue
         norm = normalize_alias(raw)
         if not norm or norm in seen_norm:
+            duplicate += 1
             continue
         seen_norm.add(norm)
         is_primary = 1 if i == 0 else 0
-        output.append((raw, norm, is_primary))
-        if len(output) >= max_aliases:
+        output.append((raw, norm, is_primary, VARIANT_SOURCE))
+        if i < fixed_values:
+            fixed += 1
+        # With usage data every alternate is scored before truncating.
+        if queries is None and len(output) >= max_aliases:
+            over_limit = len(values) - i - 1
             break
+    if queries is not None:
+        output, over_limit, unused = rank_aliases_by_usage(output, fixed, queries, max_aliases, max_unused)
+    source_count = len(output)
+
+    # Latin spellings of the Cyrillic aliases, so Latin queries match without
+    # transliterating per keystroke. They do not count against max_aliases.
+    for _, norm, _, _ in list(output):
+        for text, variant in transliteration_variants(norm):
+            variant_norm = normalize_alias(text)
+            if not is_alias_usable(variant_norm) or variant_norm in seen_norm:
+                continue
+            seen_norm.add(variant_norm)
+            output.append((text, variant_norm, 0, variant))
+
+    if stats is not None:
+        stats["aliases_unusable"] += unusable
+        stats["aliases_duplicate"] += duplicate
+        stats["aliases_over_limit"] += over_limit
+        stats["alias_variants"] += len(output) - source_count
+        if queries is not None:
+            stats["aliases_unused"] += unused
+            stats["places_ranked_by_usage"] += 1
     return output
 
 
-def parse_country_dump(
+def rank_aliases_by_usage(
+    aliases: List[AliasRow],
+    fixed: int,
+    queries: Dict[str, int],
+    max_aliases: int,
+    max_unused: int,
+) -> Tuple[List[AliasRow], int, int]:
+    """Keep name/asciiname, then alternates by logged hits (ties in input order).
+
+    Returns the kept aliases, how many fell over max_aliases and how many
+    never-matched alternates were dropped by max_unused.
+    """
+    scored = sorted(
+        ((alias_hits(alias[1], queries), n, alias) for n, alias in enumerate(aliases[fixed:])),
+        key=lambda item: (-item[0], item[1]),
+    )
+    kept = aliases[:fixed]
+    unused_kept = unused_dropped = 0
+    for hits, _, alias in scored:
+        if hits == 0 and max_unused >= 0:
+            if unused_kept >= max_unused:
+                unused_dropped += 1
+                continue
+            unused_kept += 1
+        kept.append(alias)
+    over_limit = max(0, len(kept) - max_aliases)
+    return kept[:max_aliases], over_limit, unused_dropped
+
+
+@lru_cache(maxsize=1)
+def cached_query_log(path: str) -> QueryUsage:
+    # Loaded once per process; forked parse workers inherit the parent's copy.
+    return load_query_log(Path(path))
+
+
+@dataclass(frozen=True)
+class ParseTask:
+    country_code: str
+    country_name: str
+    admin1_names: Dict[str, str]
+    zip_path: Path
+    min_population: int
+    max_places: int
+    max_aliases: int
+    byte_range: Optional[ByteRange] = None
+    spill_prefix: str = ""
+    run_rows: int = DEFAULT_RUN_ROWS
+    query_log: str = ""
+    max_unused_aliases: int = -1
+
+
+def dump_member(zf: zipfile.ZipFile, country_code: str) -> zipfile.ZipInfo:
+    expected_txt = f"{country_code}.txt"
+    names = zf.namelist()
+    return zf.getinfo(expected_txt if expected_txt in names else names[0])
+
+
+def plan_shards(zip_path: Path, country_code: str, shard_bytes: int) -> List[Optional[ByteRange]]:
+    if shard_bytes <= 0:
+        return [None]
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        size = dump_member(zf, country_code).file_size
+    if size <= shard_bytes:
+        return [None]
+    count = -(-size // shard_bytes)
+    step = -(-size // count)
+    return [(start, min(start + step, size)) for start in range(0, size, step)]
+
+
+def iter_dump_lines(
+    zip_path: Path,
+    country_code: str,
+    byte_range: Optional[ByteRange] = None,
+) -> Iterator[str]:
+    # A line belongs to the shard that contains its first byte, so adjacent
+    # shards neither drop nor repeat lines at their boundaries.
+    start, end = byte_range if byte_range else (0, -1)
+    with zipfile.ZipFile(zip_path, "r") as zf:
+        with zf.open(dump_member(zf, country_code), "r") as raw:
+            fp = io.BufferedReader(raw, buffer_size=READ_BUFFER_BYTES)
+            offset = 0
+            if start > 0:
+                remaining = start - 1
+                while remaining > 0:
+                    skipped = len(fp.read(min(remaining, READ_BUFFER_BYTES)))
+                    if not skipped:
+                        return
+                    remaining -= skipped
+                offset = start
+                if fp.read(1) != b"\n":
+                    offset += len(fp.readline())
+            while end < 0 or offset < end:
+                line = fp.readline()
+                if not line:
+                    break
+                offset += len(line)
+                yield line.decode("utf-8").rstrip("\n")
+
+
+def iter_country_places(
     country_code: str,
     country_name: str,
     admin1_names: Dict[str, str],
@@ -230,160 +480,288 @@ def parse_country_dump(
     min_population: int,
     max_places: int,
     max_aliases: int,
-) -> Tuple[List[PlaceRow], Dict[str, List[Tuple[str, str, int]]]]:
-    places: List[PlaceRow] = []
-    aliases_by_place: Dict[str, List[Tuple[str, str, int]]] = {}
-    expected_txt = f"{country_code}.txt"
-    with zipfile.ZipFile(zip_path, "r") as zf:
-        txt_name = expected_txt if expected_txt in zf.namelist() else zf.namelist()[0]
-        with zf.open(txt_name, "r") as fp:
-            reader = io.TextIOWrapper(fp, encoding="utf-8", newline="")
-            for raw_line in reader:
-                line = raw_line.rstrip("\n")
-                if not line:
-                    continue
-                parts = line.split("\t")
-                if len(parts) < 19:
-                    continue
-                feature_class = parts[6].strip()
-                feature_code = parts[7].strip().upper()
-                if feature_class != "P":
-                    continue
-                if feature_code not in PREFERRED_FEATURE_CODES:
-                    continue
-                try:
-                    population = int(parts[14].strip() or "0")
-                except ValueError:
-                    population = 0
-                if population < min_population:
-                    continue
-
-                geoname_id_raw = parts[0].strip()
-                if not geoname_id_raw.isdigit():
-                    continue
-                geoname_id = int(geoname_id_raw)
-                place_id = str(geoname_id)
-                name = parts[1].strip()
-                asciiname = parts[2].strip()
-                alternates = parts[3].strip()
-                admin1_code = parts[10].strip()
-                admin2_code = parts[11].strip()
-                lat_raw = parts[4].strip()
-                lon_raw = parts[5].strip()
-                timezone_name = parts[17].strip()
-                modification_date = parts[18].strip()
-                if not name:
-                    continue
-                try:
-                    lat = float(lat_raw)
-                    lon = float(lon_raw)
-                except ValueError:
-                    continue
-                admin1_key = f"{country_code}.{admin1_code}" if admin1_code else ""
-                admin1_name = admin1_names.get(admin1_key, "")
-
-                row = PlaceRow(
-                    place_id=place_id,
-                    geoname_id=geoname_id,
-                    country_code=country_code,
-                    country_name=country_name,
-                    admin1_code=admin1_code,
-                    admin1_name=admin1_name,
-                    admin2_code=admin2_code,
-                    city_name=name,
-                    city_name_ascii=asciiname,
-                    latitude=lat,
-                    longitude=lon,
-                    timezone=timezone_name,
-                    population=population,
-                    feature_code=feature_code,
-                    modification_date=modification_date,
-                )
-                places.append(row)
-                aliases_by_place[place_id] = build_aliases(
-                    name=name,
-                    asciiname=asciiname,
-                    alternates_raw=alternates,
-                    max_aliases=max_aliases,
-                )
-                if max_places > 0 and len(places) >= max_places:
-                    break
-    return places, aliases_by_place
+    byte_range: Optional[ByteRange] = None,
+    stats: Optional[Dict[str, float]] = None,
+    usage: Optional[QueryUsage] = None,
+    max_unused_aliases: int = -1,
+) -> Iterator[Tuple[PlaceRow, List[AliasRow]]]:
+    # Counters and seconds for the build metrics; "read" is unzip plus line splitting.
+    stats = stats if stats is not None else defaultdict(float)
+    count = 0
+    for line in timed(iter_dump_lines(zip_path, country_code, byte_range), stats, "read_seconds"):
+        stats["lines"] += 1
+        if not line:
+            continue
+        parts = line.split("\t")
+        if len(parts) < 19:
+            stats["skipped_invalid"] += 1
+            continue
+        feature_class = parts[6].strip()
+        feature_code = parts[7].strip().upper()
+        if feature_class != "P":
+            stats["skipped_feature"] += 1
+            continue
+        if feature_code not in PREFERRED_FEATURE_CODES:
+            stats["skipped_feature"] += 1
+            continue
+        try:
+            population = int(parts[14].strip() or "0")
+        except ValueError:
+            population = 0
+        if population < min_population:
+            stats["skipped_population"] += 1
+            continue
+
+        geoname_id_raw = parts[0].strip()
+        if not geoname_id_raw.isdigit():
+            stats["skipped_invalid"] += 1
+            continue
+        geoname_id = int(geoname_id_raw)
+        place_id = str(geoname_id)
+        name = parts[1].strip()
+        asciiname = parts[2].strip()
+        alternates = parts[3].strip()
+        admin1_code = parts[10].strip()
+        admin2_code = parts[11].strip()
+        lat_raw = parts[4].strip()
+        lon_raw = parts[5].strip()
+        timezone_name = parts[17].strip()
+        modification_date = parts[18].strip()
+        if not name:
+            stats["skipped_invalid"] += 1
+            continue
+        try:
+            lat = float(lat_raw)
+            lon = float(lon_raw)
+        except ValueError:
+            stats["skipped_invalid"] += 1
+            continue
+        admin1_key = f"{country_code}.{admin1_code}" if admin1_code else ""
+        admin1_name = admin1_names.get(admin1_key, "")
+
+        # Low-cardinality columns repeat on every row; intern them so a run
+        # holds one copy of each distinct value.
+        row = PlaceRow(
+            place_id=place_id,
+            geoname_id=geoname_id,
+            country_code=country_code,
+            country_name=country_name,
+            admin1_code=intern(admin1_code),
+            admin1_name=admin1_name,
+            admin2_code=intern(admin2_code),
+            city_name=name,
+            city_name_ascii=asciiname,
+            latitude=lat,
+            longitude=lon,
+            timezone=intern(timezone_name),
+            population=population,
+            feature_code=intern(feature_code),
+            modification_date=intern(modification_date),
+        )
+        started = time.perf_counter()
+        aliases = build_aliases(
+            name=name,
+            asciiname=asciiname,
+            alternates_raw=alternates,
+            max_aliases=max_aliases,
+            stats=stats,
+            queries=usage.get(place_id) if usage else None,
+            max_unused=max_unused_aliases,
+        )
+        stats["alias_seconds"] += time.perf_counter() - started
+        stats["places"] += 1
+        stats["aliases"] += len(aliases)
+        yield row, aliases
+        count += 1
+        if max_places > 0 and count >= max_places:
+            break
+
+
+@dataclass(frozen=True)
+class ParseResult:
+    task: ParseTask
+    place_runs: List[Path]
+    aliases_path: Path
+    places_count: int
+    stats: Dict[str, float]
+
+
+def place_sort_key(row: PlaceRow) -> Tuple[str, int, str, int]:
+    # Prefer larger/popular places first when duplicates on same place_id are impossible.
+    return (row.country_code, -row.population, row.city_name.lower(), row.geoname_id)
 
 
-def write_places_csv(path: Path, rows: Iterable[PlaceRow]) -> int:
+def place_values_sort_key(values: List[str]) -> Tuple[str, int, str, int]:
+    return (values[2], -int(values[12]), values[7].lower(), int(values[1]))
+
+
+def spill_places_run(
+    rows: List[Tuple[PlaceRow, str]],
+    path: Path,
+    stats: Optional[Dict[str, float]] = None,
+) -> Path:
+    # Run rows are the CSV columns plus a trailing row digest for --incremental.
+    started = time.perf_counter()
+    rows.sort(key=lambda item: place_sort_key(item[0]))
+    sorted_at = time.perf_counter()
+    with path.open("w", encoding="utf-8", newline="") as fp:
+        writer = csv.writer(fp)
+        for row, digest in rows:
+            writer.writerow([*row, digest])
+    if stats is not None:
+        stats["sort_seconds"] += sorted_at - started
+        stats["spill_seconds"] += time.perf_counter() - sorted_at
+    return path
+
+
+def run_parse_task(task: ParseTask) -> ParseResult:
+    """Parse one shard, spilling sorted place runs and file-order aliases to disk."""
+    started = time.perf_counter()
+    stats: Dict[str, float] = defaultdict(float)
+    place_runs: List[Path] = []
+    pending: List[Tuple[PlaceRow, str]] = []
+    count = 0
+    aliases_path = Path(f"{task.spill_prefix}.aliases.csv")
+    with aliases_path.open("w", encoding="utf-8", newline="") as aliases_fp:
+        aliases_writer = csv.writer(aliases_fp)
+        for row, aliases in iter_country_places(
+            country_code=task.country_code,
+            country_name=task.country_name,
+            admin1_names=task.admin1_names,
+            zip_path=task.zip_path,
+            min_population=task.min_population,
+            max_places=task.max_places,
+            max_aliases=task.max_aliases,
+            byte_range=task.byte_range,
+            stats=stats,
+            usage=cached_query_log(task.query_log) if task.query_log else None,
+            max_unused_aliases=task.max_unused_aliases,
+        ):
+            count += 1
+            pending.append((row, row_digest(row, aliases)))
+            for alias, normalized, is_primary, variant in aliases:
+                aliases_writer.writerow([row.place_id, alias, normalized, is_primary, variant])
+            if len(pending) >= task.run_rows:
+                run_path = Path(f"{task.spill_prefix}.places.{len(place_runs):04d}.csv")
+                place_runs.append(spill_places_run(pending, run_path, stats))
+                pending = []
+    if pending:
+        run_path = Path(f"{task.spill_prefix}.places.{len(place_runs):04d}.csv")
+        place_runs.append(spill_places_run(pending, run_path, stats))
+    stats["seconds"] = time.perf_counter() - started
+    return ParseResult(
+        task=task,
+        place_runs=place_runs,
+        aliases_path=aliases_path,
+        places_count=count,
+        stats=dict(stats),
+    )
+
+
+def parse_countries(tasks: List[ParseTask], workers: int) -> Iterator[ParseResult]:
+    """Yield shard results in task order, whatever order workers finish in."""
+    if workers <= 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield run_parse_task(task)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as executor:
+        yield from executor.map(run_parse_task, tasks)
+
+
+def iter_merged_places(run_paths: List[Path]) -> Iterator[List[str]]:
+    handles = [path.open("r", encoding="utf-8", newline="") for path in run_paths]
+    try:
+        yield from heapq.merge(
+            *(csv.reader(handle) for handle in handles),
+            key=place_values_sort_key,
+        )
+    finally:
+        for handle in handles:
+            handle.close()
+
+
+PLACES_HEADER = [
+    "place_id",
+    "geoname_id",
+    "country_code",
+    "country_name",
+    "admin1_code",
+    "admin1_name",
+    "admin2_code",
+    "city_name",
+    "city_name_ascii",
+    "latitude",
+    "longitude",
+    "timezone",
+    "population",
+    "feature_code",
+    "modification_date",
+]
+
+ALIASES_HEADER = [
+    "place_id",
+    "alias",
+    "alias_normalized",
+    "is_primary",
+    "variant",
+]
+
+
+def write_places_csv(
+    path: Path,
+    rows: Iterable[List[str]],
+    delta: Optional[IncrementalBuild] = None,
+) -> int:
     ensure_dir(path.parent)
     count = 0
     with path.open("w", encoding="utf-8", newline="") as fp:
         writer = csv.writer(fp)
-        writer.writerow(
-            [
-                "place_id",
-                "geoname_id",
-                "country_code",
-                "country_name",
-                "admin1_code",
-                "admin1_name",
-                "admin2_code",
-                "city_name",
-                "city_name_ascii",
-                "latitude",
-                "longitude",
-                "timezone",
-                "population",
-                "feature_code",
-                "modification_date",
-            ]
-        )
+        writer.writerow(PLACES_HEADER)
         for row in rows:
             count += 1
-            writer.writerow(
-                [
-                    row.place_id,
-                    row.geoname_id,
-                    row.country_code,
-                    row.country_name,
-                    row.admin1_code,
-                    row.admin1_name,
-                    row.admin2_code,
-                    row.city_name,
-                    row.city_name_ascii,
-                    row.latitude,
-                    row.longitude,
-                    row.timezone,
-                    row.population,
-                    row.feature_code,
-                    row.modification_date,
-                ]
-            )
+            values = row[:-1]
+            writer.writerow(values)
+            if delta is not None:
+                delta.observe_place(values, row[-1])
     return count
 
 
 def write_aliases_csv(
     path: Path,
-    aliases_by_place: Dict[str, List[Tuple[str, str, int]]],
+    alias_spills: Iterable[Path],
+    delta: Optional[IncrementalBuild] = None,
+    skip_place_ids: Optional[Set[str]] = None,
 ) -> int:
     ensure_dir(path.parent)
     count = 0
-    with path.open("w", encoding="utf-8", newline="") as fp:
-        writer = csv.writer(fp)
-        writer.writerow(
-            [
-                "place_id",
-                "alias",
-                "alias_normalized",
-                "is_primary",
-            ]
-        )
-        for place_id, aliases in aliases_by_place.items():
-            for alias, normalized, is_primary in aliases:
-                count += 1
-                writer.writerow([place_id, alias, normalized, is_primary])
+    with path.open("w", encoding="utf-8", newline="") as fp, ExitStack() as stack:
+        delta_writer = stack.enter_context(delta.alias_writer()) if delta else None
+        csv.writer(fp).writerow(ALIASES_HEADER)
+        for spill in alias_spills:
+            with spill.open("r", encoding="utf-8", newline="") as src:
+                for line in src:
+                    # place_id is a bare numeric first column.
+                    if skip_place_ids and line[: line.find(",")] in skip_place_ids:
+                        continue
+                    count += 1
+                    fp.write(line)
+                    if delta_writer is not None:
+                        delta_writer.observe_line(line)
     return count
 
 
-def main() -> int:
-    args = parse_args()
+def country_metrics(stats: Dict[str, float]) -> Dict[str, object]:
+    output: Dict[str, object] = {
+        key: round(value, 3) if key.endswith("_seconds") or key == "seconds" else int(value)
+        for key, value in sorted(stats.items())
+    }
+    seconds = stats.get("seconds", 0.0)
+    output["places_per_second"] = round(stats.get("places", 0) / seconds) if seconds > 0 else None
+    return output
+
+
+def build(args: argparse.Namespace) -> int:
+    metrics = BuildMetrics()
     output_dir = Path(args.output_dir)
     download_dir = Path(args.download_dir)
     ensure_dir(output_dir)
@@ -394,47 +772,145 @@ def main() -> int:
         print("No countries provided.", file=sys.stderr)
         return 2
 
+    if args.columnar in ("parquet", "arrow"):
+        require_pyarrow()
+
+    query_log: Optional[Dict[str, object]] = None
+    if args.query_log:
+        try:
+            query_log = usage_summary(Path(args.query_log), cached_query_log(args.query_log))
+        except (OSError, ValueError) as exc:
+            print(f"[query-log] {exc}", file=sys.stderr)
+            return 2
+        print(f"[query-log] {query_log['picks']} picks for {query_log['places']} places", file=sys.stderr)
+
+    try:
+        with metrics.stage("download"):
+            download_sources(download_dir, countries, args)
+    except FetchError as exc:
+        print(f"[download] failed: {exc}", file=sys.stderr)
+        return 1
     country_names = load_country_names(download_dir)
     admin1_names = load_admin1_names(download_dir)
 
-    all_places: List[PlaceRow] = []
-    all_aliases: Dict[str, List[Tuple[str, str, int]]] = {}
     by_country_counts: Dict[str, int] = defaultdict(int)
-
-    for country in countries:
-        zip_path = download_dir / f"{country}.zip"
-        download_file(f"{GEONAMES_BASE}/{country}.zip", zip_path)
-        resolved_country_name = country_names.get(country, country)
-        print(f"[parse] {country} ({resolved_country_name})", file=sys.stderr)
-        places, aliases = parse_country_dump(
-            country_code=country,
-            country_name=resolved_country_name,
-            admin1_names=admin1_names,
-            zip_path=zip_path,
-            min_population=max(0, args.min_population),
-            max_places=max(0, args.max_places_per_country),
-            max_aliases=max(5, args.max_aliases_per_place),
-        )
-        all_places.extend(places)
-        all_aliases.update(aliases)
-        by_country_counts[country] += len(places)
-
-    # Prefer larger/popular places first when duplicates on same place_id are impossible.
-    all_places.sort(
-        key=lambda r: (r.country_code, -r.population, r.city_name.lower(), r.geoname_id)
-    )
+    max_places = max(0, args.max_places_per_country)
+    # A per-country cap keeps the first rows in file order, which is only
+    # well defined for an unsharded parse.
+    shard_bytes = 0 if max_places > 0 else max(0, args.shard_mb) * 1024 * 1024
 
     places_path = output_dir / "cis_places.csv"
     aliases_path = output_dir / "cis_place_aliases.csv"
     meta_path = output_dir / "cis_places_meta.json"
 
-    places_count = write_places_csv(places_path, all_places)
-    aliases_count = write_aliases_csv(aliases_path, all_aliases)
+    with tempfile.TemporaryDirectory(prefix="cis_places_") as spill_dir:
+        tasks: List[ParseTask] = []
+        for country in countries:
+            zip_path = download_dir / f"{country}.zip"
+            prefix = f"{country}."
+            for shard_index, byte_range in enumerate(plan_shards(zip_path, country, shard_bytes)):
+                tasks.append(
+                    ParseTask(
+                        country_code=country,
+                        country_name=country_names.get(country, country),
+                        admin1_names={k: v for k, v in admin1_names.items() if k.startswith(prefix)},
+                        zip_path=zip_path,
+                        min_population=max(0, args.min_population),
+                        max_places=max_places,
+                        max_aliases=max(5, args.max_aliases_per_place),
+                        byte_range=byte_range,
+                        spill_prefix=str(Path(spill_dir) / f"{len(tasks):04d}_{country}_{shard_index}"),
+                        run_rows=max(1, args.run_rows),
+                        query_log=args.query_log,
+                        max_unused_aliases=args.max_unused_aliases,
+                    )
+                )
+            print(f"[parse] {country} ({country_names.get(country, country)})", file=sys.stderr)
+
+        place_runs: List[Path] = []
+        alias_spills: List[Path] = []
+        # Summed over a country's shards, so seconds are worker time, not wall time.
+        country_stats: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        with metrics.stage("parse"):
+            for result in parse_countries(tasks, args.workers):
+                place_runs.extend(result.place_runs)
+                alias_spills.append(result.aliases_path)
+                by_country_counts[result.task.country_code] += result.places_count
+                for key, value in result.stats.items():
+                    country_stats[result.task.country_code][key] += value
+
+        delta: Optional[IncrementalBuild] = None
+        if args.incremental:
+            state_path = Path(args.state_file) if args.state_file else output_dir / "cis_places_state.sqlite"
+            delta = IncrementalBuild(
+                state_path=state_path,
+                countries=countries,
+                upserts_path=output_dir / "cis_places_delta_upserts.csv",
+                alias_upserts_path=output_dir / "cis_place_aliases_delta_upserts.csv",
+                deletions_path=output_dir / "cis_places_delta_deletions.csv",
+                places_header=PLACES_HEADER,
+                aliases_header=ALIASES_HEADER,
+            )
+
+        dedup: Optional[NearDuplicateFilter] = None
+        merged_places: Iterable[List[str]] = iter_merged_places(place_runs)
+        if args.dedup_radius_km > 0:
+            dedup = NearDuplicateFilter(args.dedup_radius_km, output_dir / "cis_places_merged.csv")
+            merged_places = dedup.filter(merged_places)
+
+        print(f"[merge] {len(place_runs)} sorted runs", file=sys.stderr)
+        with metrics.stage("merge_places"):
+            places_count = write_places_csv(places_path, merged_places, delta)
+        with metrics.stage("write_aliases"):
+            aliases_count = write_aliases_csv(
+                aliases_path, alias_spills, delta, dedup.merged_ids if dedup else None
+            )
+        if dedup is not None:
+            for country, merged in dedup.merged_by_country.items():
+                by_country_counts[country] -= merged
+            print(f"[dedup] merged {len(dedup.merged_ids)} near-duplicate places", file=sys.stderr)
+        if delta is not None:
+            with metrics.stage("incremental"):
+                delta.finish()
+
+    search_index: Optional[Dict[str, object]] = None
+    if args.search_index:
+        print("[index] building search index", file=sys.stderr)
+        with metrics.stage("search_index"):
+            search_index = build_search_index(places_path, aliases_path, output_dir / "cis_places_search.idx")
+    places_index: Optional[Dict[str, object]] = None
+    if args.places_index:
+        print("[index] building places index", file=sys.stderr)
+        with metrics.stage("places_index"):
+            places_index = build_geo_index(places_path, output_dir / "cis_places.idx")
+    columnar: Optional[Dict[str, object]] = None
+    if args.columnar:
+        print(f"[columnar] writing {args.columnar} columns", file=sys.stderr)
+        with metrics.stage("columnar"):
+            columnar = export_columns(places_path, output_dir, args.columnar)
+    spatial_index: Optional[Dict[str, object]] = None
+    if args.spatial_index:
+        print("[index] building spatial index", file=sys.stderr)
+        with metrics.stage("spatial_index"):
+            spatial_index = build_spatial_index(places_path, output_dir / "cis_places_spatial.idx")
+
+    timezones: Optional[Dict[str, object]] = None
+    if args.timezones:
+        print("[timezones] building offset transition tables", file=sys.stderr)
+        with metrics.stage("timezones"):
+            timezones = build_timezone_table(places_path, output_dir / "cis_timezones.idx")
+        if timezones["unknown_zones"]:
+            print(
+                f"[timezones] WARNING: no tz data for {len(timezones['unknown_zones'])} zones"
+                f" {timezones['unknown_zones']}; {timezones['places_without_zone']} places"
+                " have no offsets",
+                file=sys.stderr,
+            )
 
     metadata = {
         "generated_at_utc": datetime.now(timezone.utc).isoformat(),
         "source": "GeoNames dump (country files)",
-        "source_base_url": GEONAMES_BASE,
+        "source_base_url": args.base_url,
         "countries": countries,
         "min_population": max(0, args.min_population),
         "max_places_per_country": max(0, args.max_places_per_country),
@@ -446,6 +922,49 @@ def main() -> int:
             "aliases_csv": str(aliases_path),
         },
     }
+    if places_index is not None:
+        metadata["places_index"] = places_index
+    if columnar is not None:
+        metadata["columnar"] = columnar
+    if search_index is not None:
+        metadata["search_index"] = search_index
+    if spatial_index is not None:
+        metadata["spatial_index"] = spatial_index
+    if timezones is not None:
+        metadata["timezones"] = timezones
+    if query_log is not None:
+        query_log["aliases_unused_dropped"] = sum(
+            int(stats.get("aliases_unused", 0)) for stats in country_stats.values()
+        )
+        query_log["places_ranked"] = sum(
+            int(stats.get("places_ranked_by_usage", 0)) for stats in country_stats.values()
+        )
+        metadata["query_log"] = query_log
+    if dedup is not None:
+        metadata["dedup"] = dedup.summary()
+    if delta is not None:
+        metadata["incremental"] = delta.summary()
+
+    build_metrics = metrics.summary()
+    parse_seconds = metrics.stages.get("parse", 0.0)
+    totals: Dict[str, float] = defaultdict(float)
+    for stats in country_stats.values():
+        for key, value in stats.items():
+            totals[key] += value
+    build_metrics["parse_places_per_second"] = (
+        round(totals["places"] / parse_seconds) if parse_seconds > 0 else None
+    )
+    build_metrics["alias_rejections"] = {
+        "unusable": int(totals["aliases_unusable"]),
+        "duplicate": int(totals["aliases_duplicate"]),
+        "over_limit": int(totals["aliases_over_limit"]),
+    }
+    build_metrics["countries"] = {
+        country: country_metrics(stats) for country, stats in sorted(country_stats.items())
+    }
+    if args.profile:
+        build_metrics["profile"] = args.profile
+    metadata["build_metrics"] = build_metrics
     meta_path.write_text(
         json.dumps(metadata, ensure_ascii=False, indent=2),
         encoding="utf-8",
@@ -467,6 +986,18 @@ def main() -> int:
     return 0
 
 
+def main() -> int:
+    args = parse_args()
+    if not args.profile:
+        return build(args)
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(build, args)
+    finally:
+        profiler.dump_stats(args.profile)
+        print(f"[profile] wrote {args.profile}", file=sys.stderr)
+
+
 if __name__ == "__main__":
     raise SystemExit(main())
 
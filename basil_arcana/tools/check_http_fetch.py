@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Check the HTTP fetch paths against a local stand-in server.
+
+Starts a stdlib ``http.server`` on 127.0.0.1 that serves in-memory files with
+ETags, gzip, byte ranges and scripted faults, then drives pack_fetch and
+geo_download through the paths the CDN and the GeoNames mirror exercise only
+occasionally: plain 200, conditional 304, 5xx retry with backoff, gzip bodies
+(valid and corrupt), stale keep-alive sockets, 404 reporting, Range resume
+after a truncated body and checksum failures. Prints one line per check group
+and exits non-zero on any failure.
+
+    python3 basil_arcana/tools/check_http_fetch.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import hashlib
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import geo_download
+import pack_fetch
+from geo_download import download_files, part_path
+from pack_fetch import ConnectionPool, FetchError, fetch_one, fetch_packs
+
+PACK_BODY = ('{\n  "major_00_fool": {"title": "The Fool"}\n}\n' * 64).encode("utf-8")
+DUMP_BODY = bytes(range(256)) * 1024
+
+
+class StandIn:
+    """Files and per-path fault queues served by the stand-in, plus a request log."""
+
+    def __init__(self) -> None:
+        self.files: Dict[str, bytes] = {}
+        self.faults: Dict[str, List[str]] = {}
+        self.requests: List[Dict[str, str]] = []
+        self.lock = threading.Lock()
+
+    def next_fault(self, path: str) -> Optional[str]:
+        with self.lock:
+            queue = self.faults.get(path) or []
+            return queue.pop(0) if queue else None
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "StandInServer"
+
+    def log_message(self, format: str, *args: object) -> None:
+        return None
+
+    def send_body(self, status: int, body: bytes, headers: Dict[str, str]) -> None:
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        state = self.server.state
+        with state.lock:
+            state.requests.append({"path": self.path, **dict(self.headers.items())})
+        body = state.files.get(self.path)
+        if body is None:
+            self.send_body(404, b"", {})
+            return
+        fault = state.next_fault(self.path)
+        if fault == "503":
+            self.send_body(503, b"", {})
+            return
+        etag = etag_for(body)
+        headers = {"ETag": etag}
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        if fault == "truncate":
+            # Promise the whole body, send half of it and hang up.
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body[: len(body) // 2])
+            self.close_connection = True
+            return
+        byte_range = self.headers.get("Range") or ""
+        if byte_range.startswith("bytes=") and self.headers.get("If-Range") in (None, etag):
+            start = int(byte_range[len("bytes=") :].split("-")[0])
+            headers["Content-Range"] = f"bytes {start}-{len(body) - 1}/{len(body)}"
+            self.send_body(206, body[start:], headers)
+            return
+        if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            headers["Content-Encoding"] = "gzip"
+            body = b"\x1f\x8b not a gzip stream" if fault == "corrupt-gzip" else gzip.compress(body)
+        self.send_body(200, body, headers)
+        if fault == "close":
+            # Drop the keep-alive socket without telling the client.
+            self.close_connection = True
+
+
+class StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, state: StandIn) -> None:
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.state = state
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+def check_packs(state: StandIn, base: str, cache: Path) -> List[str]:
+    failures: List[str] = []
+
+    def expect(condition: bool, message: str) -> None:
+        if not condition:
+            failures.append(message)
+
+    state.files["/data/cards_en.json"] = PACK_BODY
+    state.files["/data/cards_ru.json"] = PACK_BODY
+    first = fetch_packs(f"{base}/data", ["cards_en.json"], cache)[0]
+    expect(first.status == 200 and first.attempts == 1, f"200: got HTTP {first.status}")
+    expect(first.path.read_bytes() == PACK_BODY, "200: gzip body was not decoded to the original")
+    expect(state.requests[-1].get("Accept-Encoding") == "gzip", "200: gzip was not requested")
+
+    second = fetch_packs(f"{base}/data", ["cards_en.json"], cache)[0]
+    expect(second.status == 304 and second.from_cache, f"304: got HTTP {second.status}")
+    expect(
+        state.requests[-1].get("If-None-Match") == etag_for(PACK_BODY),
+        "304: the cached ETag was not sent",
+    )
+    expect(second.path.read_bytes() == PACK_BODY, "304: cached copy changed")
+
+    state.faults["/data/cards_ru.json"] = ["503", "503"]
+    retried = fetch_packs(f"{base}/data", ["cards_ru.json"], cache, retries=3)[0]
+    expect(retried.status == 200 and retried.attempts == 3, f"5xx: {retried.attempts} attempts, expected 3")
+
+    state.files["/data/spreads_en.json"] = PACK_BODY
+    state.faults["/data/spreads_en.json"] = ["corrupt-gzip", "corrupt-gzip"]
+    errors: Dict[str, FetchError] = {}
+    results = fetch_packs(
+        f"{base}/data", ["spreads_en.json", "missing.json"], cache, retries=2, failures=errors
+    )
+    expect(not results, "failures: failed files were returned as results")
+    expect(
+        "Error -3" in str(errors.get("spreads_en.json", "")),
+        f"corrupt gzip: not recorded as FetchError ({errors.get('spreads_en.json')!r})",
+    )
+    expect("HTTP 404" in str(errors.get("missing.json", "")), "404: not recorded as FetchError")
+
+    # One pool and two requests, so the second one meets the socket the server dropped.
+    state.files["/data/spreads_ru.json"] = PACK_BODY
+    state.faults["/data/spreads_ru.json"] = ["close"]
+    pool = ConnectionPool()
+    try:
+        fetch_one(pool, f"{base}/data/spreads_ru.json", cache / "spreads_ru.json")
+        (cache / "spreads_ru.json.meta.json").unlink()
+        again = fetch_one(pool, f"{base}/data/spreads_ru.json", cache / "spreads_ru.json")
+    finally:
+        pool.close_all()
+    expect(
+        again.status == 200 and again.attempts == 1,
+        f"stale socket: {again.attempts} attempts, expected an immediate reconnect",
+    )
+    return failures
+
+
+def check_downloads(state: StandIn, base: str, cache: Path) -> List[str]:
+    failures: List[str] = []
+
+    def expect(condition: bool, message: str) -> None:
+        if not condition:
+            failures.append(message)
+
+    digest = hashlib.sha256(DUMP_BODY).hexdigest()
+    state.files["/dump/RU.zip.bin"] = DUMP_BODY
+    state.faults["/dump/RU.zip.bin"] = ["truncate"]
+    target = cache / "RU.zip.bin"
+    url = f"{base}/dump/RU.zip.bin"
+    first = download_files([(url, target)], retries=3, checksums={target.name: digest})[0]
+    half = len(DUMP_BODY) // 2
+    expect(
+        first.status == 200 and first.attempts == 2 and first.resumed_from == half,
+        f"resume: attempts {first.attempts}, resumed at {first.resumed_from}, expected 2 and {half}",
+    )
+    expect(
+        state.requests[-1].get("Range") == f"bytes={half}-"
+        and state.requests[-1].get("If-Range") == etag_for(DUMP_BODY),
+        "resume: the second request did not ask for the missing range with If-Range",
+    )
+    expect(target.read_bytes() == DUMP_BODY and first.sha256 == digest, "resume: file differs")
+    expect(not part_path(target).exists(), "resume: .part file left behind")
+
+    second = download_files([(url, target)], checksums={target.name: digest})[0]
+    expect(second.status == 304 and second.from_cache, f"304: got HTTP {second.status}")
+
+    state.files["/dump/KZ.zip.bin"] = DUMP_BODY
+    bad = cache / "KZ.zip.bin"
+    try:
+        download_files([(f"{base}/dump/KZ.zip.bin", bad)], checksums={bad.name: "0" * 64})
+        failures.append("checksum: a mismatching file was accepted")
+    except FetchError as exc:
+        expect("does not match expected" in str(exc), f"checksum: unexpected error {exc}")
+    expect(not bad.exists() and not part_path(bad).exists(), "checksum: rejected file was kept")
+    return failures
+
+
+CHECKS: Dict[str, Callable[[StandIn, str, Path], List[str]]] = {
+    "pack_fetch": check_packs,
+    "geo_download": check_downloads,
+}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Check the HTTP fetch paths against a local stand-in.")
+    parser.add_argument(
+        "--backoff",
+        type=float,
+        default=0.01,
+        help="Retry backoff base in seconds while checking (the real default is much longer).",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    pack_fetch.BACKOFF_BASE_SECONDS = args.backoff
+    geo_download.BACKOFF_BASE_SECONDS = args.backoff
+    failed = 0
+    for name, check in CHECKS.items():
+        state = StandIn()
+        server = StandInServer(state)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            with tempfile.TemporaryDirectory(prefix="check_fetch_") as tmp:
+                try:
+                    failures = check(state, server.base_url, Path(tmp))
+                except FetchError as exc:
+                    failures = [f"unexpected FetchError: {exc}"]
+        finally:
+            server.shutdown()
+            server.server_close()
+        for failure in failures:
+            print(f"[check] {name}: FAIL {failure}", file=sys.stderr)
+        if not failures:
+            print(f"[check] {name}: ok ({len(state.requests)} requests)", file=sys.stderr)
+        failed += bool(failures)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
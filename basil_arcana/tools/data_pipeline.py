@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+"""
+One-command data release: generate -> enrich -> validate -> export.
+
+Stages form a DAG and run on a thread pool as soon as their dependencies are
+done. Card and spread packs are loaded once into a shared ``PackStore``;
+stages edit them in memory, and only the export stage writes packs back to
+disk (atomically, see pack_write), after validation passed and only where
+the content changed.
+
+A stage is skipped when its fingerprint (its code, external inputs, settings
+and the fingerprints of the stages it depends on) matches the one recorded by
+the previous run and its outputs on disk are still the ones that run left.
+
+Run a release (``--geo`` also rebuilds the GeoNames reference in parallel):
+    python3 basil_arcana/tools/data_pipeline.py
+    python3 basil_arcana/tools/data_pipeline.py --geo --geo-args "--countries RU,KZ"
+"""
+
+from __future__ import annotations
+
+import argparse
+import copy
+import hashlib
+import json
+import shlex
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import generate_cards_data
+from pack_consistency import diff_indexes
+from pack_schema import (
+    CARDS_PACK,
+    CDN_CARDS_PACK,
+    CDN_SPREADS_PACK,
+    FORBIDDEN_KEYS,
+    SPREADS_PACK,
+    PackValidator,
+    format_issue,
+)
+from pack_write import write_atomic, write_manifest, write_pack
+from validate_data import validate_payload
+
+ROOT = Path(__file__).resolve().parents[1]
+TOOLS_DIR = ROOT / "tools"
+SCRIPTS_DIR = ROOT / "app_flutter" / "scripts"
+CDN_DATA_DIR = generate_cards_data.CDN_DATA_DIR
+APP_DATA_DIR = generate_cards_data.APP_DATA_DIR
+GEO_OUTPUT_DIR = ROOT / "server" / "data" / "geo"
+GEO_OUTPUTS = ("cis_places.csv", "cis_place_aliases.csv", "cis_places_meta.json")
+DEFAULT_STATE_FILE = TOOLS_DIR / ".cache" / "pipeline_state.json"
+LOCALES = ("en", "ru", "kk")
+
+sys.path.insert(0, str(SCRIPTS_DIR))
+import generate_tarot_content  # noqa: E402
+
+# Packs in cdn/ must meet the CDN contract; the app copies the local schema.
+VALIDATORS = {
+    CDN_DATA_DIR: (
+        PackValidator(CDN_CARDS_PACK, forbidden=FORBIDDEN_KEYS),
+        PackValidator(CDN_SPREADS_PACK, forbidden=FORBIDDEN_KEYS),
+    ),
+    APP_DATA_DIR: (PackValidator(CARDS_PACK), PackValidator(SPREADS_PACK)),
+}
+
+
+class StageError(RuntimeError):
+    pass
+
+
+def file_digest(path: Path) -> Optional[str]:
+    if not path.exists():
+        return None
+    digest = hashlib.sha256()
+    with path.open("rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def relative(path: Path) -> str:
+    try:
+        return str(path.relative_to(ROOT))
+    except ValueError:
+        return str(path)
+
+
+def cards_path(directory: Path, locale: str) -> Path:
+    return directory / f"cards_{generate_cards_data.LOCALE_FILE_MAP[locale]}.json"
+
+
+def spreads_path(directory: Path, locale: str) -> Path:
+    return directory / f"spreads_{generate_cards_data.LOCALE_FILE_MAP[locale]}.json"
+
+
+class PackStore:
+    """JSON packs loaded at most once per run and shared by all stages."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._packs: Dict[Path, Any] = {}
+        # sha256 of each pack as it is on disk, to write back only real changes.
+        self._digests: Dict[Path, Optional[str]] = {}
+
+    def get(self, path: Path) -> Any:
+        with self._lock:
+            if path not in self._packs:
+                data = path.read_bytes()
+                self._digests[path] = hashlib.sha256(data).hexdigest()
+                self._packs[path] = json.loads(data)
+            return self._packs[path]
+
+    def put(self, path: Path, payload: Any) -> None:
+        with self._lock:
+            if path not in self._digests:
+                self._digests[path] = file_digest(path)
+            self._packs[path] = payload
+
+    def holds(self, path: Path) -> bool:
+        return path in self._packs
+
+    def flush(self, manifest: bool = False) -> List[Path]:
+        """Write back every pack whose serialized content differs from disk."""
+        written = []
+        with self._lock:
+            for path, payload in self._packs.items():
+                text = generate_cards_data.dump_pack(payload)
+                digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+                if digest == self._digests.get(path):
+                    continue
+                write_pack(path, text, manifest)
+                self._digests[path] = digest
+                written.append(path)
+        return written
+
+
+@dataclass
+class Stage:
+    name: str
+    run: Callable[[PackStore], str]
+    deps: Tuple[str, ...] = ()
+    code: Tuple[Path, ...] = ()
+    inputs: Tuple[Path, ...] = ()
+    outputs: Tuple[Path, ...] = ()
+    settings: str = ""
+    cached: bool = True
+
+    def fingerprint(self, upstream: List[str]) -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{self.name}\0{self.settings}\0".encode("utf-8"))
+        for path in (*self.code, *self.inputs):
+            digest.update(f"{relative(path)}={file_digest(path)}\0".encode("utf-8"))
+        for value in upstream:
+            digest.update(value.encode("ascii"))
+        return digest.hexdigest()
+
+    def output_digests(self) -> Dict[str, Optional[str]]:
+        return {relative(path): file_digest(path) for path in self.outputs}
+
+
+def generate_stage(locale: str) -> Stage:
+    def run(store: PackStore) -> str:
+        cards = store.get(cards_path(CDN_DATA_DIR, locale))
+        refreshed = generate_cards_data.refresh_locale_cards(locale, cards)
+        # Both copies get the same generated pack, as in write_locale.
+        store.put(cards_path(APP_DATA_DIR, locale), copy.deepcopy(cards))
+        return f"{refreshed} of {len(cards)} cards generated"
+
+    return Stage(
+        name=f"generate:{locale}",
+        run=run,
+        code=(TOOLS_DIR / "generate_cards_data.py",),
+        inputs=(cards_path(CDN_DATA_DIR, locale),),
+        outputs=(cards_path(CDN_DATA_DIR, locale), cards_path(APP_DATA_DIR, locale)),
+    )
+
+
+def enrich_stage(locale: str) -> Stage:
+    def run(store: PackStore) -> str:
+        cards = store.get(cards_path(APP_DATA_DIR, locale))
+        enriched = generate_tarot_content.enrich_cards(cards)
+        return f"{enriched} cards enriched"
+
+    return Stage(
+        name=f"enrich:{locale}",
+        run=run,
+        deps=(f"generate:{locale}",),
+        code=(SCRIPTS_DIR / "generate_tarot_content.py",),
+        inputs=(cards_path(APP_DATA_DIR, locale),),
+        outputs=(cards_path(APP_DATA_DIR, locale),),
+        settings=",".join((*generate_tarot_content.DEFAULT_FIELDS, *generate_tarot_content.SUITS_TO_UPDATE)),
+    )
+
+
+def validate_stage() -> Stage:
+    def run(store: PackStore) -> str:
+        errors: List[str] = []
+        packs = 0
+        for directory, (cards_validator, spreads_validator) in VALIDATORS.items():
+            indexes = []
+            for locale in LOCALES:
+                for path, validator in (
+                    (cards_path(directory, locale), cards_validator),
+                    (spreads_path(directory, locale), spreads_validator),
+                ):
+                    indexes.append(
+                        validate_payload(path.name, store.get(path), validator, errors, relative(path))
+                    )
+                    packs += 1
+            for name, pointer, message in diff_indexes(indexes):
+                errors.append(format_issue(relative(directory / name), (pointer, message)))
+        for err in errors:
+            print(f"ERROR: {err}", file=sys.stderr)
+        if errors:
+            raise StageError(f"{len(errors)} validation errors")
+        return f"{packs} packs valid"
+
+    return Stage(
+        name="validate",
+        run=run,
+        deps=tuple(f"enrich:{locale}" for locale in LOCALES),
+        code=tuple(
+            TOOLS_DIR / name
+            for name in ("pack_schema.py", "pack_consistency.py", "validate_data.py", "data_pipeline.py")
+        ),
+        inputs=tuple(spreads_path(directory, locale) for directory in VALIDATORS for locale in LOCALES),
+    )
+
+
+def export_stage(manifest: bool) -> Stage:
+    def run(store: PackStore) -> str:
+        written = store.flush(manifest)
+        if manifest:
+            # Packs nothing wrote this run still need a current manifest.
+            for directory in VALIDATORS:
+                for locale in LOCALES:
+                    for path in (cards_path(directory, locale), spreads_path(directory, locale)):
+                        write_manifest(path, path.read_bytes())
+        return f"wrote {', '.join(relative(path) for path in written)}" if written else "no changes"
+
+    return Stage(name="export", run=run, deps=("validate",), cached=False)
+
+
+def geo_stage(output_dir: Path, extra_args: str) -> Stage:
+    builder = TOOLS_DIR / "build_cis_cities_reference.py"
+    command = [sys.executable, str(builder), "--output-dir", str(output_dir), *shlex.split(extra_args)]
+
+    def run(store: PackStore) -> str:
+        # The builder's default paths are relative to the repository's parent.
+        result = subprocess.run(command, cwd=ROOT.parent)
+        if result.returncode != 0:
+            raise StageError(f"build_cis_cities_reference.py exited with {result.returncode}")
+        return f"wrote {relative(output_dir)}"
+
+    return Stage(
+        name="geo",
+        run=run,
+        code=(builder, *sorted(TOOLS_DIR.glob("geo_*.py"))),
+        outputs=tuple(output_dir / name for name in GEO_OUTPUTS),
+        settings=shlex.join(command[2:]),
+    )
+
+
+def build_stages(args: argparse.Namespace) -> List[Stage]:
+    stages = [generate_stage(locale) for locale in LOCALES]
+    stages += [enrich_stage(locale) for locale in LOCALES]
+    stages += [validate_stage(), export_stage(args.manifest)]
+    if args.geo:
+        stages.append(geo_stage(Path(args.geo_output_dir).resolve(), args.geo_args))
+    return stages
+
+
+def load_state(path: Path) -> Dict[str, Any]:
+    try:
+        with path.open("r", encoding="utf-8") as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return {}
+
+
+def is_fresh(stage: Stage, fingerprint: str, state: Dict[str, Any]) -> bool:
+    previous = state.get(stage.name)
+    return (
+        previous is not None
+        and previous.get("fingerprint") == fingerprint
+        and previous.get("outputs") == stage.output_digests()
+    )
+
+
+def run_stage(stage: Stage, store: PackStore) -> Tuple[float, str]:
+    started = time.perf_counter()
+    detail = stage.run(store)
+    return time.perf_counter() - started, detail
+
+
+def run_pipeline(
+    stages: List[Stage], store: PackStore, state: Dict[str, Any], workers: int, force: bool
+) -> Dict[str, Dict[str, Any]]:
+    """Run stages in dependency order and return the result of each."""
+    results: Dict[str, Dict[str, Any]] = {}
+    fingerprints: Dict[str, str] = {}
+    pending = list(stages)
+    running: Dict[Future, Stage] = {}
+    failed = False
+
+    def log(name: str) -> None:
+        result = results[name]
+        timing = f" in {result['seconds']:.2f}s" if "seconds" in result else ""
+        print(f"[pipeline] {name}: {result['status']}{timing} ({result['detail']})", file=sys.stderr)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            # Stages come in dependency order, so one pass also starts stages
+            # unblocked by a skip earlier in the same pass.
+            for stage in list(pending):
+                if failed:
+                    break
+                if not all(results.get(dep, {}).get("status") in ("ran", "skipped") for dep in stage.deps):
+                    continue
+                pending.remove(stage)
+                fingerprint = stage.fingerprint([fingerprints[dep] for dep in stage.deps])
+                fingerprints[stage.name] = fingerprint
+                if stage.cached and not force and is_fresh(stage, fingerprint, state):
+                    results[stage.name] = {"status": "skipped", "detail": "unchanged"}
+                    log(stage.name)
+                    continue
+                running[executor.submit(run_stage, stage, store)] = stage
+            if not running:
+                break
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                try:
+                    seconds, detail = future.result()
+                except Exception as exc:
+                    failed = True
+                    results[stage.name] = {"status": "failed", "detail": str(exc) or type(exc).__name__}
+                else:
+                    results[stage.name] = {"status": "ran", "seconds": round(seconds, 3), "detail": detail}
+                log(stage.name)
+
+    for stage in pending:
+        results[stage.name] = {"status": "not run", "detail": "upstream failed"}
+        log(stage.name)
+    return results
+
+
+def record_state(
+    stages: List[Stage], store: PackStore, state: Dict[str, Any], results: Dict[str, Dict[str, Any]]
+) -> None:
+    exported = results.get("export", {}).get("status") == "ran"
+    # Packs are inputs as well as outputs, so fingerprints are taken again
+    # over what this run left on disk; rerunning on that would change nothing.
+    fingerprints: Dict[str, str] = {}
+    for stage in stages:
+        fingerprints[stage.name] = stage.fingerprint([fingerprints[dep] for dep in stage.deps])
+        if not stage.cached or results[stage.name]["status"] not in ("ran", "skipped"):
+            continue
+        # Pack edits only reach disk through the export stage.
+        if not exported and any(store.holds(path) for path in stage.outputs):
+            continue
+        state[stage.name] = {"fingerprint": fingerprints[stage.name], "outputs": stage.output_digests()}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Build, enrich, validate and export the data packs.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Stages run at the same time.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Run every stage even if its inputs are unchanged.",
+    )
+    parser.add_argument(
+        "--state-file",
+        default=str(DEFAULT_STATE_FILE),
+        help="Where stage fingerprints are kept between runs.",
+    )
+    parser.add_argument(
+        "--manifest",
+        action="store_true",
+        help="Keep <pack>.manifest.json (size, sha256) next to every pack, written after the pack.",
+    )
+    parser.add_argument(
+        "--geo",
+        action="store_true",
+        help="Also rebuild the GeoNames places reference.",
+    )
+    parser.add_argument(
+        "--geo-output-dir",
+        default=str(GEO_OUTPUT_DIR),
+        help="Output directory of the places reference.",
+    )
+    parser.add_argument(
+        "--geo-args",
+        default="",
+        help='Extra build_cis_cities_reference.py arguments (e.g. "--countries RU,KZ").',
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    started = time.perf_counter()
+    stages = build_stages(args)
+    state_file = Path(args.state_file)
+    state = load_state(state_file)
+    store = PackStore()
+
+    results = run_pipeline(stages, store, state, max(1, args.workers), args.force)
+    record_state(stages, store, state, results)
+    write_atomic(state_file, (json.dumps(state, indent=2, sort_keys=True) + "\n").encode("utf-8"))
+
+    failed = [name for name, result in results.items() if result["status"] not in ("ran", "skipped")]
+    elapsed = time.perf_counter() - started
+    if failed:
+        print(f"[pipeline] failed after {elapsed:.2f}s: {', '.join(failed)}", file=sys.stderr)
+        return 1
+    print(f"[pipeline] done in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
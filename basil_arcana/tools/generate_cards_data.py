@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
 from __future__ import annotations
 
+import argparse
 import json
+import sys
 from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
 
+from pack_write import write_pack
+
 ROOT = Path(__file__).resolve().parents[1]
 CDN_DATA_DIR = ROOT / "cdn" / "data"
 APP_DATA_DIR = ROOT / "app_flutter" / "assets" / "data"
@@ -1188,64 +1192,81 @@ def build_detailed(general: str, light: str, shadow: str, advice: str) -> str:
     )
 
 
-def title_for_minor(locale: str, rank: str, suit: str) -> str:
-    rank_title = RANK_TITLES[locale][rank]
-    suit_title = SUIT_TITLES[locale][suit]
-    if locale == "en":
-        return f"{rank_title} of {suit_title}"
-    if locale == "kk":
-        return f"{suit_title} {rank_title}"
-    return f"{rank_title} {suit_title}"
+MINOR_TEMPLATES = {
+    "en": {
+        "title": "{rank_title} of {suit_title}",
+        "general": "The {rank_title} of {suit_title} points to {general} in the realm of {theme}.",
+        "light": "At its best, it shows {light}.",
+        "shadow": "In shadow, it can show {shadow}.",
+        "advice": "Advice: {advice}.",
+        "fact": "{fact} in {suit_title}.",
+    },
+    "ru": {
+        "title": "{rank_title} {suit_title}",
+        "general": "{rank_title} {suit_title} говорит про {general} в теме: {theme}.",
+        "light": "В светлой стороне это {light}.",
+        "shadow": "В тени проявляется {shadow}.",
+        "advice": "Совет: {advice}.",
+        "fact": "{fact} в масти {suit_title}.",
+    },
+    "kk": {
+        "title": "{suit_title} {rank_title}",
+        "general": "{rank_title} {suit_title} — {general} тақырыбы: {theme}.",
+        "light": "Жарық қырында бұл {light}.",
+        "shadow": "Көлеңкеде {shadow} байқалады.",
+        "advice": "Кеңес: {advice}.",
+        "fact": "{fact} {suit_title} мастында.",
+    },
+}
+
+# Normalized packs are an offline experiment, not a shipping format: nothing in
+# the app or on the CDN reads them. Only the 56 classic-suit minors compact
+# (majors keep their text, the 114 lenormand and ac cards are stored as they
+# are), so on the current packs they are only 12-14% smaller than the full
+# ones, and only 4-5% smaller once both are gzipped as the CDN serves them.
+NORMALIZED_FORMAT = "basil-arcana/cards-normalized@1"
+MEANING_FIELDS = ("general", "light", "shadow", "advice")
+
 
+def render_minor_fields(
+    templates: dict[str, str],
+    rank: dict[str, object],
+    suit: dict[str, object],
+) -> dict[str, str]:
+    values = {
+        "rank_title": rank["title"],
+        "suit_title": suit["title"],
+        "theme": suit["theme"],
+        **{field: rank[field] for field in (*MEANING_FIELDS, "fact")},
+    }
+    return {field: template.format(**values) for field, template in templates.items()}
 
-def build_minor_entry(locale: str, rank: str, suit: str) -> dict[str, object]:
-    rank_data = RANK_DATA[locale][rank]
-    rank_title = RANK_TITLES[locale][rank]
-    suit_title = SUIT_TITLES[locale][suit]
-    theme = SUIT_THEMES[locale][suit]
-
-    if locale == "en":
-        general = (
-            f"The {rank_title} of {suit_title} points to {rank_data['general']} in the realm of {theme}."
-        )
-        light = f"At its best, it shows {rank_data['light']}."
-        shadow = f"In shadow, it can show {rank_data['shadow']}."
-        advice = f"Advice: {rank_data['advice']}."
-        fact = f"{rank_data['fact']} in {suit_title}."
-    elif locale == "ru":
-        general = (
-            f"{rank_title} {suit_title} говорит про {rank_data['general']} в теме: {theme}."
-        )
-        light = f"В светлой стороне это {rank_data['light']}."
-        shadow = f"В тени проявляется {rank_data['shadow']}."
-        advice = f"Совет: {rank_data['advice']}."
-        fact = f"{rank_data['fact']} в масти {suit_title}."
-    else:
-        general = (
-            f"{rank_title} {suit_title} — {rank_data['general']} тақырыбы: {theme}."
-        )
-        light = f"Жарық қырында бұл {rank_data['light']}."
-        shadow = f"Көлеңкеде {rank_data['shadow']} байқалады."
-        advice = f"Кеңес: {rank_data['advice']}."
-        fact = f"{rank_data['fact']} {suit_title} мастында."
 
-    keywords = [
-        *rank_data["keywords"],
-        *SUIT_KEYWORDS[locale][suit],
-    ]
+def rank_fragment(locale: str, rank: str) -> dict[str, object]:
+    return {"title": RANK_TITLES[locale][rank], **RANK_DATA[locale][rank]}
 
+
+def suit_fragment(locale: str, suit: str) -> dict[str, object]:
     return {
-        "title": title_for_minor(locale, rank, suit),
-        "keywords": keywords,
-        "meaning": {
-            "general": general,
-            "light": light,
-            "shadow": shadow,
-            "advice": advice,
-        },
-        "fact": fact,
+        "title": SUIT_TITLES[locale][suit],
+        "theme": SUIT_THEMES[locale][suit],
+        "keywords": SUIT_KEYWORDS[locale][suit],
+    }
+
+
+def build_minor_entry(locale: str, rank: str, suit: str) -> dict[str, object]:
+    rank_data = rank_fragment(locale, rank)
+    suit_data = suit_fragment(locale, suit)
+    fields = render_minor_fields(MINOR_TEMPLATES[locale], rank_data, suit_data)
+    meaning = {field: fields[field] for field in MEANING_FIELDS}
+
+    return {
+        "title": fields["title"],
+        "keywords": [*rank_data["keywords"], *suit_data["keywords"]],
+        "meaning": meaning,
+        "fact": fields["fact"],
         "stats": build_stats(rank, suit),
-        "detailedDescription": build_detailed(general, light, shadow, advice),
+        "detailedDescription": build_detailed(*meaning.values()),
     }
 
 
@@ -1273,34 +1294,211 @@ def build_major_entry(locale: str, card_id: str) -> dict[str, object]:
     }
 
 
-def load_card_order() -> list[str]:
-    with (CDN_DATA_DIR / "cards_en.json").open("r", encoding="utf-8") as handle:
-        data = json.load(handle)
-    return list(data.keys())
+def load_locale_pack(locale: str) -> "OrderedDict[str, dict[str, object]]":
+    path = CDN_DATA_DIR / f"cards_{LOCALE_FILE_MAP[locale]}.json"
+    with path.open("r", encoding="utf-8") as handle:
+        return json.load(handle, object_pairs_hook=OrderedDict)
+
+
+def build_card_entry(locale: str, card_id: str) -> dict[str, object] | None:
+    """The generated entry for a card, or None for cards these tables do not cover."""
+    if card_id.startswith("major_"):
+        return build_major_entry(locale, card_id) if card_id in MAJOR_CARDS else None
+    parts = card_id.split("_", 2)
+    if len(parts) != 3 or parts[0] not in SUITS or parts[2] not in RANK_ORDER:
+        return None
+    return build_minor_entry(locale, parts[2], parts[0])
+
 
+def refresh_locale_cards(locale: str, cards: dict[str, dict[str, object]]) -> int:
+    # Packs also carry decks and fields maintained outside this script, so
+    # generated fields are laid over the existing entries in place.
+    refreshed = 0
+    for card_id, card in cards.items():
+        entry = build_card_entry(locale, card_id)
+        if entry is not None:
+            card.update(entry)
+            refreshed += 1
+    return refreshed
 
-def write_locale(locale: str, card_order: list[str]) -> None:
+
+def build_locale_cards(
+    locale: str, pack: dict[str, dict[str, object]]
+) -> "OrderedDict[str, dict[str, object]]":
+    """A copy of ``pack`` with generated fields laid over the covered cards."""
     output: "OrderedDict[str, dict[str, object]]" = OrderedDict()
-    for card_id in card_order:
-        if card_id.startswith("major_"):
-            output[card_id] = build_major_entry(locale, card_id)
-            continue
+    for card_id, card in pack.items():
+        entry = build_card_entry(locale, card_id)
+        output[card_id] = dict(card) if entry is None else {**card, **entry}
+    return output
+
 
+def compact_card(card_id: str, entry: dict[str, object]) -> dict[str, object] | None:
+    # Keys after detailedDescription (fields maintained outside this script)
+    # are kept as "extra" and appended again on expansion.
+    if "detailedDescription" not in entry:
+        return None
+    keys = list(entry)
+    split = keys.index("detailedDescription")
+    if card_id.startswith("major_"):
+        compact = {key: entry[key] for key in keys[:split]}
+    else:
         suit, _, rank = card_id.split("_", 2)
-        output[card_id] = build_minor_entry(locale, rank, suit)
+        compact = {"minor": [rank, suit], "stats": entry["stats"]}
+    extra = {key: entry[key] for key in keys[split + 1 :]}
+    if extra:
+        compact["extra"] = extra
+    return compact
+
+
+def normalize_locale(locale: str, cards: dict[str, dict[str, object]]) -> dict[str, object]:
+    # Covered minor cards keep only (rank, suit, stats); their text lives once
+    # in the rank/suit fragment tables. detailedDescription of covered cards is
+    # derived. Cards that do not compact exactly are stored as they are.
+    templates = MINOR_TEMPLATES[locale]
+    ranks = {rank: rank_fragment(locale, rank) for rank in RANK_ORDER}
+    suits = {suit: suit_fragment(locale, suit) for suit in SUITS}
+
+    normalized: "OrderedDict[str, dict[str, object]]" = OrderedDict()
+    for card_id, entry in cards.items():
+        compact = None
+        if build_card_entry(locale, card_id) is not None:
+            compact = compact_card(card_id, entry)
+        if compact is not None:
+            expanded = expand_card(compact, templates, ranks, suits)
+            if list(expanded.items()) != list(entry.items()):
+                compact = None
+        normalized[card_id] = entry if compact is None else compact
+
+    return {
+        "format": NORMALIZED_FORMAT,
+        "locale": locale,
+        "templates": templates,
+        "ranks": ranks,
+        "suits": suits,
+        "cards": normalized,
+    }
+
+
+def expand_card(
+    card: dict[str, object],
+    templates: dict[str, str],
+    ranks: dict[str, dict[str, object]],
+    suits: dict[str, dict[str, object]],
+) -> dict[str, object]:
+    if "minor" in card:
+        rank, suit = card["minor"]
+        fields = render_minor_fields(templates, ranks[rank], suits[suit])
+        entry = {
+            "title": fields["title"],
+            "keywords": [*ranks[rank]["keywords"], *suits[suit]["keywords"]],
+            "meaning": {field: fields[field] for field in MEANING_FIELDS},
+            "fact": fields["fact"],
+            "stats": card["stats"],
+        }
+    else:
+        entry = {key: value for key, value in card.items() if key != "extra"}
+    if "detailedDescription" not in entry:
+        entry["detailedDescription"] = build_detailed(
+            *(entry["meaning"][field] for field in MEANING_FIELDS)
+        )
+    entry.update(card.get("extra", {}))
+    return entry
+
+
+def expand_normalized(pack: dict[str, object]) -> "OrderedDict[str, dict[str, object]]":
+    if pack.get("format") != NORMALIZED_FORMAT:
+        raise ValueError(f"unsupported pack format: {pack.get('format')!r}")
+    templates = pack["templates"]
+    ranks = pack["ranks"]
+    suits = pack["suits"]
+
+    output: "OrderedDict[str, dict[str, object]]" = OrderedDict()
+    for card_id, card in pack["cards"].items():
+        output[card_id] = expand_card(card, templates, ranks, suits)
+    return output
+
+
+def dump_pack(payload: object) -> str:
+    return json.dumps(payload, ensure_ascii=False, indent=2) + "\n"
+
+
+def write_locale(
+    locale: str, cards: dict[str, dict[str, object]], manifest: bool = False
+) -> None:
+    output = dump_pack(cards)
 
     file_locale = LOCALE_FILE_MAP[locale]
     for directory in (CDN_DATA_DIR, APP_DATA_DIR):
-        path = directory / f"cards_{file_locale}.json"
-        with path.open("w", encoding="utf-8") as handle:
-            json.dump(output, handle, ensure_ascii=False, indent=2)
-            handle.write("\n")
+        write_pack(directory / f"cards_{file_locale}.json", output, manifest)
+
+
+def write_normalized_locale(
+    locale: str, cards: dict[str, dict[str, object]], output_dir: Path, manifest: bool = False
+) -> None:
+    pack = normalize_locale(locale, cards)
+    expected = dump_pack(cards)
+    if dump_pack(expand_normalized(pack)) != expected:
+        raise ValueError(f"normalized pack for {locale} does not round-trip")
+
+    normalized = dump_pack(pack)
+    path = output_dir / f"cards_{LOCALE_FILE_MAP[locale]}.normalized.json"
+    write_pack(path, normalized, manifest)
+    full_size = len(expected.encode("utf-8"))
+    normalized_size = len(normalized.encode("utf-8"))
+    print(
+        f"[normalized] {path.name}: {normalized_size} bytes"
+        f" (full {full_size} bytes, {normalized_size / full_size:.0%})"
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate basil-arcana card packs.")
+    parser.add_argument(
+        "--normalized-dir",
+        type=Path,
+        default=None,
+        help=(
+            "Also write round-trip-verified normalized packs to this directory"
+            " (experimental; only about 12-14%% smaller, not read by the app or CDN)."
+        ),
+    )
+    parser.add_argument(
+        "--expand",
+        type=Path,
+        default=None,
+        help="Expand a normalized pack back to the full card format and exit.",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Where --expand writes the full pack (default: stdout).",
+    )
+    parser.add_argument(
+        "--manifest",
+        action="store_true",
+        help="Also write <pack>.manifest.json (size, sha256) next to every written pack.",
+    )
+    return parser.parse_args()
 
 
 def main() -> None:
-    card_order = load_card_order()
+    args = parse_args()
+    if args.expand:
+        with args.expand.open("r", encoding="utf-8") as handle:
+            expanded = dump_pack(expand_normalized(json.load(handle)))
+        if args.output:
+            write_pack(args.output, expanded, args.manifest)
+        else:
+            sys.stdout.write(expanded)
+        return
+
     for locale in ("en", "ru", "kk"):
-        write_locale(locale, card_order)
+        cards = build_locale_cards(locale, load_locale_pack(locale))
+        write_locale(locale, cards, args.manifest)
+        if args.normalized_dir:
+            write_normalized_locale(locale, cards, args.normalized_dir, args.manifest)
 
 
 if __name__ == "__main__":
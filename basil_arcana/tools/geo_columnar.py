@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Columnar export of cis_places.csv and vectorized filters over it.
+
+Formats:
+- ``npy``: a directory of NumPy ``.npy`` columns plus ``columns.json``. Written
+  without any dependency; reading needs NumPy (``pip install numpy``) and
+  memory-maps the files.
+- ``parquet`` / ``arrow``: one Parquet or Arrow IPC (Feather v2) file, written
+  and read with pyarrow (``pip install pyarrow``).
+
+Low-cardinality text columns (country, admin1, timezone, feature code, ...) are
+dictionary-encoded, so filters compare small integer codes. ``place_id`` is
+always ``str(geoname_id)`` and is not stored separately in ``npy`` exports.
+
+Per-country stats for a population cut-off and feature codes:
+    python3 basil_arcana/tools/geo_columnar.py basil_arcana/server/data/geo/cis_places_columns --min-population 10000 --feature-codes PPLA,PPLC
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import shutil
+import struct
+import sys
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+FORMATS = ("npy", "parquet", "arrow")
+OUTPUT_NAMES = {
+    "npy": "cis_places_columns",
+    "parquet": "cis_places.parquet",
+    "arrow": "cis_places.arrow",
+}
+MANIFEST_NAME = "columns.json"
+
+NUMERIC_COLUMNS = {
+    "geoname_id": "q",
+    "latitude": "d",
+    "longitude": "d",
+    "population": "q",
+}
+DICTIONARY_COLUMNS = (
+    "country_code",
+    "country_name",
+    "admin1_code",
+    "admin1_name",
+    "admin2_code",
+    "timezone",
+    "feature_code",
+    "modification_date",
+)
+# Stored as UTF-8 bytes plus n+1 int64 offsets, like an Arrow string column.
+STRING_COLUMNS = ("city_name", "city_name_ascii")
+
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+NPY_DESCR = {"q": "<i8", "d": "<f8", "i": "<i4", "B": "|u1"}
+
+
+def require_numpy():
+    try:
+        import numpy
+    except ImportError as exc:
+        raise SystemExit("numpy is required to read npy columns: pip install numpy") from exc
+    return numpy
+
+
+def require_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as exc:
+        raise SystemExit("pyarrow is required for parquet/arrow output: pip install pyarrow") from exc
+    return pyarrow
+
+
+def write_npy(path: Path, typecode: str, values: array) -> None:
+    """Write a 1-D array in NumPy's .npy v1.0 format."""
+    header = f"{{'descr': '{NPY_DESCR[typecode]}', 'fortran_order': False, 'shape': ({len(values)},), }}"
+    # The data starts on a 64-byte boundary; the header ends with a newline.
+    padding = -(len(NPY_MAGIC) + 2 + len(header) + 1) % 64
+    header_bytes = (header + " " * padding + "\n").encode("latin-1")
+    if sys.byteorder != "little" and values.itemsize > 1:
+        values = array(typecode, values)
+        values.byteswap()
+    with path.open("wb") as fp:
+        fp.write(NPY_MAGIC)
+        fp.write(struct.pack("<H", len(header_bytes)))
+        fp.write(header_bytes)
+        values.tofile(fp)
+
+
+def write_npy_columns(places_csv: Path, target: Path) -> int:
+    numeric = {name: array(typecode) for name, typecode in NUMERIC_COLUMNS.items()}
+    codes = {name: array("i") for name in DICTIONARY_COLUMNS}
+    dictionaries: Dict[str, Dict[str, int]] = {name: {} for name in DICTIONARY_COLUMNS}
+    strings = {name: bytearray() for name in STRING_COLUMNS}
+    offsets = {name: array("q", [0]) for name in STRING_COLUMNS}
+
+    with places_csv.open("r", encoding="utf-8", newline="") as fp:
+        reader = csv.reader(fp)
+        header = next(reader)
+        index = {name: i for i, name in enumerate(header)}
+        numeric_slots = [
+            (numeric[name].append, int if typecode == "q" else float, index[name])
+            for name, typecode in NUMERIC_COLUMNS.items()
+        ]
+        dictionary_slots = [
+            (codes[name].append, dictionaries[name], index[name]) for name in DICTIONARY_COLUMNS
+        ]
+        string_slots = [(strings[name], offsets[name], index[name]) for name in STRING_COLUMNS]
+        rows = 0
+        for row in reader:
+            rows += 1
+            for append, convert, i in numeric_slots:
+                append(convert(row[i] or 0))
+            for append, dictionary, i in dictionary_slots:
+                append(dictionary.setdefault(row[i], len(dictionary)))
+            for data, starts, i in string_slots:
+                data += row[i].encode("utf-8")
+                starts.append(len(data))
+
+    tmp = target.with_name(f".{target.name}.tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    for name, values in numeric.items():
+        write_npy(tmp / f"{name}.npy", NUMERIC_COLUMNS[name], values)
+    for name, values in codes.items():
+        write_npy(tmp / f"{name}.npy", "i", values)
+    for name in STRING_COLUMNS:
+        write_npy(tmp / f"{name}.data.npy", "B", array("B", strings[name]))
+        write_npy(tmp / f"{name}.offsets.npy", "q", offsets[name])
+    manifest = {
+        "rows": rows,
+        "numeric": list(NUMERIC_COLUMNS),
+        "strings": list(STRING_COLUMNS),
+        "dictionaries": {name: list(values) for name, values in dictionaries.items()},
+    }
+    (tmp / MANIFEST_NAME).write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+
+    # Swap the finished directory in; readers never see a partial export.
+    old = target.with_name(f".{target.name}.old")
+    shutil.rmtree(old, ignore_errors=True)
+    if target.exists():
+        os.replace(target, old)
+    os.replace(tmp, target)
+    shutil.rmtree(old, ignore_errors=True)
+    return rows
+
+
+def write_arrow_table(places_csv: Path, target: Path, fmt: str) -> int:
+    pa = require_pyarrow()
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+
+    column_types = {name: pa.string() for name in (*DICTIONARY_COLUMNS, *STRING_COLUMNS, "place_id")}
+    column_types.update(
+        {
+            "geoname_id": pa.int64(),
+            "latitude": pa.float64(),
+            "longitude": pa.float64(),
+            "population": pa.int64(),
+        }
+    )
+    table = pacsv.read_csv(places_csv, convert_options=pacsv.ConvertOptions(column_types=column_types))
+    for name in DICTIONARY_COLUMNS:
+        i = table.schema.get_field_index(name)
+        table = table.set_column(i, name, pc.dictionary_encode(table.column(name)))
+
+    tmp = target.with_name(f".{target.name}.tmp")
+    try:
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            pq.write_table(table, tmp, compression="zstd")
+        else:
+            import pyarrow.feather as feather
+
+            feather.write_feather(table, tmp, compression="zstd")
+        os.replace(tmp, target)
+    finally:
+        tmp.unlink(missing_ok=True)
+    return table.num_rows
+
+
+def export_columns(places_csv: Path, output_dir: Path, fmt: str) -> Dict[str, object]:
+    """Write cis_places.csv in a columnar format next to it."""
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown columnar format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    started = time.perf_counter()
+    target = output_dir / OUTPUT_NAMES[fmt]
+    if fmt == "npy":
+        rows = write_npy_columns(places_csv, target)
+        size = sum(path.stat().st_size for path in target.iterdir())
+    else:
+        rows = write_arrow_table(places_csv, target, fmt)
+        size = target.stat().st_size
+    return {
+        "format": fmt,
+        "path": str(target),
+        "bytes": size,
+        "rows": rows,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+class GeoColumns:
+    """Columns of an export as NumPy arrays; text columns as codes + dictionary."""
+
+    def __init__(self, path: Path) -> None:
+        np = require_numpy()
+        self.path = Path(path)
+        self.numeric: Dict[str, object] = {}
+        self.codes: Dict[str, object] = {}
+        self.dictionaries: Dict[str, List[str]] = {}
+        if self.path.is_dir():
+            manifest = json.loads((self.path / MANIFEST_NAME).read_text(encoding="utf-8"))
+            for name in manifest["numeric"]:
+                self.numeric[name] = np.load(self.path / f"{name}.npy", mmap_mode="r")
+            for name, values in manifest["dictionaries"].items():
+                self.codes[name] = np.load(self.path / f"{name}.npy", mmap_mode="r")
+                self.dictionaries[name] = values
+            self.rows = int(manifest["rows"])
+            return
+
+        require_pyarrow()
+        if self.path.suffix == ".parquet":
+            import pyarrow.parquet as pq
+
+            table = pq.read_table(self.path)
+        else:
+            import pyarrow.feather as feather
+
+            table = feather.read_table(self.path)
+        for name in NUMERIC_COLUMNS:
+            self.numeric[name] = table.column(name).to_numpy()
+        for name in DICTIONARY_COLUMNS:
+            column = table.column(name).unify_dictionaries().combine_chunks()
+            self.codes[name] = column.indices.to_numpy(zero_copy_only=False)
+            self.dictionaries[name] = column.dictionary.to_pylist()
+        self.rows = table.num_rows
+
+    def _isin(self, column: str, values: Iterable[str]):
+        np = require_numpy()
+        dictionary = self.dictionaries[column]
+        wanted = [dictionary.index(value) for value in set(values) if value in dictionary]
+        return np.isin(self.codes[column], np.asarray(wanted, dtype=self.codes[column].dtype))
+
+    def mask(
+        self,
+        min_population: int = 0,
+        feature_codes: Optional[Sequence[str]] = None,
+        countries: Optional[Sequence[str]] = None,
+    ):
+        """Boolean row mask for the build's population and feature-code filters."""
+        np = require_numpy()
+        selected = np.ones(self.rows, dtype=bool)
+        if min_population > 0:
+            selected &= self.numeric["population"] >= min_population
+        if feature_codes:
+            selected &= self._isin("feature_code", feature_codes)
+        if countries:
+            selected &= self._isin("country_code", countries)
+        return selected
+
+    def country_stats(self, mask=None) -> Dict[str, Dict[str, int]]:
+        """Place count and total population per country for the rows in ``mask``."""
+        np = require_numpy()
+        codes = self.codes["country_code"]
+        population = self.numeric["population"]
+        if mask is not None:
+            codes = codes[mask]
+            population = population[mask]
+        size = len(self.dictionaries["country_code"])
+        counts = np.bincount(codes, minlength=size)
+        totals = np.bincount(codes, weights=population, minlength=size)
+        return {
+            country: {"places": int(counts[i]), "population": int(totals[i])}
+            for i, country in sorted(enumerate(self.dictionaries["country_code"]), key=lambda item: item[1])
+            if counts[i]
+        }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Per-country stats over a columnar geo export.")
+    parser.add_argument("path", help="cis_places_columns directory, cis_places.parquet or cis_places.arrow.")
+    parser.add_argument("--min-population", type=int, default=0, help="Skip smaller places.")
+    parser.add_argument(
+        "--feature-codes",
+        default="",
+        help="Comma-separated feature codes to keep, e.g. PPLA,PPLC.",
+    )
+    parser.add_argument("--countries", default="", help="Comma-separated country codes to keep.")
+    return parser.parse_args()
+
+
+def split_codes(raw: str) -> List[str]:
+    return [x.strip().upper() for x in raw.split(",") if x.strip()]
+
+
+def main() -> int:
+    args = parse_args()
+    columns = GeoColumns(Path(args.path))
+    started = time.perf_counter()
+    mask = columns.mask(
+        min_population=max(0, args.min_population),
+        feature_codes=split_codes(args.feature_codes),
+        countries=split_codes(args.countries),
+    )
+    by_country = columns.country_stats(mask)
+    print(
+        json.dumps(
+            {
+                "rows": columns.rows,
+                "selected": int(mask.sum()),
+                "by_country": by_country,
+                "seconds": round(time.perf_counter() - started, 4),
+            },
+            ensure_ascii=False,
+            indent=2,
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate place filter for the CIS places build.
+
+GeoNames often lists one settlement several times (a PPL next to its PPLX
+sections, or the same hamlet entered twice). Places with the same country,
+admin1 and normalized name within a small radius are collapsed into the
+best-ranked one, i.e. the first in the build's sort order (population first).
+"""
+
+from __future__ import annotations
+
+import csv
+import math
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+from geo_text import normalize_alias
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+# Latitude above which every longitude cell is probed.
+POLAR_LATITUDE = 89.0
+
+MERGED_HEADER = ["merged_place_id", "place_id"]
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class NearDuplicateFilter:
+    """Drops places that duplicate an already kept, better-ranked place.
+
+    Kept places are bucketed by (admin1, normalized name, grid cell), with
+    cells ``radius_km`` high, so a candidate only probes the cells that can
+    hold a place within the radius. Rows must arrive in the build's sort
+    order; state is reset whenever the country changes.
+    """
+
+    def __init__(self, radius_km: float, merged_path: Path) -> None:
+        self.radius_km = radius_km
+        self.merged_path = merged_path
+        self.cell_deg = radius_km / KM_PER_DEGREE
+        self.lon_cells = max(1, math.ceil(360 / self.cell_deg))
+        self.merged_ids: Set[str] = set()
+        self.merged_by_country: Dict[str, int] = defaultdict(int)
+        self._country = ""
+        self._buckets: Dict[Tuple[str, str, int, int], List[Tuple[float, float, str]]] = {}
+
+    def _lon_cell(self, lon: float) -> int:
+        return math.floor((lon + 180) / self.cell_deg) % self.lon_cells
+
+    def _lon_span(self, lat: float) -> int:
+        # A degree of longitude is shortest at the cell edge farthest from the equator.
+        edge = min(abs(lat) + self.cell_deg, 90.0)
+        if edge >= POLAR_LATITUDE:
+            return self.lon_cells
+        return math.ceil(self.radius_km / (KM_PER_DEGREE * math.cos(math.radians(edge))) / self.cell_deg)
+
+    def _find(self, admin1: str, name: str, lat: float, lon: float) -> str:
+        lat_cell = math.floor(lat / self.cell_deg)
+        lon_cell = self._lon_cell(lon)
+        span = self._lon_span(lat)
+        lon_cells = range(self.lon_cells) if 2 * span + 1 >= self.lon_cells else [
+            (lon_cell + offset) % self.lon_cells for offset in range(-span, span + 1)
+        ]
+        for lat_offset in (-1, 0, 1):
+            for cell in lon_cells:
+                bucket = self._buckets.get((admin1, name, lat_cell + lat_offset, cell), ())
+                for kept_lat, kept_lon, place_id in bucket:
+                    if haversine_km(lat, lon, kept_lat, kept_lon) <= self.radius_km:
+                        return place_id
+        return ""
+
+    def filter(self, rows: Iterable[List[str]]) -> Iterator[List[str]]:
+        """Yield the kept rows; write (merged_place_id, place_id) for the rest."""
+        with self.merged_path.open("w", encoding="utf-8", newline="") as fp:
+            writer = csv.writer(fp)
+            writer.writerow(MERGED_HEADER)
+            for row in rows:
+                kept_id = self._kept_duplicate(row)
+                if kept_id:
+                    writer.writerow([row[0], kept_id])
+                else:
+                    yield row
+
+    def _kept_duplicate(self, row: List[str]) -> str:
+        """place_id of the kept place ``row`` duplicates, or "" after keeping it."""
+        place_id, country, admin1 = row[0], row[2], row[4]
+        if country != self._country:
+            self._country = country
+            self._buckets = {}
+        name = normalize_alias(row[7])
+        lat = float(row[9])
+        lon = float(row[10])
+        kept_id = self._find(admin1, name, lat, lon)
+        if kept_id:
+            self.merged_ids.add(place_id)
+            self.merged_by_country[country] += 1
+            return kept_id
+        key = (admin1, name, math.floor(lat / self.cell_deg), self._lon_cell(lon))
+        self._buckets.setdefault(key, []).append((lat, lon, place_id))
+        return ""
+
+    def summary(self) -> dict:
+        return {
+            "radius_km": self.radius_km,
+            "merged": len(self.merged_ids),
+            "merged_by_country": dict(sorted(self.merged_by_country.items())),
+            "merged_csv": str(self.merged_path),
+        }
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Conditional, resumable downloads of GeoNames dump files.
+
+Bodies are streamed in chunks to a ``.<name>.part`` file next to the target and
+renamed into place only once complete and verified. Cached files are
+revalidated with ETag/If-Modified-Since, and an interrupted transfer resumes
+from the partial file with an HTTP Range request guarded by If-Range.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import http.client
+import json
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from email.utils import formatdate
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from pack_fetch import (
+    BACKOFF_BASE_SECONDS,
+    CHUNK_SIZE,
+    RETRYABLE_STATUSES,
+    ConnectionPool,
+    FetchError,
+    load_meta,
+    meta_path,
+    open_request,
+)
+
+DEFAULT_TIMEOUT = 60.0
+DEFAULT_RETRIES = 5
+DEFAULT_WORKERS = 4
+HASH_CHUNK_SIZE = 1 << 20
+
+
+@dataclass(frozen=True)
+class DownloadResult:
+    name: str
+    url: str
+    path: Path
+    # 0 when the cached copy was used without asking the server.
+    status: int
+    seconds: float
+    attempts: int
+    size: int
+    resumed_from: int
+    sha256: str
+
+    @property
+    def from_cache(self) -> bool:
+        return self.status in (0, 304)
+
+
+def part_path(target: Path) -> Path:
+    return target.with_name(f".{target.name}.part")
+
+
+def file_sha256(path: Path) -> str:
+    hasher = hashlib.sha256()
+    with path.open("rb") as handle:
+        while True:
+            chunk = handle.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def load_checksums(path: Path) -> Dict[str, str]:
+    """Read ``sha256sum``-style lines (``<hex>  <file name>``)."""
+    checksums: Dict[str, str] = {}
+    for line in path.read_text(encoding="utf-8").splitlines():
+        parts = line.strip().split()
+        if len(parts) >= 2 and not parts[0].startswith("#"):
+            checksums[Path(parts[-1].lstrip("*")).name] = parts[0].lower()
+    return checksums
+
+
+def _write_json(path: Path, payload: Dict[str, object]) -> None:
+    path.write_text(json.dumps(payload), encoding="utf-8")
+
+
+def _conditional_headers(target: Path) -> Dict[str, str]:
+    if not target.exists():
+        return {}
+    meta = load_meta(target)
+    headers: Dict[str, str] = {}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+    if not headers:
+        # Files cached before metadata was kept: fall back to their mtime.
+        headers["If-Modified-Since"] = formatdate(target.stat().st_mtime, usegmt=True)
+    return headers
+
+
+def _resume_headers(part: Path) -> Tuple[Dict[str, str], int]:
+    if not part.exists():
+        return {}, 0
+    offset = part.stat().st_size
+    validator = load_meta(part)
+    if_range = validator.get("etag") or validator.get("last_modified")
+    if offset == 0 or not if_range:
+        return {}, 0
+    return {"Range": f"bytes={offset}-", "If-Range": if_range}, offset
+
+
+def _content_range_start(response: http.client.HTTPResponse) -> int:
+    # "bytes <start>-<end>/<total>"
+    value = response.getheader("Content-Range") or ""
+    try:
+        return int(value.split()[1].split("-")[0])
+    except (IndexError, ValueError):
+        return -1
+
+
+def _stream_to_part(response: http.client.HTTPResponse, part: Path, append: bool) -> int:
+    expected = response.getheader("Content-Length")
+    received = 0
+    with part.open("ab" if append else "wb") as handle:
+        while True:
+            chunk = response.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            handle.write(chunk)
+            received += len(chunk)
+    if expected is not None and received != int(expected):
+        raise ConnectionError(f"body ended after {received} of {expected} bytes")
+    return received
+
+
+def _verify(part: Path, name: str, expected_sha256: str) -> str:
+    digest = file_sha256(part)
+    if expected_sha256 and digest != expected_sha256:
+        part.unlink(missing_ok=True)
+        meta_path(part).unlink(missing_ok=True)
+        raise FetchError(f"{name}: sha256 {digest} does not match expected {expected_sha256}")
+    if name.endswith(".zip"):
+        try:
+            with zipfile.ZipFile(part):
+                pass
+        except zipfile.BadZipFile as exc:
+            part.unlink(missing_ok=True)
+            meta_path(part).unlink(missing_ok=True)
+            raise ConnectionError(f"{name}: incomplete zip archive") from exc
+    return digest
+
+
+def download_one(
+    pool: ConnectionPool,
+    url: str,
+    target: Path,
+    timeout: float = DEFAULT_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+    expected_sha256: str = "",
+    refresh: bool = True,
+) -> DownloadResult:
+    started = time.perf_counter()
+    part = part_path(target)
+
+    def result(status: int, attempts: int, resumed_from: int, sha256: str) -> DownloadResult:
+        return DownloadResult(
+            name=target.name,
+            url=url,
+            path=target,
+            status=status,
+            seconds=time.perf_counter() - started,
+            attempts=attempts,
+            size=target.stat().st_size,
+            resumed_from=resumed_from,
+            sha256=sha256,
+        )
+
+    def cached_sha256() -> str:
+        meta = load_meta(target)
+        digest = meta.get("sha256", "")
+        if expected_sha256 and (not digest or int(meta.get("size", -1)) != target.stat().st_size):
+            digest = file_sha256(target)
+        if expected_sha256 and digest != expected_sha256:
+            raise FetchError(f"{target.name}: cached sha256 {digest} does not match expected {expected_sha256}")
+        return digest
+
+    if target.exists() and not refresh:
+        return result(0, 0, 0, cached_sha256())
+
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            resume_headers, offset = _resume_headers(part)
+            headers = {"Accept-Encoding": "identity", **_conditional_headers(target), **resume_headers}
+            response, final_url = open_request(pool, url, headers, timeout)
+            if response.status == 304:
+                response.read()
+                part.unlink(missing_ok=True)
+                meta_path(part).unlink(missing_ok=True)
+                return result(304, attempt, 0, cached_sha256())
+            if response.status == 416:
+                # The partial file is not a prefix of the current body; start over.
+                response.read()
+                part.unlink(missing_ok=True)
+                raise ConnectionError("range not satisfiable")
+            if response.status == 206:
+                if _content_range_start(response) != offset:
+                    response.read()
+                    part.unlink(missing_ok=True)
+                    raise ConnectionError("unexpected Content-Range")
+                resumed_from = offset
+            elif response.status == 200:
+                resumed_from = 0
+                _write_json(
+                    meta_path(part),
+                    {
+                        "etag": response.getheader("ETag") or "",
+                        "last_modified": response.getheader("Last-Modified") or "",
+                    },
+                )
+            else:
+                response.read()
+                message = f"{url}: HTTP {response.status}"
+                if response.status not in RETRYABLE_STATUSES or attempt >= retries:
+                    raise FetchError(message)
+                raise ConnectionError(message)
+
+            _stream_to_part(response, part, append=resumed_from > 0)
+            digest = _verify(part, target.name, expected_sha256)
+            validators = load_meta(part)
+            os.chmod(part, 0o644)
+            os.replace(part, target)
+            meta_path(part).unlink(missing_ok=True)
+            _write_json(
+                meta_path(target),
+                {
+                    "url": final_url,
+                    "etag": validators.get("etag", ""),
+                    "last_modified": validators.get("last_modified", ""),
+                    "size": target.stat().st_size,
+                    "sha256": digest,
+                },
+            )
+            return result(200, attempt, resumed_from, digest)
+        except (ConnectionError, http.client.HTTPException, OSError) as exc:
+            # The partial file is kept, so the next attempt resumes where this one stopped.
+            parts = urlsplit(url)
+            pool.drop(parts.scheme, parts.netloc)
+            if attempt >= retries:
+                raise FetchError(f"{url}: {exc}") from exc
+            time.sleep(BACKOFF_BASE_SECONDS * (2 ** (attempt - 1)))
+
+
+def download_files(
+    items: Sequence[Tuple[str, Path]],
+    timeout: float = DEFAULT_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+    workers: int = DEFAULT_WORKERS,
+    checksums: Optional[Dict[str, str]] = None,
+    refresh: bool = True,
+) -> List[DownloadResult]:
+    """Download every ``(url, target)`` pair concurrently, in input order."""
+    checksums = checksums or {}
+    pool = ConnectionPool()
+
+    def task(item: Tuple[str, Path]) -> DownloadResult:
+        url, target = item
+        target.parent.mkdir(parents=True, exist_ok=True)
+        return download_one(
+            pool, url, target, timeout, retries, checksums.get(target.name, ""), refresh
+        )
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(items)))) as executor:
+            return list(executor.map(task, items))
+    finally:
+        pool.close_all()
+
+
+def log_results(results: Sequence[DownloadResult]) -> None:
+    for result in results:
+        if result.status == 0:
+            label = "cached, not revalidated"
+        elif result.from_cache:
+            label = "not modified"
+        elif result.resumed_from:
+            label = f"{result.size} bytes (resumed at {result.resumed_from})"
+        else:
+            label = f"{result.size} bytes"
+        print(
+            f"[download] {result.name}: {label}, {result.seconds * 1000:.0f} ms,"
+            f" attempts {result.attempts}",
+            file=sys.stderr,
+        )
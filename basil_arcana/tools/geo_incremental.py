@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Incremental state for the CIS places build.
+
+Keeps geoname_id -> row hash from the previous build in a small SQLite file and
+turns the next full build into delta CSVs (upserts and deletions), so the
+geo_places/geo_place_aliases tables can be refreshed with a small delta load.
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Iterable, List, Optional, Sequence, Set, TextIO
+
+INSERT_BATCH = 10_000
+
+
+def row_digest(place_values: Sequence[object], aliases: Iterable[Sequence[object]]) -> str:
+    hasher = hashlib.blake2b(digest_size=12)
+    hasher.update("\x1f".join(map(str, place_values)).encode("utf-8"))
+    for alias in aliases:
+        hasher.update(b"\x1e")
+        hasher.update("\x1f".join(map(str, alias)).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+class IncrementalBuild:
+    """Diffs the rows of one build against the stored state of the last one.
+
+    Deletions are limited to the countries in this build, so building a
+    subset of countries never reports the others as deleted.
+    """
+
+    def __init__(
+        self,
+        state_path: Path,
+        countries: Sequence[str],
+        upserts_path: Path,
+        alias_upserts_path: Path,
+        deletions_path: Path,
+        places_header: List[str],
+        aliases_header: List[str],
+    ) -> None:
+        self.state_path = state_path
+        self.countries = list(countries)
+        self.upserts_path = upserts_path
+        self.alias_upserts_path = alias_upserts_path
+        self.deletions_path = deletions_path
+        self.conn = sqlite3.connect(str(state_path))
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS place_state ("
+            " geoname_id INTEGER PRIMARY KEY,"
+            " country_code TEXT NOT NULL,"
+            " row_hash TEXT NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE TEMP TABLE current_state ("
+            " geoname_id INTEGER PRIMARY KEY,"
+            " country_code TEXT NOT NULL,"
+            " row_hash TEXT NOT NULL)"
+        )
+        self.previous_count = self._count_previous()
+        self.changed_ids: Set[str] = set()
+        self.unchanged = 0
+        self.deletions = 0
+        self.alias_upserts = 0
+        self._pending: List[tuple] = []
+        self._upserts_fp: TextIO = upserts_path.open("w", encoding="utf-8", newline="")
+        self._upserts = csv.writer(self._upserts_fp)
+        self._upserts.writerow(places_header)
+        self._aliases_header = aliases_header
+
+    def _count_previous(self) -> int:
+        marks = ",".join("?" for _ in self.countries)
+        row = self.conn.execute(
+            f"SELECT COUNT(*) FROM place_state WHERE country_code IN ({marks})",
+            self.countries,
+        ).fetchone()
+        return int(row[0])
+
+    def observe_place(self, values: Sequence[str], digest: str) -> None:
+        geoname_id = int(values[1])
+        previous = self.conn.execute(
+            "SELECT row_hash FROM place_state WHERE geoname_id = ?", (geoname_id,)
+        ).fetchone()
+        if previous is not None and previous[0] == digest:
+            self.unchanged += 1
+        else:
+            self.changed_ids.add(values[0])
+            self._upserts.writerow(values)
+        self._pending.append((geoname_id, values[2], digest))
+        if len(self._pending) >= INSERT_BATCH:
+            self._flush()
+
+    def _flush(self) -> None:
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO current_state VALUES (?, ?, ?)", self._pending
+        )
+        self._pending = []
+
+    def alias_writer(self) -> "AliasDeltaWriter":
+        return AliasDeltaWriter(self)
+
+    def finish(self) -> None:
+        """Write deletions and make the current build the stored state."""
+        self._flush()
+        self._upserts_fp.close()
+        marks = ",".join("?" for _ in self.countries)
+        deleted = self.conn.execute(
+            "SELECT geoname_id FROM place_state"
+            f" WHERE country_code IN ({marks})"
+            " AND geoname_id NOT IN (SELECT geoname_id FROM current_state)"
+            " ORDER BY geoname_id",
+            self.countries,
+        )
+        with self.deletions_path.open("w", encoding="utf-8", newline="") as fp:
+            writer = csv.writer(fp)
+            writer.writerow(["place_id"])
+            for (geoname_id,) in deleted:
+                writer.writerow([str(geoname_id)])
+                self.deletions += 1
+        with self.conn:
+            self.conn.execute(
+                f"DELETE FROM place_state WHERE country_code IN ({marks})", self.countries
+            )
+            self.conn.execute("INSERT OR REPLACE INTO place_state SELECT * FROM current_state")
+        self.conn.close()
+
+    def summary(self) -> dict:
+        return {
+            "state_file": str(self.state_path),
+            "previous_places": self.previous_count,
+            "upserts": len(self.changed_ids),
+            "unchanged": self.unchanged,
+            "deletions": self.deletions,
+            "alias_upserts": self.alias_upserts,
+            "outputs": {
+                "places_upserts_csv": str(self.upserts_path),
+                "aliases_upserts_csv": str(self.alias_upserts_path),
+                "places_deletions_csv": str(self.deletions_path),
+            },
+        }
+
+
+class AliasDeltaWriter:
+    """Copies alias CSV lines of upserted places into the alias delta file."""
+
+    def __init__(self, build: IncrementalBuild) -> None:
+        self.build = build
+        self.fp: Optional[TextIO] = None
+
+    def __enter__(self) -> "AliasDeltaWriter":
+        self.fp = self.build.alias_upserts_path.open("w", encoding="utf-8", newline="")
+        csv.writer(self.fp).writerow(self.build._aliases_header)
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        if self.fp is not None:
+            self.fp.close()
+
+    def observe_line(self, line: str) -> None:
+        # place_id is a bare numeric first column, so no CSV parsing is needed.
+        if line[: line.find(",")] in self.build.changed_ids:
+            self.fp.write(line)
+            self.build.alias_upserts += 1
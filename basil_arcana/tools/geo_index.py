@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Read-only binary copy of cis_places.csv for in-process lookups.
+
+Places are fixed-width records sorted by geoname_id; their text columns are
+(offset, length) references into a string heap that stores each distinct
+value once. The file is memory-mapped read-only, so opening it parses only
+the header, and worker processes share its pages through the page cache
+instead of holding their own copies.
+
+Look a place up from the command line:
+    python3 basil_arcana/tools/geo_index.py basil_arcana/server/data/geo/cis_places.idx 524901
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import struct
+import tempfile
+import time
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+from geo_index_file import IndexFile, SectionWriter, write_index_file
+
+MAGIC = b"BAGEOPL1"
+VERSION = 1
+SECTIONS = ("geoname_ids", "records", "strings")
+
+# cis_places.csv columns stored as text, in record order.
+STRING_FIELDS = (
+    "country_code",
+    "country_name",
+    "admin1_code",
+    "admin1_name",
+    "admin2_code",
+    "city_name",
+    "city_name_ascii",
+    "timezone",
+    "feature_code",
+    "modification_date",
+)
+# geoname_id, latitude, longitude, population, then (offset, length) per text column.
+RECORD = struct.Struct("<qddq" + "IH" * len(STRING_FIELDS))
+
+
+def build_geo_index(places_csv: Path, target: Path) -> Dict[str, object]:
+    """Build the binary places file for cis_places.csv."""
+    started = time.perf_counter()
+    rows = []
+    with places_csv.open("r", encoding="utf-8", newline="") as fp:
+        reader = csv.reader(fp)
+        header = next(reader)
+        index = {name: i for i, name in enumerate(header)}
+        string_columns = [index[name] for name in STRING_FIELDS]
+        for row in reader:
+            rows.append(
+                (
+                    int(row[index["geoname_id"]]),
+                    float(row[index["latitude"]]),
+                    float(row[index["longitude"]]),
+                    int(row[index["population"]] or 0),
+                    [row[i] for i in string_columns],
+                )
+            )
+    rows.sort(key=lambda item: item[0])
+
+    with tempfile.TemporaryDirectory(prefix="geo_index_") as tmp:
+        work_dir = Path(tmp)
+        sections = {name: SectionWriter(work_dir, name) for name in SECTIONS}
+        heap: Dict[str, tuple] = {}
+        strings = sections["strings"]
+        records = sections["records"]
+        for geoname_id, latitude, longitude, population, texts in rows:
+            refs = []
+            for text in texts:
+                ref = heap.get(text)
+                if ref is None:
+                    data = text.encode("utf-8")
+                    ref = heap[text] = (strings.write(data), len(data))
+                refs.extend(ref)
+            records.write(RECORD.pack(geoname_id, latitude, longitude, population, *refs))
+        sections["geoname_ids"].write_array("q", (item[0] for item in rows))
+        write_index_file(target, MAGIC, VERSION, SECTIONS, sections)
+        heap_bytes = strings.size
+
+    return {
+        "path": str(target),
+        "bytes": target.stat().st_size,
+        "places": len(rows),
+        "record_bytes": RECORD.size,
+        "string_heap_bytes": heap_bytes,
+        "distinct_strings": len(heap),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+class GeoIndex:
+    """Memory-mapped view of a binary places file, looked up by place_id/geoname_id."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._file = IndexFile(self.path, MAGIC, VERSION, SECTIONS)
+        self._ids = self._file.array("geoname_ids", "q")
+        self._records = self._file.start("records")
+        self._strings = self._file.start("strings")
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "GeoIndex":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, place_id: object) -> bool:
+        return self._position(place_id) is not None
+
+    def __iter__(self) -> Iterator[Dict[str, object]]:
+        for i in range(len(self._ids)):
+            yield self._place(i)
+
+    def _position(self, place_id: object) -> Optional[int]:
+        try:
+            geoname_id = int(place_id)
+        except (TypeError, ValueError):
+            return None
+        i = bisect_left(self._ids, geoname_id)
+        if i == len(self._ids) or self._ids[i] != geoname_id:
+            return None
+        return i
+
+    def _place(self, i: int) -> Dict[str, object]:
+        mm = self._file.mm
+        values = RECORD.unpack_from(mm, self._records + i * RECORD.size)
+        geoname_id, latitude, longitude, population = values[:4]
+        place: Dict[str, object] = {
+            "place_id": str(geoname_id),
+            "geoname_id": geoname_id,
+            "latitude": latitude,
+            "longitude": longitude,
+            "population": population,
+        }
+        for n, name in enumerate(STRING_FIELDS):
+            start = self._strings + values[4 + 2 * n]
+            place[name] = mm[start : start + values[5 + 2 * n]].decode("utf-8")
+        return place
+
+    def get(self, place_id: object) -> Optional[Dict[str, object]]:
+        """The cis_places.csv columns of a place (numbers parsed), or None."""
+        i = self._position(place_id)
+        return None if i is None else self._place(i)
+
+    def by_geoname_id(self, geoname_id: int) -> Optional[Dict[str, object]]:
+        return self.get(geoname_id)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Look places up in a binary places file.")
+    parser.add_argument("index", help="Path to cis_places.idx.")
+    parser.add_argument("place_ids", nargs="+", help="place_id/geoname_id values to resolve.")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    with GeoIndex(Path(args.index)) as index:
+        places = {place_id: index.get(place_id) for place_id in args.place_ids}
+    print(json.dumps(places, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
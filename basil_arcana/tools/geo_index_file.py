@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+File container shared by the prebuilt geo index files.
+
+A file is a header (magic, version, section count), an (offset, size) entry
+per named section, and the sections themselves. Sections are 8-byte aligned
+and little-endian, so numeric ones are memory-mapped and cast in place.
+"""
+
+from __future__ import annotations
+
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence
+
+HEADER = struct.Struct("<8sII")
+SECTION = struct.Struct("<QQ")
+ALIGNMENT = 8
+
+# Display record stored once per place, tab-separated, newline-terminated.
+RECORD_FIELDS = (
+    "placeId",
+    "cityName",
+    "admin1Name",
+    "countryCode",
+    "countryName",
+    "latitude",
+    "longitude",
+    "timezone",
+    "population",
+)
+
+
+def record_line(row: List[str]) -> bytes:
+    """Record for one cis_places.csv row."""
+    # place_id, city_name, admin1_name, country_code, country_name,
+    # latitude, longitude, timezone, population
+    values = (row[0], row[7], row[5], row[2], row[3], row[9], row[10], row[11], row[12])
+    return ("\t".join(v.replace("\t", " ").replace("\n", " ") for v in values) + "\n").encode("utf-8")
+
+
+def parse_record(values: List[str]) -> Dict[str, object]:
+    record: Dict[str, object] = dict(zip(RECORD_FIELDS, values))
+    record["latitude"] = float(values[5])
+    record["longitude"] = float(values[6])
+    record["population"] = int(values[8] or 0)
+    return record
+
+
+class SectionWriter:
+    """An append-only section spooled to a temp file."""
+
+    def __init__(self, work_dir: Path, name: str) -> None:
+        self.path = work_dir / f"section.{name}"
+        self.fp = self.path.open("wb")
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        offset = self.size
+        self.fp.write(data)
+        self.size += len(data)
+        return offset
+
+    def write_array(self, typecode: str, values: Iterable[object]) -> None:
+        data = array(typecode, values)
+        if sys.byteorder != "little":
+            data.byteswap()
+        self.write(data.tobytes())
+
+    def write_ints(self, values: Iterable[int]) -> None:
+        self.write_array("I", values)
+
+
+def write_index_file(
+    target: Path,
+    magic: bytes,
+    version: int,
+    names: Sequence[str],
+    sections: Dict[str, SectionWriter],
+) -> None:
+    """Assemble the sections into ``target`` atomically."""
+    header_size = HEADER.size + SECTION.size * len(names)
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(bytes(header_size))
+            table = []
+            for name in names:
+                section = sections[name]
+                section.fp.close()
+                out.write(bytes(-out.tell() % ALIGNMENT))
+                offset = out.tell()
+                with section.path.open("rb") as src:
+                    while True:
+                        chunk = src.read(1 << 20)
+                        if not chunk:
+                            break
+                        out.write(chunk)
+                table.append(SECTION.pack(offset, section.size))
+            out.seek(0)
+            out.write(HEADER.pack(magic, version, len(names)))
+            out.write(b"".join(table))
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, target)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+class IndexFile:
+    """Memory-mapped sections of one index file."""
+
+    def __init__(self, path: Path, magic: bytes, version: int, names: Sequence[str]) -> None:
+        self.path = Path(path)
+        with self.path.open("rb") as fp:
+            self.mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        found_magic, found_version, count = HEADER.unpack_from(self.mm, 0)
+        if found_magic != magic or found_version != version or count != len(names):
+            self.mm.close()
+            raise ValueError(f"{path}: not a {magic.decode('ascii')} v{version} file")
+        self.sections: Dict[str, tuple] = {}
+        for i, name in enumerate(names):
+            self.sections[name] = SECTION.unpack_from(self.mm, HEADER.size + i * SECTION.size)
+        self._views: List[memoryview] = []
+
+    def start(self, name: str) -> int:
+        """File offset of a blob section; slice ``mm`` from there for bytes."""
+        return self.sections[name][0]
+
+    def array(self, name: str, typecode: str) -> Sequence:
+        offset, size = self.sections[name]
+        view = memoryview(self.mm)[offset : offset + size].cast(typecode)
+        if sys.byteorder != "little":
+            swapped = array(typecode, view)
+            swapped.byteswap()
+            view.release()
+            return swapped
+        self._views.append(view)
+        return view
+
+    def record(self, blob: str, offset: int) -> List[str]:
+        start = self.start(blob) + offset
+        end = self.mm.find(b"\n", start)
+        return self.mm[start:end].decode("utf-8").split("\t")
+
+    def close(self) -> None:
+        for view in self._views:
+            view.release()
+        self._views.clear()
+        self.mm.close()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Timing and memory metrics for the geo build.
+
+``BuildMetrics`` times named stages of a run; ``timed`` charges the time spent
+producing each item of an iterator to a counter, for work that is interleaved
+with its consumer (e.g. decompressing a dump while its lines are parsed).
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, Optional, TypeVar
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+T = TypeVar("T")
+
+
+def peak_rss_mb() -> Dict[str, Optional[float]]:
+    """Peak resident set size of this process and of its largest finished child."""
+    if resource is None:
+        return {"self": None, "children": None}
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale, 1),
+        "children": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale, 1),
+    }
+
+
+def timed(items: Iterable[T], counters: Dict[str, float], key: str) -> Iterator[T]:
+    """Yield ``items``, adding the time spent producing them to ``counters[key]``."""
+    iterator = iter(items)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            counters[key] += time.perf_counter() - started
+            return
+        counters[key] += time.perf_counter() - started
+        yield item
+
+
+class BuildMetrics:
+    """Wall time per named stage of one build."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - started
+
+    def summary(self) -> Dict[str, object]:
+        return {
+            "total_seconds": round(time.perf_counter() - self.started, 3),
+            "stages": {name: round(seconds, 3) for name, seconds in self.stages.items()},
+            "peak_rss_mb": peak_rss_mb(),
+        }
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Alias usage from an autocomplete query log.
+
+The log is a CSV with a header naming at least ``query`` and ``place_id``
+(what was typed and which place was picked), and optionally ``count`` for
+pre-aggregated rows. Queries are normalized like aliases, so an alias is hit
+by every logged query for its place that it starts with, and also by queries
+that its Latin spellings start with.
+"""
+
+from __future__ import annotations
+
+import csv
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict
+
+from geo_text import normalize_alias, transliteration_variants
+
+# place_id -> normalized query -> times the place was picked for it
+QueryUsage = Dict[str, Dict[str, int]]
+
+
+def load_query_log(path: Path) -> QueryUsage:
+    usage: QueryUsage = defaultdict(lambda: defaultdict(int))
+    with path.open("r", encoding="utf-8", newline="") as fp:
+        reader = csv.DictReader(fp)
+        missing = {"query", "place_id"} - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"{path}: query log needs columns {', '.join(sorted(missing))}")
+        has_count = "count" in (reader.fieldnames or ())
+        for row in reader:
+            query = normalize_alias(row["query"] or "")
+            place_id = (row["place_id"] or "").strip()
+            if not query or not place_id:
+                continue
+            try:
+                count = int(row["count"]) if has_count else 1
+            except (TypeError, ValueError):
+                continue
+            if count > 0:
+                usage[place_id][query] += count
+    return {place_id: dict(queries) for place_id, queries in usage.items()}
+
+
+def alias_hits(normalized: str, queries: Dict[str, int]) -> int:
+    """Logged picks of a place whose query is a prefix of this alias or of its Latin spellings."""
+    spellings = [normalized] + [normalize_alias(text) for text, _ in transliteration_variants(normalized)]
+    # A query that prefixes several spellings is counted once.
+    prefixes = {spelling[:end] for spelling in spellings for end in range(1, len(spelling) + 1)}
+    return sum(queries.get(prefix, 0) for prefix in prefixes)
+
+
+def usage_summary(path: Path, usage: QueryUsage) -> Dict[str, object]:
+    return {
+        "path": str(path),
+        "places": len(usage),
+        "distinct_queries": sum(len(queries) for queries in usage.values()),
+        "picks": sum(sum(queries.values()) for queries in usage.values()),
+    }
@@ -0,0 +1,494 @@
+#!/usr/bin/env python3
+"""
+Prebuilt autocomplete index for the CIS places reference.
+
+The index is one memory-mappable file built from cis_places.csv and
+cis_place_aliases.csv. Places are numbered by rank (population desc), so every
+posting list is sorted best-first and a top-K lookup can stop after K hits:
+
+- a sorted table of normalized aliases with the ranks of their places
+  (exact and prefix lookups by binary search);
+- top-K ranks for short prefixes matching too many aliases to scan;
+- trigram postings of place ranks (infix lookups);
+- the alias ids of every place, to confirm trigram candidates;
+- one display record per place.
+
+Building never holds the alias or trigram postings in memory: (key, rank)
+lines are spilled to sorted runs and merged, as the builder does for places.
+
+Query from the command line:
+    python3 basil_arcana/tools/geo_search_index.py basil_arcana/server/data/geo/cis_places_search.idx "алма"
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import heapq
+import json
+import tempfile
+import time
+from array import array
+from bisect import bisect_left
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from geo_index_file import IndexFile, SectionWriter, parse_record, record_line, write_index_file
+from geo_text import normalize_alias
+
+MAGIC = b"BAGEOIX1"
+VERSION = 1
+TOP_K = 50
+# Prefix ranges up to this many aliases are scanned at query time; larger
+# ones (only short prefixes in practice) get a precomputed top-K list.
+SCAN_LIMIT = 32
+HOT_PREFIX_MAX_CHARS = 6
+SPILL_RUN_LINES = 500_000
+RANK_WIDTH = 8
+SECTIONS = (
+    "records",
+    "record_offsets",
+    "keys",
+    "keys_offsets",
+    "keys_postings",
+    "keys_posting_offsets",
+    "hot",
+    "hot_offsets",
+    "hot_postings",
+    "hot_posting_offsets",
+    "trigrams",
+    "trigrams_offsets",
+    "trigrams_postings",
+    "trigrams_posting_offsets",
+    "place_keys",
+    "place_key_offsets",
+)
+
+
+def trigrams(text: str) -> Set[str]:
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class _SortedSpill:
+    """Lines spilled to sorted run files and read back in one merged order."""
+
+    def __init__(self, work_dir: Path, name: str, run_lines: int = SPILL_RUN_LINES) -> None:
+        self.work_dir = work_dir
+        self.name = name
+        self.run_lines = run_lines
+        self.pending: List[str] = []
+        self.runs: List[Path] = []
+
+    def add(self, line: str) -> None:
+        self.pending.append(line)
+        if len(self.pending) >= self.run_lines:
+            self._spill()
+
+    def extend(self, lines: Iterable[str]) -> None:
+        self.pending.extend(lines)
+        if len(self.pending) >= self.run_lines:
+            self._spill()
+
+    def _spill(self) -> None:
+        path = self.work_dir / f"{self.name}.{len(self.runs):04d}.txt"
+        self.pending.sort()
+        with path.open("w", encoding="utf-8") as fp:
+            fp.writelines(f"{line}\n" for line in self.pending)
+        self.runs.append(path)
+        self.pending = []
+
+    def __iter__(self) -> Iterator[str]:
+        if self.pending:
+            self._spill()
+        handles = [path.open("r", encoding="utf-8") for path in self.runs]
+        try:
+            for line in heapq.merge(*handles):
+                yield line[:-1]
+        finally:
+            for handle in handles:
+                handle.close()
+
+
+def _iter_groups(lines: Iterable[str]) -> Iterator[Tuple[str, List[int]]]:
+    """Group sorted "key\\trank" lines into (key, ascending unique ranks)."""
+    current: Optional[str] = None
+    ranks: List[int] = []
+    for line in lines:
+        key, _, rank_text = line.rpartition("\t")
+        rank = int(rank_text)
+        if key != current:
+            if current is not None:
+                yield current, ranks
+            current, ranks = key, [rank]
+        elif ranks[-1] != rank:
+            ranks.append(rank)
+    if current is not None:
+        yield current, ranks
+
+
+class _PostingTable:
+    """Sorted string keys with one uint32 posting list each."""
+
+    def __init__(self, work_dir: Path, name: str) -> None:
+        self.keys = SectionWriter(work_dir, name)
+        self.postings = SectionWriter(work_dir, f"{name}_postings")
+        self.key_offsets = array("I", [0])
+        self.posting_offsets = array("I", [0])
+
+    def add(self, key: str, postings: Sequence[int]) -> None:
+        self.keys.write(key.encode("utf-8"))
+        self.key_offsets.append(self.keys.size)
+        self.postings.write_ints(postings)
+        self.posting_offsets.append(self.posting_offsets[-1] + len(postings))
+
+    def __len__(self) -> int:
+        return len(self.key_offsets) - 1
+
+
+class _HotPrefixes:
+    """Tracks top-K ranks for prefixes of up to HOT_PREFIX_MAX_CHARS chars."""
+
+    def __init__(self) -> None:
+        self.open: Dict[int, Tuple[str, int, List[int]]] = {}
+        self.done: List[Tuple[str, List[int]]] = []
+
+    def add(self, key: str, ranks: List[int]) -> None:
+        for length in range(1, min(HOT_PREFIX_MAX_CHARS, len(key)) + 1):
+            prefix = key[:length]
+            current = self.open.get(length)
+            if current is not None and current[0] != prefix:
+                self._close(length)
+                current = None
+            if current is None:
+                self.open[length] = (prefix, 1, ranks[:TOP_K])
+                continue
+            top = current[2]
+            # Postings are ascending, so they only matter if they beat the
+            # current K-th best rank.
+            if len(top) < TOP_K or ranks[0] < top[-1]:
+                top = sorted(set(top).union(ranks[:TOP_K]))[:TOP_K]
+            self.open[length] = (prefix, current[1] + 1, top)
+        # Longer prefixes of the previous key cannot continue past a shorter key.
+        for length in [n for n in self.open if n > len(key)]:
+            self._close(length)
+
+    def _close(self, length: int) -> None:
+        prefix, count, top = self.open.pop(length)
+        if count > SCAN_LIMIT:
+            self.done.append((prefix, top))
+
+    def finish(self) -> List[Tuple[str, List[int]]]:
+        for length in list(self.open):
+            self._close(length)
+        return sorted(self.done, key=lambda item: item[0].encode("utf-8"))
+
+
+def build_search_index(places_csv: Path, aliases_csv: Path, target: Path) -> Dict[str, object]:
+    """Build the index file for one pair of reference CSVs."""
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="geo_search_") as tmp:
+        work_dir = Path(tmp)
+        sections: Dict[str, SectionWriter] = {}
+
+        # Places: records in CSV order, ranked afterwards.
+        records = SectionWriter(work_dir, "records")
+        record_starts = array("I")
+        populations = array("q")
+        geoname_ids = array("q")
+        row_index: Dict[str, int] = {}
+        with places_csv.open("r", encoding="utf-8", newline="") as fp:
+            reader = csv.reader(fp)
+            next(reader, None)
+            for row in reader:
+                row_index[row[0]] = len(record_starts)
+                record_starts.append(records.write(record_line(row)))
+                populations.append(int(row[12] or 0))
+                geoname_ids.append(int(row[1]))
+        order = sorted(range(len(record_starts)), key=lambda i: (-populations[i], geoname_ids[i]))
+        rank_of = array("I", bytes(4 * len(order)))
+        for rank, index in enumerate(order):
+            rank_of[index] = rank
+        sections["records"] = records
+        sections["record_offsets"] = SectionWriter(work_dir, "record_offsets")
+        sections["record_offsets"].write_ints(record_starts[index] for index in order)
+        del populations, geoname_ids, order
+
+        # Aliases: spill (key, rank) and (trigram, rank) lines.
+        key_spill = _SortedSpill(work_dir, "keys")
+        trigram_spill = _SortedSpill(work_dir, "trigrams")
+        # Alias rows of one place are adjacent, so trigrams are deduplicated
+        # per place before they are spilled.
+        place_trigrams: Set[str] = set()
+        place_rank = ""
+        with aliases_csv.open("r", encoding="utf-8", newline="") as fp:
+            reader = csv.reader(fp)
+            next(reader, None)
+            for row in reader:
+                index = row_index.get(row[0])
+                key = row[2]
+                if index is None or not key:
+                    continue
+                rank = f"{rank_of[index]:0{RANK_WIDTH}d}"
+                if rank != place_rank:
+                    trigram_spill.extend(f"{trigram}\t{place_rank}" for trigram in place_trigrams)
+                    place_trigrams = set()
+                    place_rank = rank
+                key_spill.add(f"{key}\t{rank}")
+                place_trigrams.update(trigrams(key))
+        trigram_spill.extend(f"{trigram}\t{place_rank}" for trigram in place_trigrams)
+        del row_index
+
+        # Keys and hot prefixes in one pass over the merged key lines; the
+        # place -> key links are spilled again to be grouped by rank.
+        keys = _PostingTable(work_dir, "keys")
+        hot = _HotPrefixes()
+        place_key_spill = _SortedSpill(work_dir, "place_keys")
+        for key, ranks in _iter_groups(key_spill):
+            key_id = len(keys)
+            keys.add(key, ranks)
+            hot.add(key, ranks)
+            for rank in ranks:
+                place_key_spill.add(f"{rank:0{RANK_WIDTH}d}\t{key_id}")
+
+        hot_table = _PostingTable(work_dir, "hot")
+        for prefix, top in hot.finish():
+            hot_table.add(prefix, top)
+
+        trigram_table = _PostingTable(work_dir, "trigrams")
+        for trigram, ranks in _iter_groups(trigram_spill):
+            trigram_table.add(trigram, ranks)
+
+        place_keys = SectionWriter(work_dir, "place_keys")
+        place_key_offsets = array("I", [0])
+        count = 0
+        expected_rank = 0
+        for line in place_key_spill:
+            rank_text, _, key_id = line.partition("\t")
+            rank = int(rank_text)
+            while expected_rank < rank:
+                place_key_offsets.append(count)
+                expected_rank += 1
+            place_keys.write_ints((int(key_id),))
+            count += 1
+        while len(place_key_offsets) <= len(record_starts):
+            place_key_offsets.append(count)
+
+        for name, table in (("keys", keys), ("hot", hot_table), ("trigrams", trigram_table)):
+            sections[name] = table.keys
+            sections[f"{name}_postings"] = table.postings
+            for suffix, values in (("offsets", table.key_offsets), ("posting_offsets", table.posting_offsets)):
+                section = SectionWriter(work_dir, f"{name}_{suffix}")
+                section.write_ints(values)
+                sections[f"{name}_{suffix}"] = section
+        sections["place_keys"] = place_keys
+        sections["place_key_offsets"] = SectionWriter(work_dir, "place_key_offsets")
+        sections["place_key_offsets"].write_ints(place_key_offsets)
+
+        write_index_file(target, MAGIC, VERSION, SECTIONS, sections)
+        summary = {
+            "path": str(target),
+            "bytes": target.stat().st_size,
+            "places": len(record_starts),
+            "keys": len(keys),
+            "hot_prefixes": len(hot_table),
+            "trigrams": len(trigram_table),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+    return summary
+
+
+class GeoSearchIndex:
+    """Read-only, memory-mapped view of a search index file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._file = IndexFile(self.path, MAGIC, VERSION, SECTIONS)
+        self._mm = self._file.mm
+        # Blob sections are read through the mmap, whose slices are bytes.
+        self._blob_starts = {name: self._file.start(name) for name in ("records", "keys", "hot", "trigrams")}
+        self._ints: Dict[str, Sequence[int]] = {
+            name: self._file.array(name, "I") for name in SECTIONS if name not in self._blob_starts
+        }
+        self.places = len(self._ints["record_offsets"])
+
+    def close(self) -> None:
+        self._ints.clear()
+        self._file.close()
+
+    def __enter__(self) -> "GeoSearchIndex":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    # Table access -----------------------------------------------------------
+
+    def _key(self, table: str, i: int) -> bytes:
+        offsets = self._ints[f"{table}_offsets"]
+        start = self._blob_starts[table]
+        return self._mm[start + offsets[i] : start + offsets[i + 1]]
+
+    def _table_size(self, table: str) -> int:
+        return len(self._ints[f"{table}_offsets"]) - 1
+
+    def _lower_bound(self, table: str, key: bytes) -> int:
+        offsets = self._ints[f"{table}_offsets"]
+        start = self._blob_starts[table]
+        mm = self._mm
+        lo, hi = 0, len(offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if mm[start + offsets[mid] : start + offsets[mid + 1]] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _find(self, table: str, key: bytes) -> int:
+        i = self._lower_bound(table, key)
+        if i < self._table_size(table) and self._key(table, i) == key:
+            return i
+        return -1
+
+    def _postings(self, table: str, i: int) -> Sequence[int]:
+        offsets = self._ints[f"{table}_posting_offsets"]
+        return self._ints[f"{table}_postings"][offsets[i] : offsets[i + 1]]
+
+    def _record_fields(self, rank: int) -> List[str]:
+        return self._file.record("records", self._ints["record_offsets"][rank])
+
+    def record(self, rank: int) -> Dict[str, object]:
+        return parse_record(self._record_fields(rank))
+
+    def _country(self, rank: int) -> str:
+        return self._record_fields(rank)[3]
+
+    # Lookups ----------------------------------------------------------------
+
+    def exact(self, key: str) -> Sequence[int]:
+        i = self._find("keys", key.encode("utf-8"))
+        return self._postings("keys", i) if i >= 0 else ()
+
+    def prefix(self, prefix: str) -> Iterator[int]:
+        """Ranks of places with an alias starting with ``prefix``, best first."""
+        encoded = prefix.encode("utf-8")
+        lo = self._lower_bound("keys", encoded)
+        # 0xFF never occurs in UTF-8, so this bounds every key with the prefix.
+        hi = self._lower_bound("keys", encoded + b"\xff")
+        if hi - lo > SCAN_LIMIT:
+            hot = self._find("hot", encoded)
+            if hot >= 0:
+                top = self._postings("hot", hot)
+                yield from top
+                # The precomputed list is the exact top-K; only filtered or
+                # deep lookups get this far and continue from the full scan.
+                if len(top) == TOP_K:
+                    for rank in self._scan(lo, hi):
+                        if rank > top[-1]:
+                            yield rank
+                return
+        yield from self._scan(lo, hi)
+
+    def _scan(self, lo: int, hi: int) -> Iterator[int]:
+        previous = -1
+        for rank in heapq.merge(*(self._postings("keys", i) for i in range(lo, hi))):
+            if rank != previous:
+                previous = rank
+                yield rank
+
+    def infix(self, text: str) -> Iterator[int]:
+        """Ranks of places with an alias containing ``text`` (3+ chars), best first."""
+        grams = trigrams(text)
+        if not grams:
+            return
+        postings = []
+        for gram in grams:
+            i = self._find("trigrams", gram.encode("utf-8"))
+            if i < 0:
+                return
+            postings.append(self._postings("trigrams", i))
+        postings.sort(key=len)
+        shortest, others = postings[0], postings[1:]
+        encoded = text.encode("utf-8")
+        place_keys = self._ints["place_keys"]
+        place_key_offsets = self._ints["place_key_offsets"]
+        for rank in shortest:
+            if not all(_contains(other, rank) for other in others):
+                continue
+            # Trigrams can match across different aliases; confirm one alias
+            # really contains the text.
+            for j in range(place_key_offsets[rank], place_key_offsets[rank + 1]):
+                if encoded in self._key("keys", place_keys[j]):
+                    yield rank
+                    break
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        countries: Optional[Sequence[str]] = None,
+    ) -> List[Dict[str, object]]:
+        """Exact matches, then prefix, then infix matches, each by population."""
+        normalized = normalize_alias(query)
+        if len(normalized) < 2:
+            return []
+        allowed = {code.upper() for code in countries} if countries else None
+        seen: Set[int] = set()
+        ranks: List[int] = []
+        for source in (self.exact(normalized), self.prefix(normalized), self.infix(normalized)):
+            if len(ranks) >= limit:
+                break
+            for rank in source:
+                if rank in seen:
+                    continue
+                seen.add(rank)
+                if allowed is not None and self._country(rank) not in allowed:
+                    continue
+                ranks.append(rank)
+                if len(ranks) >= limit:
+                    break
+        return [self.record(rank) for rank in ranks]
+
+
+def _contains(sorted_values: Sequence[int], value: int) -> bool:
+    i = bisect_left(sorted_values, value)
+    return i < len(sorted_values) and sorted_values[i] == value
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Query a prebuilt geo search index.")
+    parser.add_argument("index", help="Path to cis_places_search.idx.")
+    parser.add_argument("query", nargs="+", help="Query text(s).")
+    parser.add_argument("--limit", type=int, default=20, help="Max results per query.")
+    parser.add_argument("--countries", default="", help="Optional comma-separated country filter.")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=0,
+        help="Also time each query over this many runs and report microseconds per query.",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    countries = [x.strip() for x in args.countries.split(",") if x.strip()] or None
+    with GeoSearchIndex(Path(args.index)) as index:
+        output = []
+        for query in args.query:
+            entry: Dict[str, object] = {
+                "query": query,
+                "results": index.search(query, args.limit, countries),
+            }
+            if args.repeat > 0:
+                started = time.perf_counter()
+                for _ in range(args.repeat):
+                    index.search(query, args.limit, countries)
+                entry["us_per_query"] = round((time.perf_counter() - started) * 1e6 / args.repeat, 1)
+            output.append(entry)
+    print(json.dumps(output, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Prebuilt nearest-place index for the CIS places reference.
+
+Places are stored as unit vectors on the sphere in an implicit, balanced k-d
+tree (points in tree order, the split point of every range at its middle), so
+K-nearest lookups by great-circle distance need no special cases for the 180th
+meridian or the poles. The file is memory-mapped and shares the container and
+display records of the search index.
+
+Query from the command line:
+    python3 basil_arcana/tools/geo_spatial_index.py basil_arcana/server/data/geo/cis_places_spatial.idx 55.75 37.62 -k 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import heapq
+import json
+import math
+import tempfile
+import time
+from array import array
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from geo_index_file import IndexFile, SectionWriter, parse_record, record_line, write_index_file
+
+MAGIC = b"BAGEOKD1"
+VERSION = 1
+# Ranges of at most this many points are scanned instead of split further.
+LEAF_SIZE = 16
+EARTH_RADIUS_KM = 6371.0088
+SECTIONS = ("records", "record_offsets", "x", "y", "z", "population")
+
+
+def unit_vector(lat: float, lon: float) -> Tuple[float, float, float]:
+    phi = math.radians(lat)
+    lam = math.radians(lon)
+    cos_phi = math.cos(phi)
+    return (cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi))
+
+
+def chord_to_km(chord_squared: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(chord_squared) / 2))
+
+
+def _kd_order(points: List[Tuple[float, float, float, int]]) -> List[Tuple[float, float, float, int]]:
+    """Reorder points in place into implicit k-d tree order."""
+    stack = [(0, len(points), 0)]
+    while stack:
+        lo, hi, axis = stack.pop()
+        if hi - lo <= LEAF_SIZE:
+            continue
+        points[lo:hi] = sorted(points[lo:hi], key=lambda point: point[axis])
+        mid = (lo + hi) // 2
+        next_axis = (axis + 1) % 3
+        stack.append((lo, mid, next_axis))
+        stack.append((mid + 1, hi, next_axis))
+    return points
+
+
+def build_spatial_index(places_csv: Path, target: Path) -> Dict[str, object]:
+    """Build the index file for cis_places.csv."""
+    started = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="geo_spatial_") as tmp:
+        work_dir = Path(tmp)
+        records = SectionWriter(work_dir, "records")
+        record_starts = array("I")
+        populations = array("q")
+        points: List[Tuple[float, float, float, int]] = []
+        with places_csv.open("r", encoding="utf-8", newline="") as fp:
+            reader = csv.reader(fp)
+            next(reader, None)
+            for row in reader:
+                index = len(record_starts)
+                record_starts.append(records.write(record_line(row)))
+                populations.append(int(row[12] or 0))
+                points.append((*unit_vector(float(row[9]), float(row[10])), index))
+
+        _kd_order(points)
+        sections = {"records": records}
+        for name, values in (
+            ("record_offsets", (record_starts[point[3]] for point in points)),
+            ("x", (point[0] for point in points)),
+            ("y", (point[1] for point in points)),
+            ("z", (point[2] for point in points)),
+        ):
+            sections[name] = SectionWriter(work_dir, name)
+            sections[name].write_array("I" if name == "record_offsets" else "d", values)
+        sections["population"] = SectionWriter(work_dir, "population")
+        sections["population"].write_array("q", (populations[point[3]] for point in points))
+
+        write_index_file(target, MAGIC, VERSION, SECTIONS, sections)
+        return {
+            "path": str(target),
+            "bytes": target.stat().st_size,
+            "places": len(points),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+
+
+class GeoSpatialIndex:
+    """Read-only, memory-mapped view of a spatial index file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._file = IndexFile(self.path, MAGIC, VERSION, SECTIONS)
+        self._record_offsets = self._file.array("record_offsets", "I")
+        self._axes = (
+            self._file.array("x", "d"),
+            self._file.array("y", "d"),
+            self._file.array("z", "d"),
+        )
+        self._population = self._file.array("population", "q")
+        self.places = len(self._record_offsets)
+
+    def close(self) -> None:
+        self._axes = ()
+        self._file.close()
+
+    def __enter__(self) -> "GeoSpatialIndex":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def record(self, i: int) -> Dict[str, object]:
+        return parse_record(self._file.record("records", self._record_offsets[i]))
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int = 5,
+        min_population: int = 0,
+        max_distance_km: Optional[float] = None,
+    ) -> List[Dict[str, object]]:
+        """The ``k`` places closest to a point, nearest first, with ``distanceKm``."""
+        if k <= 0 or not self.places:
+            return []
+        target = unit_vector(latitude, longitude)
+        tx, ty, tz = target
+        xs, ys, zs = self._axes
+        population = self._population
+        # Max-heap of (-chord², index) holding the best k so far.
+        best: List[Tuple[float, int]] = []
+        worst = math.inf
+        if max_distance_km is not None:
+            worst = (2 * math.sin(min(math.pi, max_distance_km / EARTH_RADIUS_KM) / 2)) ** 2
+
+        # (lo, hi, axis, bound): bound is a lower limit on the chord² to any
+        # point of the range, rechecked when popped as ``worst`` shrinks.
+        stack = [(0, self.places, 0, 0.0)]
+        while stack:
+            lo, hi, axis, bound = stack.pop()
+            if bound >= worst:
+                continue
+            if hi - lo <= LEAF_SIZE:
+                for i in range(lo, hi):
+                    dx = xs[i] - tx
+                    dy = ys[i] - ty
+                    dz = zs[i] - tz
+                    d = dx * dx + dy * dy + dz * dz
+                    if d < worst and population[i] >= min_population:
+                        heapq.heappush(best, (-d, i))
+                        if len(best) > k:
+                            heapq.heappop(best)
+                        if len(best) == k:
+                            worst = -best[0][0]
+                continue
+            mid = (lo + hi) // 2
+            dx = xs[mid] - tx
+            dy = ys[mid] - ty
+            dz = zs[mid] - tz
+            d = dx * dx + dy * dy + dz * dz
+            if d < worst and population[mid] >= min_population:
+                heapq.heappush(best, (-d, mid))
+                if len(best) > k:
+                    heapq.heappop(best)
+                if len(best) == k:
+                    worst = -best[0][0]
+            diff = target[axis] - self._axes[axis][mid]
+            next_axis = (axis + 1) % 3
+            far_bound = max(bound, diff * diff)
+            if diff < 0:
+                stack.append((mid + 1, hi, next_axis, far_bound))
+                stack.append((lo, mid, next_axis, bound))
+            else:
+                stack.append((lo, mid, next_axis, far_bound))
+                stack.append((mid + 1, hi, next_axis, bound))
+        results = []
+        for neg_d, i in sorted(best, reverse=True):
+            record = self.record(i)
+            record["distanceKm"] = round(chord_to_km(-neg_d), 3)
+            results.append(record)
+        return results
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Query a prebuilt geo spatial index.")
+    parser.add_argument("index", help="Path to cis_places_spatial.idx.")
+    parser.add_argument("latitude", type=float)
+    parser.add_argument("longitude", type=float)
+    parser.add_argument("-k", type=int, default=5, help="Number of places to return.")
+    parser.add_argument("--min-population", type=int, default=0, help="Skip smaller places.")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=0,
+        help="Also time the lookup over this many runs and report microseconds per query.",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    with GeoSpatialIndex(Path(args.index)) as index:
+        output: Dict[str, object] = {
+            "results": index.nearest(args.latitude, args.longitude, args.k, args.min_population),
+        }
+        if args.repeat > 0:
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                index.nearest(args.latitude, args.longitude, args.k, args.min_population)
+            output["us_per_query"] = round((time.perf_counter() - started) * 1e6 / args.repeat, 1)
+    print(json.dumps(output, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Alias text normalization shared by the geo builder and the search index.
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import List, Tuple
+
+ALIAS_MIN_LEN = 2
+ALIAS_MAX_LEN = 120
+ALIAS_CACHE_SIZE = 1 << 16
+
+_ALIAS_PUNCT_RE = re.compile(r"[^\w\s\-']", flags=re.UNICODE)
+_ALIAS_UNUSABLE_RE = re.compile(r"[\d\W_]+", flags=re.UNICODE)
+# ASCII is NFKC-stable, so pure-ASCII aliases only need punctuation mapped
+# to spaces; this table does it in one C-level pass.
+_ASCII_PUNCT_TO_SPACE = {
+    code: " " for code in range(128) if _ALIAS_PUNCT_RE.fullmatch(chr(code))
+}
+
+
+@lru_cache(maxsize=ALIAS_CACHE_SIZE)
+def normalize_alias(value: str) -> str:
+    text = value.strip().lower()
+    if not text:
+        return ""
+    if text.isascii():
+        return " ".join(text.translate(_ASCII_PUNCT_TO_SPACE).split())
+    text = unicodedata.normalize("NFKC", text)
+    text = text.replace("ё", "е")
+    text = _ALIAS_PUNCT_RE.sub(" ", text)
+    return " ".join(text.split())
+
+
+def is_alias_usable(value: str) -> bool:
+    v = value.strip()
+    if not v:
+        return False
+    if len(v) < ALIAS_MIN_LEN or len(v) > ALIAS_MAX_LEN:
+        return False
+    if _ALIAS_UNUSABLE_RE.fullmatch(v):
+        return False
+    return True
+
+
+VARIANT_SOURCE = "source"
+VARIANT_TRANSLIT = "translit"
+VARIANT_TRANSLIT_KK = "translit_kk"
+
+# Same table as transliterateCyrillicToLatin in server/src/db.js, so a Latin
+# query matches the "translit" variant of a Cyrillic alias directly.
+CYRILLIC_TO_LATIN = {
+    "а": "a", "ә": "a", "б": "b", "в": "v", "г": "g", "ғ": "g", "д": "d", "е": "e", "ё": "e",
+    "ж": "zh", "з": "z", "и": "i", "й": "i", "к": "k", "қ": "k", "л": "l", "м": "m", "н": "n",
+    "ң": "n", "о": "o", "ө": "o", "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ұ": "u",
+    "ү": "u", "ф": "f", "х": "h", "һ": "h", "ц": "ts", "ч": "ch", "ш": "sh", "щ": "shch",
+    "ъ": "", "ы": "y", "і": "i", "ь": "", "э": "e", "ю": "yu", "я": "ya",
+}
+# Kazakh letters as commonly romanized in KZ place names (Qaraghandy, Shymkent).
+KAZAKH_TO_LATIN = {**CYRILLIC_TO_LATIN, "қ": "q", "ғ": "gh", "ң": "ng"}
+_KAZAKH_ONLY = frozenset("қғң")
+_CYRILLIC_TABLE = str.maketrans(CYRILLIC_TO_LATIN)
+_KAZAKH_TABLE = str.maketrans(KAZAKH_TO_LATIN)
+
+
+def transliteration_variants(normalized: str) -> List[Tuple[str, str]]:
+    """(text, variant) Latin spellings of a normalized Cyrillic alias."""
+    if normalized.isascii():
+        return []
+    variants = [(normalized.translate(_CYRILLIC_TABLE), VARIANT_TRANSLIT)]
+    if not _KAZAKH_ONLY.isdisjoint(normalized):
+        variants.append((normalized.translate(_KAZAKH_TABLE), VARIANT_TRANSLIT_KK))
+    return variants
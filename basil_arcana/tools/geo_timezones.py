@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Precomputed UTC-offset transition tables for the places reference.
+
+For every distinct timezone in cis_places.csv the build walks the system tz
+database (``zoneinfo``) over a range of years and stores each offset change
+as (UTC instant, UTC offset, DST part). Lookups for (place_id, datetime) are
+two binary searches over memory-mapped arrays: place_id -> zone, then instant
+-> offset, with no tz library work per request. Places whose timezone is
+empty or missing from the tz database are left out of the table (and listed
+in the build summary), so they resolve like unknown places instead of as UTC.
+
+Naive datetimes are local wall time at the place and follow ``zoneinfo``
+semantics: ``fold=0`` picks the earlier of two ambiguous times and the offset
+in force before a gap, ``fold=1`` the later one.
+
+Query from the command line:
+    python3 basil_arcana/tools/geo_timezones.py basil_arcana/server/data/geo/cis_timezones.idx 1526384 1986-04-27T03:30
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from zoneinfo import TZPATH, ZoneInfo, ZoneInfoNotFoundError
+
+from geo_index_file import IndexFile, SectionWriter, write_index_file
+
+MAGIC = b"BAGEOTZ1"
+VERSION = 1
+SECTIONS = (
+    "zone_names",
+    "zone_starts",
+    "transitions",
+    "utc_offsets",
+    "dst_offsets",
+    "place_ids",
+    "place_zones",
+)
+DEFAULT_START_YEAR = 1900
+DEFAULT_END_YEAR = 2100
+# Offsets are sampled once a day; each change is then bisected to the second.
+SAMPLE_SECONDS = 86400
+# Transition of the first entry of every zone: "since forever".
+BEGINNING = -(1 << 63)
+# No zone is further than this from UTC, which bounds the local-time search.
+MAX_OFFSET_SECONDS = 26 * 3600
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+NAIVE_EPOCH = datetime(1970, 1, 1)
+SECOND = timedelta(seconds=1)
+
+
+class ZoneOffset(NamedTuple):
+    zone: str
+    utc_offset: int
+    dst: int
+
+
+def tzdata_version() -> str:
+    for root in TZPATH:
+        path = Path(root) / "tzdata.zi"
+        if path.exists():
+            with path.open("r", encoding="utf-8") as fp:
+                first = fp.readline().strip()
+            if first.startswith("# version"):
+                return first.split()[-1]
+    return ""
+
+
+def _offsets_at(zone: ZoneInfo, instant: int) -> Tuple[int, int]:
+    local = datetime.fromtimestamp(instant, zone)
+    return int(local.utcoffset().total_seconds()), int(local.dst().total_seconds())
+
+
+def zone_transitions(name: str, start: int, end: int) -> List[Tuple[int, int, int]]:
+    """(instant, utc_offset, dst) entries for ``name``; the first starts at BEGINNING."""
+    zone = ZoneInfo(name)
+    current = _offsets_at(zone, start)
+    output = [(BEGINNING, *current)]
+    known = start
+    while known < end:
+        instant = min(known + SAMPLE_SECONDS, end)
+        if _offsets_at(zone, instant) == current:
+            known = instant
+            continue
+        # An offset change lies in (known, instant]; find its first second.
+        lo, hi = known, instant
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if _offsets_at(zone, mid) == current:
+                lo = mid
+            else:
+                hi = mid
+        current = _offsets_at(zone, hi)
+        output.append((hi, *current))
+        known = hi
+    return output
+
+
+def build_timezone_table(
+    places_csv: Path,
+    target: Path,
+    start_year: int = DEFAULT_START_YEAR,
+    end_year: int = DEFAULT_END_YEAR,
+) -> Dict[str, object]:
+    """Build the transition table file for the timezones used in cis_places.csv."""
+    started = time.perf_counter()
+    places: List[Tuple[int, str]] = []
+    with places_csv.open("r", encoding="utf-8", newline="") as fp:
+        reader = csv.reader(fp)
+        next(reader, None)
+        for row in reader:
+            places.append((int(row[1]), row[11]))
+    places.sort()
+
+    start = int(datetime(start_year, 1, 1, tzinfo=timezone.utc).timestamp())
+    end = int(datetime(end_year, 1, 1, tzinfo=timezone.utc).timestamp())
+    zone_names: List[str] = []
+    zone_index: Dict[str, int] = {}
+    unknown: List[str] = []
+    zone_starts = array("I", [0])
+    transitions = array("q")
+    utc_offsets = array("i")
+    dst_offsets = array("i")
+    for name in sorted({zone for _, zone in places}):
+        try:
+            if not name:
+                raise ValueError("empty timezone")
+            entries = zone_transitions(name, start, end)
+        except (ZoneInfoNotFoundError, ValueError):
+            # Left out rather than served as UTC: a wrong offset is worse than none.
+            unknown.append(name)
+            continue
+        zone_index[name] = len(zone_names)
+        zone_names.append(name)
+        for instant, offset, dst in entries:
+            transitions.append(instant)
+            utc_offsets.append(offset)
+            dst_offsets.append(dst)
+        zone_starts.append(len(transitions))
+
+    without_zone = len(places)
+    places = [(place_id, zone) for place_id, zone in places if zone in zone_index]
+    without_zone -= len(places)
+
+    with tempfile.TemporaryDirectory(prefix="geo_timezones_") as tmp:
+        work_dir = Path(tmp)
+        sections = {name: SectionWriter(work_dir, name) for name in SECTIONS}
+        sections["zone_names"].write("".join(f"{name}\n" for name in zone_names).encode("utf-8"))
+        sections["zone_starts"].write_array("I", zone_starts)
+        sections["transitions"].write_array("q", transitions)
+        sections["utc_offsets"].write_array("i", utc_offsets)
+        sections["dst_offsets"].write_array("i", dst_offsets)
+        sections["place_ids"].write_array("q", (place_id for place_id, _ in places))
+        sections["place_zones"].write_array("H", (zone_index[zone] for _, zone in places))
+        write_index_file(target, MAGIC, VERSION, SECTIONS, sections)
+
+    return {
+        "path": str(target),
+        "bytes": target.stat().st_size,
+        "tzdata_version": tzdata_version(),
+        "years": [start_year, end_year],
+        "zones": len(zone_names),
+        "transitions": len(transitions),
+        "places": len(places),
+        "unknown_zones": unknown,
+        "places_without_zone": without_zone,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+class GeoTimezones:
+    """Read-only, memory-mapped view of a timezone table file."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        self._file = IndexFile(self.path, MAGIC, VERSION, SECTIONS)
+        offset, size = self._file.sections["zone_names"]
+        self.zones = self._file.mm[offset : offset + size].decode("utf-8").splitlines()
+        self._zone_index = {name: i for i, name in enumerate(self.zones)}
+        self._zone_starts = self._file.array("zone_starts", "I")
+        self._transitions = self._file.array("transitions", "q")
+        self._utc_offsets = self._file.array("utc_offsets", "i")
+        self._dst_offsets = self._file.array("dst_offsets", "i")
+        self._place_ids = self._file.array("place_ids", "q")
+        self._place_zones = self._file.array("place_zones", "H")
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "GeoTimezones":
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+    def place_zone(self, place_id: object) -> Optional[str]:
+        """Timezone of a place, or None for a bad id or a place without one."""
+        try:
+            geoname_id = int(place_id)
+        except (TypeError, ValueError):
+            return None
+        i = bisect_left(self._place_ids, geoname_id)
+        if i == len(self._place_ids) or self._place_ids[i] != geoname_id:
+            return None
+        return self.zones[self._place_zones[i]]
+
+    def _entry(self, zone: int, instant: int) -> int:
+        lo, hi = self._zone_starts[zone], self._zone_starts[zone + 1]
+        return bisect_right(self._transitions, instant, lo, hi) - 1
+
+    def _local_entry(self, zone: int, local: int, fold: int) -> int:
+        """Entry whose offset maps wall time ``local`` (seconds, as if UTC) to an instant."""
+        first = self._entry(zone, local - MAX_OFFSET_SECONDS)
+        last = self._entry(zone, local + MAX_OFFSET_SECONDS)
+        matches = [
+            i for i in range(first, last + 1) if self._entry(zone, local - self._utc_offsets[i]) == i
+        ]
+        if matches:
+            return matches[-1] if fold else matches[0]
+        # A gap: the wall time is skipped by the change at the first entry that
+        # would place it before its own start.
+        for i in range(first + 1, last + 1):
+            if local - self._utc_offsets[i] < self._transitions[i]:
+                return i if fold else i - 1
+        return last
+
+    def zone_offset(self, zone: str, when: datetime) -> ZoneOffset:
+        """UTC offset of ``zone`` at ``when`` (aware, or naive local wall time)."""
+        index = self._zone_index.get(zone)
+        if index is None:
+            raise KeyError(f"unknown timezone {zone!r}")
+        if when.tzinfo is not None and when.utcoffset() is not None:
+            entry = self._entry(index, (when - EPOCH) // SECOND)
+        else:
+            entry = self._local_entry(index, (when - NAIVE_EPOCH) // SECOND, when.fold)
+        return ZoneOffset(zone, self._utc_offsets[entry], self._dst_offsets[entry])
+
+    def offset(self, place_id: str, when: datetime) -> ZoneOffset:
+        """UTC offset at a place; naive ``when`` is local wall time there."""
+        zone = self.place_zone(place_id)
+        if zone is None:
+            raise KeyError(f"unknown place_id or no timezone for {place_id!r}")
+        return self.zone_offset(zone, when)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Resolve UTC offsets from a prebuilt timezone table.")
+    parser.add_argument("table", help="Path to cis_timezones.idx.")
+    parser.add_argument("place_id", help="place_id from cis_places.csv.")
+    parser.add_argument("when", help="ISO datetime; without an offset it is local time at the place.")
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=0,
+        help="Also time the lookup over this many runs and report microseconds per lookup.",
+    )
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    when = datetime.fromisoformat(args.when)
+    with GeoTimezones(Path(args.table)) as table:
+        try:
+            result = table.offset(args.place_id, when)
+        except KeyError as exc:
+            print(exc.args[0], file=sys.stderr)
+            return 1
+        output: Dict[str, object] = {
+            "placeId": args.place_id,
+            "timezone": result.zone,
+            "utcOffsetSeconds": result.utc_offset,
+            "dstSeconds": result.dst,
+            "utcOffset": str(timedelta(seconds=result.utc_offset)),
+        }
+        if args.repeat > 0:
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                table.offset(args.place_id, when)
+            output["us_per_lookup"] = round((time.perf_counter() - started) * 1e6 / args.repeat, 2)
+    print(json.dumps(output, ensure_ascii=False, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Load the CIS places reference CSVs into PostgreSQL.
+
+Places and aliases are streamed into fresh staging tables with binary COPY,
+constraints and indexes are built once the data is in, and the staging tables
+are then swapped in for geo_places/geo_place_aliases. Everything runs in one
+transaction, so autocomplete keeps reading the previous tables until the swap
+commits, and a failed load leaves them untouched.
+
+Requires psycopg 3 (``pip install "psycopg[binary]"``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Sequence, Tuple
+
+from build_cis_cities_reference import ALIASES_HEADER, PLACES_HEADER
+
+DEFAULT_BATCH_ROWS = 100_000
+DEFAULT_LOCK_TIMEOUT = "10s"
+DEFAULT_MAINTENANCE_WORK_MEM = "256MB"
+
+PLACES_TABLE = "geo_places"
+ALIASES_TABLE = "geo_place_aliases"
+STAGING_SUFFIX = "_staging"
+OLD_SUFFIX = "_old"
+
+# Column types in PLACES_HEADER/ALIASES_HEADER order, as COPY BINARY needs them.
+PLACES_COLUMN_TYPES = [
+    "text",
+    "int8",
+    "text",
+    "text",
+    "text",
+    "text",
+    "text",
+    "text",
+    "text",
+    "float8",
+    "float8",
+    "text",
+    "int8",
+    "text",
+    "date",
+]
+ALIASES_COLUMN_TYPES = ["text", "text", "text", "bool", "text"]
+
+# Matches server/src/sql/geo_places_schema.sql, minus constraints and indexes,
+# which are added after the load.
+PLACES_STAGING_DDL = f"""
+CREATE TABLE {PLACES_TABLE}{STAGING_SUFFIX} (
+  place_id TEXT NOT NULL,
+  geoname_id BIGINT NOT NULL,
+  country_code TEXT NOT NULL,
+  country_name TEXT NOT NULL,
+  admin1_code TEXT NOT NULL DEFAULT '',
+  admin1_name TEXT NOT NULL DEFAULT '',
+  admin2_code TEXT NOT NULL DEFAULT '',
+  city_name TEXT NOT NULL,
+  city_name_ascii TEXT NOT NULL DEFAULT '',
+  latitude DOUBLE PRECISION NOT NULL,
+  longitude DOUBLE PRECISION NOT NULL,
+  timezone TEXT NOT NULL DEFAULT '',
+  population BIGINT NOT NULL DEFAULT 0,
+  feature_code TEXT NOT NULL DEFAULT '',
+  modification_date DATE NULL
+)
+"""
+ALIASES_STAGING_DDL = f"""
+CREATE TABLE {ALIASES_TABLE}{STAGING_SUFFIX} (
+  place_id TEXT NOT NULL,
+  alias TEXT NOT NULL,
+  alias_normalized TEXT NOT NULL,
+  is_primary BOOLEAN NOT NULL DEFAULT FALSE,
+  variant TEXT NOT NULL DEFAULT 'source'
+)
+"""
+
+# (table, final name, definition). They are created on the staging tables as
+# "<final name>_staging", so they never clash with the live tables' names, and
+# renamed to the final name after the swap.
+CONSTRAINTS: List[Tuple[str, str, str]] = [
+    (PLACES_TABLE, "geo_places_pkey", "PRIMARY KEY (place_id)"),
+    (PLACES_TABLE, "geo_places_geoname_id_key", "UNIQUE (geoname_id)"),
+    (ALIASES_TABLE, "geo_place_aliases_pkey", "PRIMARY KEY (place_id, alias_normalized)"),
+    (
+        ALIASES_TABLE,
+        "geo_place_aliases_place_id_fkey",
+        f"FOREIGN KEY (place_id) REFERENCES {PLACES_TABLE}{STAGING_SUFFIX}(place_id) ON DELETE CASCADE",
+    ),
+]
+INDEXES: List[Tuple[str, str, str]] = [
+    (PLACES_TABLE, "geo_places_country_population_idx", "(country_code, population DESC)"),
+    (ALIASES_TABLE, "geo_place_aliases_alias_norm_trgm_idx", "USING GIN (alias_normalized gin_trgm_ops)"),
+    (ALIASES_TABLE, "geo_place_aliases_place_id_idx", "(place_id)"),
+]
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Load the CIS places reference CSVs into PostgreSQL."
+    )
+    parser.add_argument(
+        "--database-url",
+        default=os.environ.get("DATABASE_URL", ""),
+        help="PostgreSQL connection string (defaults to $DATABASE_URL).",
+    )
+    parser.add_argument(
+        "--input-dir",
+        default="basil_arcana/server/data/geo",
+        help="Directory with cis_places.csv and cis_place_aliases.csv.",
+    )
+    parser.add_argument(
+        "--batch-rows",
+        type=int,
+        default=DEFAULT_BATCH_ROWS,
+        help="Rows per COPY batch; progress is reported after each batch.",
+    )
+    parser.add_argument(
+        "--lock-timeout",
+        default=DEFAULT_LOCK_TIMEOUT,
+        help="Give up the swap if the live tables stay locked longer than this.",
+    )
+    parser.add_argument(
+        "--maintenance-work-mem",
+        default=DEFAULT_MAINTENANCE_WORK_MEM,
+        help="maintenance_work_mem for the post-load index builds.",
+    )
+    return parser.parse_args()
+
+
+def place_values(row: List[str]) -> Tuple[Any, ...]:
+    return (
+        row[0],
+        int(row[1]),
+        row[2],
+        row[3],
+        row[4],
+        row[5],
+        row[6],
+        row[7],
+        row[8],
+        float(row[9]),
+        float(row[10]),
+        row[11],
+        int(row[12] or 0),
+        row[13],
+        date.fromisoformat(row[14]) if row[14] else None,
+    )
+
+
+def alias_values(row: List[str]) -> Tuple[Any, ...]:
+    return (row[0], row[1], row[2], row[3] == "1", row[4])
+
+
+def iter_csv_batches(
+    path: Path,
+    header: Sequence[str],
+    convert: Callable[[List[str]], Tuple[Any, ...]],
+    batch_rows: int,
+) -> Iterator[List[Tuple[Any, ...]]]:
+    with path.open("r", encoding="utf-8", newline="") as fp:
+        reader = csv.reader(fp)
+        found = next(reader, None)
+        if found != list(header):
+            raise ValueError(f"{path}: unexpected header {found!r}")
+        batch: List[Tuple[Any, ...]] = []
+        for row in reader:
+            batch.append(convert(row))
+            if len(batch) >= batch_rows:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+def copy_csv(
+    cur: Any,
+    table: str,
+    path: Path,
+    header: Sequence[str],
+    column_types: Sequence[str],
+    convert: Callable[[List[str]], Tuple[Any, ...]],
+    batch_rows: int,
+) -> int:
+    started = time.perf_counter()
+    total = 0
+    columns = ", ".join(header)
+    with cur.copy(f"COPY {table} ({columns}) FROM STDIN (FORMAT BINARY)") as copy:
+        copy.set_types(list(column_types))
+        for batch in iter_csv_batches(path, header, convert, batch_rows):
+            for values in batch:
+                copy.write_row(values)
+            total += len(batch)
+            elapsed = time.perf_counter() - started
+            print(
+                f"[copy] {table}: {total} rows, {total / max(elapsed, 1e-9):.0f} rows/s",
+                file=sys.stderr,
+            )
+    return total
+
+
+def post_load_statements() -> List[str]:
+    statements = [
+        f"ALTER TABLE {table}{STAGING_SUFFIX} ADD CONSTRAINT {name}{STAGING_SUFFIX} {definition}"
+        for table, name, definition in CONSTRAINTS
+    ]
+    statements += [
+        f"CREATE INDEX {name}{STAGING_SUFFIX} ON {table}{STAGING_SUFFIX} {definition}"
+        for table, name, definition in INDEXES
+    ]
+    statements += [f"ANALYZE {table}{STAGING_SUFFIX}" for table in (PLACES_TABLE, ALIASES_TABLE)]
+    return statements
+
+
+def swap_statements(live_exists: bool) -> List[str]:
+    statements: List[str] = []
+    if live_exists:
+        statements += [
+            f"ALTER TABLE {ALIASES_TABLE} RENAME TO {ALIASES_TABLE}{OLD_SUFFIX}",
+            f"ALTER TABLE {PLACES_TABLE} RENAME TO {PLACES_TABLE}{OLD_SUFFIX}",
+        ]
+    statements += [
+        f"ALTER TABLE {PLACES_TABLE}{STAGING_SUFFIX} RENAME TO {PLACES_TABLE}",
+        f"ALTER TABLE {ALIASES_TABLE}{STAGING_SUFFIX} RENAME TO {ALIASES_TABLE}",
+    ]
+    if live_exists:
+        # Frees the final constraint and index names for the renames below.
+        statements.append(f"DROP TABLE {ALIASES_TABLE}{OLD_SUFFIX}, {PLACES_TABLE}{OLD_SUFFIX}")
+    statements += [
+        f"ALTER TABLE {table} RENAME CONSTRAINT {name}{STAGING_SUFFIX} TO {name}"
+        for table, name, _ in CONSTRAINTS
+    ]
+    statements += [f"ALTER INDEX {name}{STAGING_SUFFIX} RENAME TO {name}" for _, name, _ in INDEXES]
+    return statements
+
+
+def load(
+    database_url: str,
+    places_path: Path,
+    aliases_path: Path,
+    batch_rows: int,
+    lock_timeout: str,
+    maintenance_work_mem: str,
+) -> dict:
+    try:
+        import psycopg
+    except ImportError as exc:
+        raise SystemExit('psycopg 3 is required: pip install "psycopg[binary]"') from exc
+
+    timings: dict = {}
+    started = time.perf_counter()
+    with psycopg.connect(database_url) as conn, conn.cursor() as cur:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        cur.execute(f"DROP TABLE IF EXISTS {ALIASES_TABLE}{STAGING_SUFFIX}, {PLACES_TABLE}{STAGING_SUFFIX}")
+        cur.execute(PLACES_STAGING_DDL)
+        cur.execute(ALIASES_STAGING_DDL)
+
+        step = time.perf_counter()
+        places = copy_csv(
+            cur,
+            f"{PLACES_TABLE}{STAGING_SUFFIX}",
+            places_path,
+            PLACES_HEADER,
+            PLACES_COLUMN_TYPES,
+            place_values,
+            batch_rows,
+        )
+        aliases = copy_csv(
+            cur,
+            f"{ALIASES_TABLE}{STAGING_SUFFIX}",
+            aliases_path,
+            ALIASES_HEADER,
+            ALIASES_COLUMN_TYPES,
+            alias_values,
+            batch_rows,
+        )
+        timings["copy_seconds"] = round(time.perf_counter() - step, 3)
+
+        step = time.perf_counter()
+        cur.execute("SELECT set_config('maintenance_work_mem', %s, true)", (maintenance_work_mem,))
+        for statement in post_load_statements():
+            print(f"[index] {statement}", file=sys.stderr)
+            cur.execute(statement)
+        timings["index_seconds"] = round(time.perf_counter() - step, 3)
+
+        step = time.perf_counter()
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL", (PLACES_TABLE,))
+        live_exists = bool(cur.fetchone()[0])
+        cur.execute("SELECT set_config('lock_timeout', %s, true)", (lock_timeout,))
+        for statement in swap_statements(live_exists):
+            cur.execute(statement)
+        timings["swap_seconds"] = round(time.perf_counter() - step, 3)
+    timings["total_seconds"] = round(time.perf_counter() - started, 3)
+    print("[swap] committed", file=sys.stderr)
+    return {"places": places, "aliases": aliases, "replaced_existing": live_exists, **timings}
+
+
+def main() -> int:
+    args = parse_args()
+    if not args.database_url:
+        print("No database URL (use --database-url or DATABASE_URL).", file=sys.stderr)
+        return 2
+    input_dir = Path(args.input_dir)
+    places_path = input_dir / "cis_places.csv"
+    aliases_path = input_dir / "cis_place_aliases.csv"
+    for path in (places_path, aliases_path):
+        if not path.exists():
+            print(f"Missing input: {path}", file=sys.stderr)
+            return 2
+
+    summary = load(
+        args.database_url,
+        places_path,
+        aliases_path,
+        max(1, args.batch_rows),
+        args.lock_timeout,
+        args.maintenance_work_mem,
+    )
+    print(json.dumps({"ok": True, **summary}, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
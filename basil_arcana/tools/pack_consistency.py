@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Cross-locale consistency checks for card and spread packs.
+
+Every locale file is indexed once while it is streamed through the validator
+(entry ID -> offset and locale-independent fields), and the indexes are then
+diffed against a reference locale with dict lookups, so the check stays linear
+in the number of entries per locale.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from pack_schema import pointer_join
+
+# (source file, JSON pointer, message)
+ConsistencyIssue = Tuple[str, str, str]
+
+
+@dataclass
+class IndexEntry:
+    offset: int
+    stats: Optional[Tuple[Tuple[str, Any], ...]] = None
+    cards_count: Any = None
+    position_ids: Optional[Tuple[Any, ...]] = None
+
+
+@dataclass
+class PackIndex:
+    name: str
+    kind: str
+    entries: Dict[str, IndexEntry] = field(default_factory=dict)
+    duplicates: List[str] = field(default_factory=list)
+
+    def add(self, key: Union[str, int], value: Any) -> None:
+        if self.kind == "cards":
+            entry_id = key
+            stats = value.get("stats") if isinstance(value, dict) else None
+            entry = IndexEntry(
+                offset=len(self.entries),
+                stats=tuple(sorted(stats.items())) if isinstance(stats, dict) else None,
+            )
+        else:
+            if not isinstance(value, dict) or not isinstance(value.get("id"), str):
+                return
+            entry_id = value["id"]
+            positions = value.get("positions")
+            # Array index of the spread, so pointers stay right when members
+            # without an id are skipped.
+            entry = IndexEntry(
+                offset=int(key),
+                cards_count=value.get("cardsCount"),
+                position_ids=tuple(
+                    pos.get("id") if isinstance(pos, dict) else None for pos in positions
+                )
+                if isinstance(positions, list)
+                else None,
+            )
+        if entry_id in self.entries:
+            self.duplicates.append(str(entry_id))
+            return
+        self.entries[str(entry_id)] = entry
+
+
+def index_for(name: str) -> PackIndex:
+    kind = "cards" if name.startswith("cards_") else "spreads"
+    return PackIndex(name=name, kind=kind)
+
+
+def _entry_pointer(index: PackIndex, entry_id: str) -> str:
+    if index.kind == "cards":
+        return pointer_join("", entry_id)
+    return pointer_join("", index.entries[entry_id].offset)
+
+
+def _diff_pair(reference: PackIndex, other: PackIndex) -> List[ConsistencyIssue]:
+    issues: List[ConsistencyIssue] = []
+    label = "card" if reference.kind == "cards" else "spread"
+
+    for entry_id, expected in reference.entries.items():
+        actual = other.entries.get(entry_id)
+        if actual is None:
+            issues.append((other.name, "", f"missing {label} {entry_id} (present in {reference.name})"))
+            continue
+        pointer = _entry_pointer(other, entry_id)
+        if reference.kind == "cards":
+            if actual.stats != expected.stats:
+                issues.append(
+                    (other.name, pointer_join(pointer, "stats"), f"stats differ from {reference.name}")
+                )
+            continue
+        if actual.cards_count != expected.cards_count:
+            issues.append(
+                (
+                    other.name,
+                    pointer_join(pointer, "cardsCount"),
+                    f"spread {entry_id}: cardsCount {actual.cards_count!r}"
+                    f" != {expected.cards_count!r} in {reference.name}",
+                )
+            )
+        if actual.position_ids != expected.position_ids:
+            issues.append(
+                (
+                    other.name,
+                    pointer_join(pointer, "positions"),
+                    f"spread {entry_id}: position ids differ from {reference.name}",
+                )
+            )
+
+    for entry_id in other.entries:
+        if entry_id in reference.entries:
+            continue
+        issues.append(
+            (other.name, _entry_pointer(other, entry_id), f"extra {label} {entry_id} (absent from {reference.name})")
+        )
+
+    # Compare order over the shared IDs only, so one missing entry does not
+    # flag every entry after it as misplaced.
+    reference_order = [entry_id for entry_id in reference.entries if entry_id in other.entries]
+    other_order = [entry_id for entry_id in other.entries if entry_id in reference.entries]
+    for expected_id, actual_id in zip(reference_order, other_order):
+        if expected_id != actual_id:
+            issues.append(
+                (
+                    other.name,
+                    _entry_pointer(other, actual_id),
+                    f"{label} {actual_id} is out of order (expected {expected_id} as in {reference.name})",
+                )
+            )
+    return issues
+
+
+def diff_indexes(indexes: Sequence[PackIndex]) -> List[ConsistencyIssue]:
+    """Diff every index against the first one of the same kind."""
+    issues: List[ConsistencyIssue] = []
+    references: Dict[str, PackIndex] = {}
+    for index in indexes:
+        for entry_id in index.duplicates:
+            issues.append((index.name, "", f"duplicate id {entry_id}"))
+        reference = references.setdefault(index.kind, index)
+        if reference is not index:
+            issues.extend(_diff_pair(reference, index))
+    return issues
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Concurrent, cache-aware fetching of remote JSON packs.
+
+Each worker thread keeps one keep-alive connection per host, requests are
+conditional on the ETag/Last-Modified of the local cache copy, transient
+failures are retried with exponential backoff, and bodies are streamed to disk
+so validators can read them back incrementally.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urljoin, urlsplit
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent / ".cache" / "packs"
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_RETRIES = 3
+BACKOFF_BASE_SECONDS = 0.5
+CHUNK_SIZE = 1 << 16
+MAX_REDIRECTS = 3
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+# RemoteDisconnected is a ConnectionResetError.
+STALE_SOCKET_ERRORS = (ConnectionResetError, BrokenPipeError)
+
+
+class FetchError(RuntimeError):
+    pass
+
+
+@dataclass(frozen=True)
+class FetchResult:
+    name: str
+    url: str
+    path: Path
+    status: int
+    seconds: float
+    attempts: int
+    size: int
+
+    @property
+    def from_cache(self) -> bool:
+        return self.status == 304
+
+
+class ConnectionPool:
+    """Keep-alive connections, one per (thread, host), closed together."""
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._opened: List[http.client.HTTPConnection] = []
+
+    def _connections(self) -> Dict[Tuple[str, str], http.client.HTTPConnection]:
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        return connections
+
+    def get(self, scheme: str, netloc: str, timeout: float) -> http.client.HTTPConnection:
+        connections = self._connections()
+        conn = connections.get((scheme, netloc))
+        if conn is None:
+            factory = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = factory(netloc, timeout=timeout)
+            connections[(scheme, netloc)] = conn
+            with self._lock:
+                self._opened.append(conn)
+        return conn
+
+    def drop(self, scheme: str, netloc: str) -> None:
+        conn = self._connections().pop((scheme, netloc), None)
+        if conn is not None:
+            conn.close()
+
+    def close_all(self) -> None:
+        with self._lock:
+            for conn in self._opened:
+                conn.close()
+            self._opened.clear()
+
+
+def meta_path(path: Path) -> Path:
+    return path.with_name(path.name + ".meta.json")
+
+
+def load_meta(path: Path) -> Dict[str, str]:
+    meta_file = meta_path(path)
+    if not path.exists() or not meta_file.exists():
+        return {}
+    try:
+        return json.loads(meta_file.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _stream_body(response: http.client.HTTPResponse, target: Path) -> int:
+    decoder = None
+    if (response.getheader("Content-Encoding") or "").lower() == "gzip":
+        decoder = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=f".{target.name}.")
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            while True:
+                chunk = response.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if decoder is not None:
+                    chunk = decoder.decompress(chunk)
+                handle.write(chunk)
+                size += len(chunk)
+            if decoder is not None:
+                tail = decoder.flush()
+                handle.write(tail)
+                size += len(tail)
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, target)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    return size
+
+
+def open_request(
+    pool: ConnectionPool,
+    url: str,
+    headers: Dict[str, str],
+    timeout: float,
+) -> Tuple[http.client.HTTPResponse, str]:
+    for _ in range(MAX_REDIRECTS + 1):
+        parts = urlsplit(url)
+        target = parts.path or "/"
+        if parts.query:
+            target = f"{target}?{parts.query}"
+        conn = pool.get(parts.scheme, parts.netloc, timeout)
+        try:
+            conn.request("GET", target, headers=headers)
+            response = conn.getresponse()
+        except STALE_SOCKET_ERRORS:
+            # A stale keep-alive socket fails on first use; retry on a fresh one.
+            # Timeouts and other errors go to the backoff loop in fetch_one.
+            pool.drop(parts.scheme, parts.netloc)
+            conn = pool.get(parts.scheme, parts.netloc, timeout)
+            conn.request("GET", target, headers=headers)
+            response = conn.getresponse()
+        if response.status in (301, 302, 303, 307, 308):
+            location = response.getheader("Location")
+            response.read()
+            if not location:
+                return response, url
+            url = urljoin(url, location)
+            continue
+        return response, url
+    raise FetchError(f"too many redirects for {url}")
+
+
+def fetch_one(
+    pool: ConnectionPool,
+    url: str,
+    target: Path,
+    timeout: float = DEFAULT_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+    accept: str = "application/json",
+) -> FetchResult:
+    started = time.perf_counter()
+    meta = load_meta(target)
+    headers = {"Accept": accept, "Accept-Encoding": "gzip"}
+    if meta.get("etag"):
+        headers["If-None-Match"] = meta["etag"]
+    if meta.get("last_modified"):
+        headers["If-Modified-Since"] = meta["last_modified"]
+
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            response, final_url = open_request(pool, url, headers, timeout)
+            if response.status == 304:
+                response.read()
+                size = target.stat().st_size
+            elif response.status == 200:
+                size = _stream_body(response, target)
+                meta_path(target).write_text(
+                    json.dumps(
+                        {
+                            "url": final_url,
+                            "etag": response.getheader("ETag") or "",
+                            "last_modified": response.getheader("Last-Modified") or "",
+                        }
+                    ),
+                    encoding="utf-8",
+                )
+            else:
+                response.read()
+                message = f"{url}: HTTP {response.status}"
+                if response.status not in RETRYABLE_STATUSES or attempt >= retries:
+                    raise FetchError(message)
+                raise ConnectionError(message)
+            return FetchResult(
+                name=target.name,
+                url=url,
+                path=target,
+                status=response.status,
+                seconds=time.perf_counter() - started,
+                attempts=attempt,
+                size=size,
+            )
+        except (ConnectionError, http.client.HTTPException, OSError, zlib.error) as exc:
+            # zlib.error: a corrupt gzip body, treated like any broken transfer.
+            parts = urlsplit(url)
+            pool.drop(parts.scheme, parts.netloc)
+            if attempt >= retries:
+                raise FetchError(f"{url}: {exc}") from exc
+            time.sleep(BACKOFF_BASE_SECONDS * (2 ** (attempt - 1)))
+
+
+def cache_subdir(base: str) -> str:
+    """Cache directory name for a base URL: readable host plus a hash of the whole URL."""
+    digest = hashlib.sha256(base.encode("utf-8")).hexdigest()[:12]
+    return f"{urlsplit(base).netloc.replace(':', '_')}-{digest}"
+
+
+def fetch_packs(
+    base_url: str,
+    names: Sequence[str],
+    cache_dir: Path = DEFAULT_CACHE_DIR,
+    timeout: float = DEFAULT_TIMEOUT,
+    retries: int = DEFAULT_RETRIES,
+    workers: Optional[int] = None,
+    failures: Optional[Dict[str, FetchError]] = None,
+) -> List[FetchResult]:
+    """Fetch ``base_url/<name>`` for every name concurrently, in input order.
+
+    A failed fetch raises, unless ``failures`` is given: the error is then
+    recorded there by name and that file is left out of the results.
+    """
+    base = base_url.rstrip("/")
+    base_dir = cache_dir / cache_subdir(base)
+    base_dir.mkdir(parents=True, exist_ok=True)
+    pool = ConnectionPool()
+
+    def task(name: str) -> Optional[FetchResult]:
+        try:
+            return fetch_one(pool, f"{base}/{name}", base_dir / name, timeout, retries)
+        except FetchError as exc:
+            if failures is None:
+                raise
+            failures[name] = exc
+            return None
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers or max(1, len(names))) as executor:
+            return [result for result in executor.map(task, names) if result is not None]
+    finally:
+        pool.close_all()
+
+
+def log_results(results: Sequence[FetchResult]) -> None:
+    for result in results:
+        label = "cached" if result.from_cache else f"{result.size} bytes"
+        print(
+            f"[fetch] {result.name}: HTTP {result.status}, {label},"
+            f" {result.seconds * 1000:.0f} ms, attempts {result.attempts}",
+            file=sys.stderr,
+        )
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Shared schema for basil-arcana card and spread packs.
+
+Schemas are plain dicts (a small JSON-Schema-like subset) compiled once into
+nested validator closures. Packs are read with a streaming parser that decodes
+one root member at a time, so memory stays bounded by the largest card or
+spread instead of the whole document.
+"""
+
+from __future__ import annotations
+
+import io
+import json
+import re
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Optional, TextIO, Tuple, Union
+
+CARD_KEYS = {"title", "keywords", "meaning", "fact", "stats"}
+OPTIONAL_CARD_KEYS = {"detailedDescription"}
+# Deck and media fields that the shipped cdn/data card packs carry. They are
+# maintained by hand rather than by the generators: every card has a
+# description, and the lenormand and ac decks add deck, imageUrl and
+# sometimes video.
+DECK_CARD_KEYS = {"description", "deck", "imageUrl", "video"}
+MEANING_KEYS = {"general", "light", "shadow", "advice"}
+STATS_KEYS = {"luck", "power", "love", "clarity"}
+SPREAD_KEYS = {"id", "name", "title", "description", "cardsCount", "positions"}
+POSITION_KEYS = {"id", "title", "meaning"}
+
+FORBIDDEN_KEYS = frozenset({"funFact"})
+
+STRING: Dict[str, Any] = {"type": "string"}
+
+Issue = Tuple[str, str]
+Validator = Callable[[Any, str, List[Issue]], None]
+
+
+def card_schema(min_keywords: int = 1, max_keywords: Optional[int] = None) -> Dict[str, Any]:
+    return {
+        "type": "object",
+        "properties": {
+            "title": STRING,
+            "keywords": {
+                "type": "array",
+                "items": STRING,
+                "minItems": min_keywords,
+                "maxItems": max_keywords,
+            },
+            "meaning": {
+                "type": "object",
+                "properties": {key: STRING for key in sorted(MEANING_KEYS)},
+            },
+            "fact": STRING,
+            "stats": {
+                "type": "object",
+                "properties": {
+                    key: {"type": "integer", "minimum": 0, "maximum": 100}
+                    for key in sorted(STATS_KEYS)
+                },
+            },
+            "detailedDescription": STRING,
+            **{key: STRING for key in sorted(DECK_CARD_KEYS)},
+        },
+        "required": sorted(CARD_KEYS),
+    }
+
+
+SPREAD_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "id": STRING,
+        "name": STRING,
+        "title": STRING,
+        "description": STRING,
+        "cardsCount": {"type": "integer"},
+        "positions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {key: STRING for key in sorted(POSITION_KEYS)},
+            },
+        },
+    },
+    "lengthOf": {"positions": "cardsCount"},
+}
+
+CARDS_PACK: Dict[str, Any] = {"type": "object", "values": card_schema()}
+SPREADS_PACK: Dict[str, Any] = {"type": "array", "items": SPREAD_SCHEMA}
+
+# The CDN contract is stricter: packs must be non-empty and keywords bounded.
+CDN_CARDS_PACK: Dict[str, Any] = {
+    "type": "object",
+    "values": card_schema(min_keywords=3, max_keywords=6),
+    "minItems": 1,
+}
+CDN_SPREADS_PACK: Dict[str, Any] = {**SPREADS_PACK, "minItems": 1}
+
+
+def pointer_join(pointer: str, token: Union[str, int]) -> str:
+    text = str(token).replace("~", "~0").replace("/", "~1")
+    return f"{pointer}/{text}"
+
+
+def _compile_string(schema: Dict[str, Any], forbidden: FrozenSet[str]) -> Validator:
+    def check(value: Any, pointer: str, issues: List[Issue]) -> None:
+        if not isinstance(value, str):
+            issues.append((pointer, "must be string"))
+
+    return check
+
+
+def _compile_integer(schema: Dict[str, Any], forbidden: FrozenSet[str]) -> Validator:
+    minimum = schema.get("minimum")
+    maximum = schema.get("maximum")
+
+    def check(value: Any, pointer: str, issues: List[Issue]) -> None:
+        if not isinstance(value, int) or isinstance(value, bool):
+            issues.append((pointer, "must be int"))
+        elif (minimum is not None and value < minimum) or (
+            maximum is not None and value > maximum
+        ):
+            issues.append((pointer, f"must be {minimum}..{maximum}"))
+
+    return check
+
+
+def _compile_array(schema: Dict[str, Any], forbidden: FrozenSet[str]) -> Validator:
+    item_check = compile_schema(schema["items"], forbidden) if "items" in schema else None
+    min_items = schema.get("minItems") or 0
+    max_items = schema.get("maxItems")
+
+    def check(value: Any, pointer: str, issues: List[Issue]) -> None:
+        if not isinstance(value, list):
+            issues.append((pointer, "must be list"))
+            return
+        size = len(value)
+        if size < min_items or (max_items is not None and size > max_items):
+            if max_items is None:
+                issues.append((pointer, f"must have at least {min_items} items"))
+            else:
+                issues.append((pointer, f"must have {min_items}-{max_items} items"))
+        if item_check is not None:
+            for index, item in enumerate(value):
+                item_check(item, pointer_join(pointer, index), issues)
+
+    return check
+
+
+def _compile_object(schema: Dict[str, Any], forbidden: FrozenSet[str]) -> Validator:
+    properties = {
+        key: compile_schema(sub, forbidden)
+        for key, sub in schema.get("properties", {}).items()
+    }
+    allowed = frozenset(properties)
+    required = frozenset(schema.get("required", properties))
+    length_of = tuple(schema.get("lengthOf", {}).items())
+    values_check = compile_schema(schema["values"], forbidden) if "values" in schema else None
+    min_items = schema.get("minItems") or 0
+
+    def check(value: Any, pointer: str, issues: List[Issue]) -> None:
+        if not isinstance(value, dict):
+            issues.append((pointer, "must be object"))
+            return
+        if values_check is not None:
+            if len(value) < min_items:
+                issues.append((pointer, f"must have at least {min_items} entries"))
+            for key, item in value.items():
+                values_check(item, pointer_join(pointer, key), issues)
+            return
+
+        keys = value.keys()
+        for key in sorted(forbidden & keys):
+            issues.append((pointer_join(pointer, key), f"{key} is not allowed"))
+        extra = keys - allowed - forbidden
+        missing = required - keys
+        if extra:
+            issues.append((pointer, f"unexpected keys {sorted(extra)}"))
+        if missing:
+            issues.append((pointer, f"missing keys {sorted(missing)}"))
+        for key, field_check in properties.items():
+            if key in value:
+                field_check(value[key], pointer_join(pointer, key), issues)
+        for list_key, count_key in length_of:
+            items = value.get(list_key)
+            count = value.get(count_key)
+            if isinstance(items, list) and isinstance(count, int) and len(items) != count:
+                issues.append(
+                    (
+                        pointer_join(pointer, list_key),
+                        f"length {len(items)} != {count_key} {count}",
+                    )
+                )
+
+    return check
+
+
+_COMPILERS = {
+    "string": _compile_string,
+    "integer": _compile_integer,
+    "array": _compile_array,
+    "object": _compile_object,
+}
+
+
+def compile_schema(schema: Dict[str, Any], forbidden: FrozenSet[str] = frozenset()) -> Validator:
+    return _COMPILERS[schema["type"]](schema, forbidden)
+
+
+_WS = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+_DELIMITERS = frozenset(" \t\n\r,:]}")
+
+
+class _StreamReader:
+    def __init__(self, fp: TextIO, chunk_size: int, keep_raw: bool = False) -> None:
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.keep_raw = keep_raw
+        self.raw = ""
+
+    def fill(self, size: int) -> None:
+        data = self.fp.read(size)
+        if not data:
+            self.eof = True
+        self.buf = self.buf[self.pos :] + data
+        self.pos = 0
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof:
+                return ""
+            self.fill(self.chunk_size)
+
+    def expect(self, chars: str) -> str:
+        char = self.peek()
+        if not char or char not in chars:
+            raise json.JSONDecodeError(f"Expecting one of {chars!r}", self.buf, self.pos)
+        self.pos += 1
+        return char
+
+    def decode(self) -> Any:
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            else:
+                # A value cut off by the buffer edge can still decode (e.g. a
+                # number missing its exponent), so only trust it once the
+                # following delimiter is in the buffer.
+                if self.eof or (end < len(self.buf) and self.buf[end] in _DELIMITERS):
+                    if self.keep_raw:
+                        self.raw = self.buf[self.pos : end]
+                    self.pos = end
+                    return value
+            self.fill(size)
+            size *= 2
+
+
+def iter_root_members(
+    fp: TextIO, chunk_size: int = 1 << 16, keep_raw: bool = False
+) -> Tuple[str, Iterator[Tuple[Union[str, int], Any]]]:
+    """Return the root type and an iterator over its members.
+
+    Object roots yield ``(key, value)`` pairs, array roots ``(index, item)``.
+    Scalar roots are decoded whole and yield nothing. With ``keep_raw`` each
+    member also carries the source text of its value as a third item.
+    """
+    reader = _StreamReader(fp, chunk_size, keep_raw)
+    first = reader.peek()
+    if first == "{":
+        return "object", _iter_object(reader)
+    if first == "[":
+        return "array", _iter_array(reader)
+    value = reader.decode()
+    _expect_end(reader)
+    return type(value).__name__, iter(())
+
+
+def _expect_end(reader: _StreamReader) -> None:
+    if reader.peek():
+        raise json.JSONDecodeError("Extra data", reader.buf, reader.pos)
+
+
+def _iter_object(reader: _StreamReader) -> Iterator[Tuple[Union[str, int], Any]]:
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.pos += 1
+    else:
+        while True:
+            if reader.peek() != '"':
+                raise json.JSONDecodeError("Expecting property name", reader.buf, reader.pos)
+            key = reader.decode()
+            reader.expect(":")
+            value = reader.decode()
+            yield (key, value, reader.raw) if reader.keep_raw else (key, value)
+            if reader.expect(",}") == "}":
+                break
+    _expect_end(reader)
+
+
+def _iter_array(reader: _StreamReader) -> Iterator[Tuple[Union[str, int], Any]]:
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.pos += 1
+    else:
+        index = 0
+        while True:
+            value = reader.decode()
+            yield (index, value, reader.raw) if reader.keep_raw else (index, value)
+            index += 1
+            if reader.expect(",]") == "]":
+                break
+    _expect_end(reader)
+
+
+class PackValidator:
+    """A pack schema compiled once and applied to streamed documents."""
+
+    def __init__(self, schema: Dict[str, Any], forbidden: FrozenSet[str] = frozenset()) -> None:
+        self.root_type = schema["type"]
+        self.min_items = schema.get("minItems") or 0
+        member_schema = schema["values"] if self.root_type == "object" else schema["items"]
+        self.member_check = compile_schema(member_schema, forbidden)
+        self.forbidden = forbidden
+
+    def validate(
+        self,
+        fp: Union[TextIO, io.BufferedIOBase],
+        issues: List[Issue],
+        on_member: Optional[Callable[[Union[str, int], Any], None]] = None,
+    ) -> int:
+        if not isinstance(fp, io.TextIOBase):
+            fp = io.TextIOWrapper(fp, encoding="utf-8")
+        root_type, members = iter_root_members(fp)
+        return self.validate_members(root_type, members, issues, on_member)
+
+    def validate_payload(
+        self,
+        payload: Any,
+        issues: List[Issue],
+        on_member: Optional[Callable[[Union[str, int], Any], None]] = None,
+    ) -> int:
+        """Validate an already decoded document."""
+        if isinstance(payload, dict):
+            return self.validate_members("object", iter(payload.items()), issues, on_member)
+        if isinstance(payload, list):
+            return self.validate_members("array", enumerate(payload), issues, on_member)
+        return self.validate_members(type(payload).__name__, iter(()), issues, on_member)
+
+    def validate_members(
+        self,
+        root_type: str,
+        members: Iterator[Tuple[Union[str, int], Any]],
+        issues: List[Issue],
+        on_member: Optional[Callable[[Union[str, int], Any], None]] = None,
+    ) -> int:
+        if root_type != self.root_type:
+            issues.append(("", f"root must be {self.root_type}"))
+            return 0
+        count = 0
+        for key, value in members:
+            count += 1
+            if isinstance(key, str) and key in self.forbidden:
+                issues.append((pointer_join("", key), f"{key} is not allowed"))
+            self.member_check(value, pointer_join("", key), issues)
+            if on_member is not None:
+                on_member(key, value)
+        if count < self.min_items:
+            issues.append(("", f"root must have at least {self.min_items} entries"))
+        return count
+
+
+def format_issue(source: str, issue: Issue) -> str:
+    pointer, message = issue
+    return f"{source}#{pointer}: {message}"
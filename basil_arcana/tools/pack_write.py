@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Crash-safe writes for generated packs.
+
+A pack is written to a temporary file in its own directory, fsynced and
+renamed over the live file, so a reader (web_server.py, a CDN sync) sees
+either the previous pack or the new one, never a truncated file, and a crash
+leaves the previous pack in place. The optional companion manifest
+(``<name>.manifest.json`` with size and sha256) is written the same way after
+the pack, so a manifest only ever describes a complete pack.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, Optional
+
+
+def manifest_path(path: Path) -> Path:
+    return path.with_name(path.name + ".manifest.json")
+
+
+def fsync_dir(directory: Path) -> None:
+    """Persist a rename in ``directory``; not possible (or needed) on Windows."""
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class DiscardWrite(Exception):
+    """Raise inside an ``open_atomic`` block to drop the new file and keep ``path`` as it is."""
+
+
+@contextmanager
+def open_atomic(path: Path) -> Iterator[BinaryIO]:
+    """A file that replaces ``path`` once the block completes, or is discarded if it raises."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            yield handle
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, path)
+    except DiscardWrite:
+        Path(tmp_name).unlink(missing_ok=True)
+        return
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    fsync_dir(path.parent)
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    with open_atomic(path) as handle:
+        handle.write(data)
+
+
+def pack_manifest(path: Path, data: bytes) -> Dict[str, object]:
+    return {"name": path.name, "bytes": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+
+
+def load_manifest(path: Path) -> Optional[Dict[str, object]]:
+    try:
+        return json.loads(manifest_path(path).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(path: Path, data: bytes) -> Dict[str, object]:
+    """Write the manifest of ``data`` (the content of ``path``) unless it is already current."""
+    manifest = pack_manifest(path, data)
+    if load_manifest(path) != manifest:
+        write_atomic(manifest_path(path), (json.dumps(manifest, indent=2) + "\n").encode("utf-8"))
+    return manifest
+
+
+def write_pack(path: Path, text: str, manifest: bool = False) -> None:
+    data = text.encode("utf-8")
+    write_atomic(path, data)
+    if manifest:
+        write_manifest(path, data)
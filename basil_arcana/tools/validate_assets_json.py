@@ -1,115 +1,133 @@
 #!/usr/bin/env python3
+import argparse
 import json
 import os
 import sys
-from typing import Any
-from urllib.request import Request, urlopen
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+from pack_fetch import FetchError, fetch_packs, log_results
+from pack_consistency import diff_indexes, index_for
+from pack_schema import (
+    CDN_CARDS_PACK,
+    CDN_SPREADS_PACK,
+    FORBIDDEN_KEYS,
+    Issue,
+    PackValidator,
+    format_issue,
+)
 
 BASE_URL = os.environ.get("ASSETS_BASE_URL", "https://cdn.basilarcana.com").rstrip("/")
 CARD_FILES = ["cards_ru.json", "cards_en.json", "cards_kz.json"]
 SPREAD_FILES = ["spreads_ru.json", "spreads_en.json", "spreads_kz.json"]
 
-CARD_KEYS = {"title", "keywords", "meaning", "fact", "stats"}
-OPTIONAL_CARD_KEYS = {"detailedDescription"}
-MEANING_KEYS = {"general", "light", "shadow", "advice"}
-STAT_KEYS = {"luck", "power", "love", "clarity"}
-SPREAD_KEYS = {"id", "name", "title", "description", "cardsCount", "positions"}
-POSITION_KEYS = {"id", "title", "meaning"}
-
+CARDS_VALIDATOR = PackValidator(CDN_CARDS_PACK, forbidden=FORBIDDEN_KEYS)
+SPREADS_VALIDATOR = PackValidator(CDN_SPREADS_PACK, forbidden=FORBIDDEN_KEYS)
 
-def fetch_json(path: str) -> Any:
-    url = f"{BASE_URL}/data/{path}"
-    request = Request(url, headers={"Accept": "application/json"})
-    with urlopen(request, timeout=30) as response:
-        payload = response.read().decode("utf-8")
-    return json.loads(payload)
 
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Validate JSON packs served by the CDN.")
+    parser.add_argument(
+        "--report",
+        default=None,
+        help="Write a JSON report with every error to this path ('-' for stdout).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Validation processes (0 = one per file).",
+    )
+    return parser.parse_args()
 
-def assert_no_fun_fact(payload: Any, path: str = "$") -> None:
-    if isinstance(payload, dict):
-        if "funFact" in payload:
-            raise ValueError(f"funFact found at {path}")
-        for key, value in payload.items():
-            assert_no_fun_fact(value, f"{path}.{key}")
-    elif isinstance(payload, list):
-        for idx, item in enumerate(payload):
-            assert_no_fun_fact(item, f"{path}[{idx}]")
 
+def validate_file(path: str, name: str) -> Dict[str, Any]:
+    validator = CARDS_VALIDATOR if name in CARD_FILES else SPREADS_VALIDATOR
+    issues: List[Issue] = []
+    index = index_for(name)
+    started = time.perf_counter()
+    try:
+        with open(path, "r", encoding="utf-8") as handle:
+            entries = validator.validate(handle, issues, on_member=index.add)
+    except ValueError as exc:
+        entries = 0
+        issues.append(("", f"invalid JSON: {exc}"))
+    return {
+        "name": name,
+        "entries": entries,
+        "validate_ms": round((time.perf_counter() - started) * 1000, 1),
+        "errors": [{"pointer": pointer, "message": message} for pointer, message in issues],
+        "index": index,
+    }
 
-def validate_cards(payload: Any, filename: str) -> None:
-    if not isinstance(payload, dict) or not payload:
-        raise ValueError(f"{filename} must be a non-empty JSON object")
-    for card_id, card in payload.items():
-        if not isinstance(card, dict):
-            raise ValueError(f"{filename}:{card_id} must be an object")
-        extra_keys = set(card.keys()) - CARD_KEYS - OPTIONAL_CARD_KEYS
-        missing_keys = CARD_KEYS - set(card.keys())
-        if extra_keys or missing_keys:
-            raise ValueError(
-                f"{filename}:{card_id} keys must include {sorted(CARD_KEYS)}"
-                f" (extra {sorted(extra_keys)}, missing {sorted(missing_keys)})"
-            )
-        keywords = card["keywords"]
-        if not isinstance(keywords, list) or not (3 <= len(keywords) <= 6):
-            raise ValueError(
-                f"{filename}:{card_id} keywords must have 3-6 items"
-            )
-        meaning = card["meaning"]
-        if not isinstance(meaning, dict) or set(meaning.keys()) != MEANING_KEYS:
-            raise ValueError(
-                f"{filename}:{card_id} meaning must have {sorted(MEANING_KEYS)}"
-            )
-        stats = card["stats"]
-        if not isinstance(stats, dict) or set(stats.keys()) != STAT_KEYS:
-            raise ValueError(
-                f"{filename}:{card_id} stats must have {sorted(STAT_KEYS)}"
-            )
-        for stat_key in STAT_KEYS:
-            stat_value = stats[stat_key]
-            if not isinstance(stat_value, int) or not (0 <= stat_value <= 100):
-                raise ValueError(
-                    f"{filename}:{card_id} stat {stat_key} must be 0-100 int"
-                )
 
+def main() -> int:
+    args = parse_args()
+    names = CARD_FILES + SPREAD_FILES
+    failures: Dict[str, FetchError] = {}
+    results = fetch_packs(f"{BASE_URL}/data", names, failures=failures)
+    log_results(results)
 
-def validate_spreads(payload: Any, filename: str) -> None:
-    if not isinstance(payload, list) or not payload:
-        raise ValueError(f"{filename} must be a non-empty JSON array")
-    for spread in payload:
-        if not isinstance(spread, dict):
-            raise ValueError(f"{filename} entries must be objects")
-        if set(spread.keys()) != SPREAD_KEYS:
-            raise ValueError(
-                f"{filename}:{spread.get('id')} keys must be {sorted(SPREAD_KEYS)}"
-            )
-        positions = spread["positions"]
-        if not isinstance(positions, list):
-            raise ValueError(f"{filename}:{spread.get('id')} positions must be list")
-        if len(positions) != spread["cardsCount"]:
-            raise ValueError(
-                f"{filename}:{spread.get('id')} positions length must match cardsCount"
-            )
-        for position in positions:
-            if not isinstance(position, dict):
-                raise ValueError(
-                    f"{filename}:{spread.get('id')} positions must be objects"
-                )
-            if set(position.keys()) != POSITION_KEYS:
-                raise ValueError(
-                    f"{filename}:{spread.get('id')} position keys must be {sorted(POSITION_KEYS)}"
+    validated: List[Dict[str, Any]] = []
+    if results:
+        workers = args.workers or len(results)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            validated = list(
+                executor.map(
+                    validate_file,
+                    [str(result.path) for result in results],
+                    [result.name for result in results],
                 )
+            )
+    by_name = {report["name"]: report for report in validated}
+    for name, pointer, message in diff_indexes([report.pop("index") for report in validated]):
+        by_name[name]["errors"].append(
+            {"pointer": pointer, "message": message, "check": "consistency"}
+        )
+    for result, report in zip(results, validated):
+        report.update(
+            url=result.url,
+            status=result.status,
+            fetch_ms=round(result.seconds * 1000, 1),
+        )
+    for name, exc in failures.items():
+        by_name[name] = {
+            "name": name,
+            "entries": 0,
+            "errors": [{"pointer": "", "message": f"fetch failed: {exc}", "check": "fetch"}],
+            "url": f"{BASE_URL}/data/{name}",
+        }
+    files = [by_name[name] for name in names]
 
+    error_count = sum(len(report["errors"]) for report in files)
+    for report in files:
+        for error in report["errors"]:
+            issue = (error["pointer"], error["message"])
+            print(f"ERROR: {format_issue(report['name'], issue)}", file=sys.stderr)
 
-def main() -> int:
-    for filename in CARD_FILES:
-        payload = fetch_json(filename)
-        assert_no_fun_fact(payload)
-        validate_cards(payload, filename)
-    for filename in SPREAD_FILES:
-        payload = fetch_json(filename)
-        assert_no_fun_fact(payload)
-        validate_spreads(payload, filename)
-    print("OK")
+    if args.report:
+        payload = json.dumps(
+            {
+                "ok": error_count == 0,
+                "base_url": BASE_URL,
+                "error_count": error_count,
+                "files": files,
+            },
+            ensure_ascii=False,
+            indent=2,
+        )
+        if args.report == "-":
+            print(payload)
+        else:
+            with open(args.report, "w", encoding="utf-8") as handle:
+                handle.write(payload + "\n")
+
+    if error_count:
+        print(f"Validation failed: {error_count} errors", file=sys.stderr)
+        return 1
+    if args.report != "-":
+        print("OK")
     return 0
 
 